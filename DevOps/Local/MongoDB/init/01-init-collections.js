@@ -7,6 +7,7 @@ db = db.getSiblingDB("afda_db");
 
 // ─── Collections ────────────────────────────────────────────
 db.createCollection("agent_conversations");
+db.createCollection("agent_conversation_buckets");
 db.createCollection("workflow_runs");
 db.createCollection("risk_alerts");
 db.createCollection("executive_reports");
@@ -17,6 +18,7 @@ db.createCollection("audit_log");
 db.agent_conversations.createIndex({ session_id: 1 });
 db.agent_conversations.createIndex({ created_at: -1 });
 db.agent_conversations.createIndex({ user_id: 1, created_at: -1 });
+db.agent_conversation_buckets.createIndex({ session_id: 1, bucket: 1 }, { unique: true });
 
 db.workflow_runs.createIndex({ workflow_name: 1, started_at: -1 });
 db.workflow_runs.createIndex({ status: 1 });
@@ -37,6 +37,31 @@ class Settings(BaseSettings):
     BEDROCK_REGION: str = "us-east-1"
     BEDROCK_AGENT_ID: str = ""
 
+    FAKE_ENGINE_ENABLED: bool = False  # local echo engine for tests
+    FAKE_ENGINE_TOKEN_DELAY_MS: int = 30
+
+    # Engine HTTP clients (one pooled client per engine for the process lifetime)
+    N8N_TIMEOUT_SECONDS: float = 30.0
+    ENGINE_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    ENGINE_MAX_CONNECTIONS: int = 100
+    ENGINE_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    ENGINE_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    ENGINE_HTTP2: bool = True  # negotiated over TLS; plain-http endpoints stay on HTTP/1.1
+
+    # WebSocket chat (per connection)
+    WS_MAX_IN_FLIGHT: int = 4  # agent queries running concurrently
+    WS_MAX_QUEUED: int = 16  # accepted queries waiting for a free slot
+    WS_SEND_QUEUE: int = 256  # outgoing frames buffered before engine streams are held back
+    WS_CONTROL_QUEUE: int = 64  # unsent pong/accepted/error replies before the client is dropped
+
+    # SSE streaming
+    STREAM_HEARTBEAT_SECONDS: float = 15.0  # heartbeat after this long without events
+    STREAM_CLIENT_QUEUE: int = 1000  # events buffered per SSE client before it is cut off
+
+    # Conversation storage
+    CONVERSATION_BUCKET_SIZE: int = 100  # messages per bucket document
+    CONVERSATION_HISTORY_MESSAGES: int = 20  # tail loaded for each turn
+
     # JWT (shared secret with CRUD API)
     JWT_SECRET: str = "change-me-in-production"
     JWT_ALGORITHM: str = "HS256"
@@ -24,7 +24,8 @@ async def connect_all():
     redis_client = Redis.from_url(settings.REDIS_URL, decode_responses=True)
     # Ensure indexes
     await mongo_db.agent_conversations.create_index("session_id")
-    await mongo_db.agent_executions.create_index([("created_at", -1)])
+    await mongo_db.agent_conversation_buckets.create_index([("session_id", 1), ("bucket", 1)], unique=True)
+    await mongo_db.agent_executions.create_index([("created_at", -1), ("_id", -1)])
     await mongo_db.workflow_definitions.create_index("name")
 
 
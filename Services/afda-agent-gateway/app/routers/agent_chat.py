@@ -1,6 +1,7 @@
-import json
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
+from typing import Optional
+from fastapi import APIRouter, WebSocket, Depends, Query
 from app.services.orchestrator import AgentOrchestrator
+from app.services.chat_socket import ChatSocket
 from app.models.agent_request import AgentChatRequest
 from app.models.agent_response import AgentChatResponse
 
@@ -11,23 +12,7 @@ router = APIRouter()
 @router.websocket("/chat/{session_id}")
 async def websocket_chat(websocket: WebSocket, session_id: str):
     await websocket.accept()
-    try:
-        while True:
-            data = await websocket.receive_text()
-            payload = json.loads(data)
-            result = await AgentOrchestrator.send_message(
-                message=payload.get("message", ""),
-                session_id=session_id,
-                engine=payload.get("engine"),
-                agent_id=payload.get("agent_id"),
-                context=payload.get("context"),
-            )
-            await websocket.send_json(result.model_dump(mode="json"))
-    except WebSocketDisconnect:
-        pass
-    except Exception as e:
-        await websocket.send_json({"error": str(e)})
-        await websocket.close()
+    await ChatSocket(websocket, session_id).serve()
 
 
 # ── HTTP Fallback ──
@@ -52,8 +37,12 @@ async def list_sessions():
 
 
 @router.get("/chat/sessions/{session_id}/history")
-async def session_history(session_id: str):
-    conv = await AgentOrchestrator.get_history(session_id)
+async def session_history(
+    session_id: str,
+    limit: int = Query(100, ge=1, le=1000),
+    before: Optional[int] = Query(None, description="next_before from the previous page"),
+):
+    conv = await AgentOrchestrator.get_history(session_id, limit, before)
     if not conv:
         return {"success": False, "message": "Session not found"}
     conv["_id"] = str(conv["_id"])
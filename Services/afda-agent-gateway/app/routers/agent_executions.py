@@ -1,25 +1,59 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional
+from bson import ObjectId
 from fastapi import APIRouter, Query
 from app.database import get_mongo
 
 router = APIRouter()
 
 
+def _encode_cursor(created_at: datetime, oid: ObjectId) -> str:
+    payload = json.dumps([created_at.isoformat(), str(oid)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str):
+    created_at, oid = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    return datetime.fromisoformat(created_at), ObjectId(oid)
+
+
 @router.get("/executions")
 async def list_executions(
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
 ):
     mongo = get_mongo()
-    cursor = mongo.agent_executions.find().sort("created_at", -1).skip(offset).limit(limit)
-    executions = await cursor.to_list(length=limit)
+    query = {}
+    if cursor:
+        # Seek past the last (created_at, _id) served; rides the compound index
+        try:
+            created_at, oid = _decode_cursor(cursor)
+        except Exception:
+            return {"success": False, "message": "Invalid cursor"}
+        query = {"$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": oid}},
+        ]}
+    find = mongo.agent_executions.find(query).sort([("created_at", -1), ("_id", -1)])
+    if not cursor:
+        find = find.skip(offset)
+    executions = await find.limit(limit + 1).to_list(length=limit + 1)
+    has_more = len(executions) > limit
+    executions = executions[:limit]
+    next_cursor = None
+    if has_more and executions:
+        last = executions[-1]
+        next_cursor = _encode_cursor(last["created_at"], last["_id"])
     for e in executions:
         e["id"] = str(e.pop("_id"))
-    return {"success": True, "data": executions}
+    return {"success": True, "data": executions, "next_cursor": next_cursor, "has_more": has_more}
 
 
 @router.get("/executions/{execution_id}")
 async def get_execution(execution_id: str):
-    from bson import ObjectId
     mongo = get_mongo()
     exc = await mongo.agent_executions.find_one({"_id": ObjectId(execution_id)})
     if not exc:
@@ -30,7 +64,6 @@ async def get_execution(execution_id: str):
 
 @router.get("/executions/{execution_id}/logs")
 async def get_execution_logs(execution_id: str):
-    from bson import ObjectId
     mongo = get_mongo()
     exc = await mongo.agent_executions.find_one({"_id": ObjectId(execution_id)})
     if not exc:
@@ -2,9 +2,11 @@ import asyncio
 import json
 from fastapi import APIRouter
 from sse_starlette.sse import EventSourceResponse
-from app.database import get_redis
+from app.config import get_settings
+from app.services.stream_hub import stream_hub
 
 router = APIRouter()
+settings = get_settings()
 
 
 @router.get("/stream/{session_id}")
@@ -12,18 +14,18 @@ async def stream_events(session_id: str):
     """SSE endpoint — streams agent events for a session in real-time."""
 
     async def event_generator():
-        redis = get_redis()
-        pubsub = redis.pubsub()
-        await pubsub.subscribe(f"agent:stream:{session_id}")
+        channel = f"agent:stream:{session_id}"
+        listener = await stream_hub.subscribe(channel)
         try:
-            while True:
-                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
-                if message and message["type"] == "message":
-                    yield {"event": "agent_message", "data": message["data"]}
-                else:
+            while not listener.overflowed:
+                try:
+                    data = await asyncio.wait_for(listener.queue.get(), settings.STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # Only idle connections get heartbeats
                     yield {"event": "heartbeat", "data": json.dumps({"status": "alive"})}
-                await asyncio.sleep(0.5)
+                    continue
+                yield {"event": "agent_message", "data": data}
         finally:
-            await pubsub.unsubscribe(f"agent:stream:{session_id}")
+            await stream_hub.unsubscribe(channel, listener)
 
     return EventSourceResponse(event_generator())
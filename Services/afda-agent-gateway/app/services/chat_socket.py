@@ -0,0 +1,170 @@
+import asyncio
+import json
+import logging
+import uuid
+from typing import Dict, Optional, Set
+from fastapi import WebSocket, WebSocketDisconnect
+from app.config import get_settings
+from app.services.orchestrator import AgentOrchestrator
+
+logger = logging.getLogger("afda-gateway")
+settings = get_settings()
+
+
+class SlowClient(Exception):
+    """The client stopped reading; its control replies no longer fit in the queue."""
+
+
+class ChatSocket:
+    """One chat WebSocket split into a reader, a pool of workers and a writer.
+
+    The reader only parses frames, so ping and cancel are handled at once even
+    while engines are busy. Chat frames wait in a bounded queue for one of
+    WS_MAX_IN_FLIGHT workers; when WS_MAX_QUEUED are already waiting the frame
+    is rejected with a "busy" error rather than stalling the reader. Every
+    outgoing frame goes through one bounded send queue, so a slow client
+    slows the engine streams feeding it instead of buffering without limit.
+    Replies from the reader itself (pong, accepted, busy, errors) use a small
+    separate queue that the writer drains first and that is never waited on:
+    a client too far behind to take those is disconnected.
+
+    Frames in:  {"type": "chat", "request_id"?, "message", "engine"?, "agent_id"?,
+                 "context"?, "stream"?}  ("type" defaults to chat),
+                {"type": "cancel", "request_id"}, {"type": "ping"}.
+    Frames out: accepted / token / step / done / cancelled / error / pong,
+                each carrying the request_id it belongs to.
+    """
+
+    def __init__(self, websocket: WebSocket, session_id: str):
+        self.websocket = websocket
+        self.session_id = session_id
+        self.requests: asyncio.Queue = asyncio.Queue(maxsize=settings.WS_MAX_QUEUED)
+        self.outbox: asyncio.Queue = asyncio.Queue(maxsize=settings.WS_SEND_QUEUE)
+        self.control: asyncio.Queue = asyncio.Queue(maxsize=settings.WS_CONTROL_QUEUE)
+        self._ready = asyncio.Event()  # set whenever either queue gains a frame
+        self.running: Dict[str, asyncio.Task] = {}
+        self.pending: Set[str] = set()  # accepted, not yet picked up by a worker
+
+    async def serve(self) -> None:
+        writer = asyncio.create_task(self._write())
+        workers = [asyncio.create_task(self._work()) for _ in range(settings.WS_MAX_IN_FLIGHT)]
+        try:
+            await self._read()
+        except WebSocketDisconnect:
+            pass
+        except SlowClient:
+            await self.websocket.close(code=1008, reason="client is not reading replies")
+        finally:
+            # The client is gone: nothing left to flush, stop everything including engine calls
+            tasks = [writer, *workers, *self.running.values()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def send(self, frame: dict) -> None:
+        """Queue a data frame (chunks, results); waits while the client is behind."""
+        await self.outbox.put(frame)
+        self._ready.set()
+
+    def reply(self, frame: dict) -> None:
+        """Queue a control frame from the reader without ever waiting."""
+        try:
+            self.control.put_nowait(frame)
+        except asyncio.QueueFull:
+            raise SlowClient()
+        self._ready.set()
+
+    async def _write(self) -> None:
+        while True:
+            if not self.control.empty():
+                frame = self.control.get_nowait()
+            elif not self.outbox.empty():
+                frame = self.outbox.get_nowait()
+            else:
+                await self._ready.wait()
+                self._ready.clear()
+                continue
+            await self.websocket.send_json(frame)
+
+    async def _read(self) -> None:
+        while True:
+            raw = await self.websocket.receive_text()
+            try:
+                frame = json.loads(raw)
+                if not isinstance(frame, dict):
+                    raise ValueError("frame must be a JSON object")
+            except ValueError as e:
+                self.reply({"type": "error", "request_id": None, "error": f"Invalid frame: {e}"})
+                continue
+            kind = frame.get("type", "chat")
+            # Ids are compared as strings, so numeric ids from clients match too
+            request_id = frame.get("request_id")
+            frame["request_id"] = request_id = str(request_id) if request_id is not None else None
+            if kind == "ping":
+                self.reply({"type": "pong", "request_id": request_id})
+            elif kind == "cancel":
+                self._cancel(request_id)
+            elif kind == "chat":
+                self._accept(frame)
+            else:
+                self.reply({"type": "error", "request_id": request_id, "error": f"Unknown frame type: {kind}"})
+
+    def _accept(self, frame: dict) -> None:
+        request_id = frame["request_id"] or uuid.uuid4().hex
+        frame["request_id"] = request_id
+        if request_id in self.pending or request_id in self.running:
+            self.reply({"type": "error", "request_id": request_id, "error": "Duplicate request_id"})
+            return
+        try:
+            self.requests.put_nowait(frame)
+        except asyncio.QueueFull:
+            self.reply({"type": "error", "request_id": request_id,
+                        "error": f"busy: {settings.WS_MAX_QUEUED} requests already queued"})
+            return
+        self.pending.add(request_id)
+        self.reply({"type": "accepted", "request_id": request_id})
+
+    def _cancel(self, request_id: Optional[str]) -> None:
+        if request_id in self.pending:
+            self.pending.discard(request_id)  # the worker that dequeues it reports the cancel
+        elif request_id in self.running:
+            self.running[request_id].cancel()
+        else:
+            self.reply({"type": "error", "request_id": request_id, "error": "No pending or running request with this id"})
+
+    async def _work(self) -> None:
+        while True:
+            frame = await self.requests.get()
+            request_id = frame["request_id"]
+            if request_id not in self.pending:
+                await self.send({"type": "cancelled", "request_id": request_id})
+                continue
+            self.pending.discard(request_id)
+            task = asyncio.create_task(self._run(frame))
+            self.running[request_id] = task
+            try:
+                await task
+            except asyncio.CancelledError:
+                if asyncio.current_task().cancelling():
+                    raise  # this worker itself is shutting down
+                await self.send({"type": "cancelled", "request_id": request_id})
+            except Exception as e:
+                logger.exception(f"Chat request {request_id} on {self.session_id} failed")
+                await self.send({"type": "error", "request_id": request_id, "error": str(e)})
+            finally:
+                self.running.pop(request_id, None)
+
+    async def _run(self, frame: dict) -> None:
+        # Token/step chunks go out as they arrive; the last frame is the full response
+        # with type "done". Clients that only want that frame send "stream": false.
+        request_id = frame["request_id"]
+        stream = frame.get("stream", True)
+        async for chunk in AgentOrchestrator.stream_message(
+            message=frame.get("message", ""),
+            session_id=self.session_id,
+            engine=frame.get("engine"),
+            agent_id=frame.get("agent_id"),
+            context=frame.get("context"),
+        ):
+            if stream or chunk["type"] == "done":
+                await self.send({**chunk, "request_id": request_id})
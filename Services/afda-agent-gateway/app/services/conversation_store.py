@@ -0,0 +1,116 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import List, Optional, Tuple
+from pymongo import ReturnDocument, UpdateOne, ReplaceOne
+from app.config import get_settings
+
+settings = get_settings()
+
+
+class ConversationStore:
+    """Bucketed message storage for agent sessions.
+
+    `agent_conversations` keeps one small header per session (engine,
+    counters, timestamps) and `agent_conversation_buckets` holds the messages,
+    `CONVERSATION_BUCKET_SIZE` per document keyed by (session_id, bucket).
+    Every message carries a sequence number: appends reserve theirs with an
+    atomic $inc on the header, and message `seq` lives in bucket seq // size.
+    Loading the last K messages walks buckets newest first on the unique
+    index and stops as soon as it has K, so a turn never re-reads the whole
+    conversation and no document grows without bound.
+
+    Conversations written before bucketing kept every message in a
+    `messages` array on the header. Converting one numbers its messages
+    -n..-1, so they sort before anything appended since without touching the
+    header's counter.
+    """
+
+    def __init__(self, mongo, bucket_size: Optional[int] = None):
+        self.headers = mongo.agent_conversations
+        self.buckets = mongo.agent_conversation_buckets
+        self.bucket_size = bucket_size or settings.CONVERSATION_BUCKET_SIZE
+
+    def bucket_of(self, seq: int) -> int:
+        return seq // self.bucket_size
+
+    async def append(self, session_id: str, messages: List[dict], engine: str, now: datetime) -> None:
+        header = await self.headers.find_one_and_update(
+            {"session_id": session_id},
+            {
+                "$inc": {"message_count": len(messages)},
+                "$set": {"engine": engine, "updated_at": now},
+                "$setOnInsert": {"created_at": now},
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+            projection={"message_count": 1, "messages": {"$slice": 0}},
+        )
+        if "messages" in header:
+            await self.convert_legacy(session_id)
+        first = header["message_count"] - len(messages)
+        by_bucket = defaultdict(list)
+        for seq, msg in enumerate(messages, start=first):
+            by_bucket[self.bucket_of(seq)].append({**msg, "seq": seq})
+        await self.buckets.bulk_write([
+            UpdateOne(
+                {"session_id": session_id, "bucket": bucket},
+                {
+                    "$push": {"messages": {"$each": msgs}},
+                    "$inc": {"count": len(msgs)},
+                    "$set": {"updated_at": now},
+                    "$setOnInsert": {"created_at": now},
+                },
+                upsert=True,
+            )
+            for bucket, msgs in by_bucket.items()
+        ], ordered=False)
+
+    async def load_recent(self, session_id: str, limit: int, before: Optional[int] = None) -> Tuple[List[dict], bool]:
+        """Up to `limit` messages (oldest first) with seq < `before`, and whether older ones exist."""
+        query = {"session_id": session_id}
+        if before is not None:
+            query["bucket"] = {"$lte": self.bucket_of(before - 1)}
+        cursor = self.buckets.find(query, {"messages": 1}).sort("bucket", -1).batch_size(
+            max(2, limit // self.bucket_size + 2)
+        )
+        collected: List[dict] = []
+        more = False
+        async for doc in cursor:
+            collected.extend(m for m in doc.get("messages", []) if before is None or m["seq"] < before)
+            if len(collected) > limit:
+                more = True
+                break
+        if not collected and before is None and await self.convert_legacy(session_id):
+            return await self.load_recent(session_id, limit)
+        collected.sort(key=lambda m: m["seq"])
+        return collected[-limit:], more
+
+    async def convert_legacy(self, session_id: str, header: Optional[dict] = None) -> int:
+        """Move a pre-bucketing `messages` array into buckets; idempotent, returns messages moved."""
+        if header is None:
+            header = await self.headers.find_one(
+                {"session_id": session_id, "messages": {"$exists": True}}, {"messages": 1},
+            )
+        legacy = (header or {}).get("messages")
+        if legacy is None:
+            return 0
+        now = datetime.utcnow()
+        by_bucket = defaultdict(list)
+        for seq, msg in enumerate(legacy, start=-len(legacy)):
+            by_bucket[self.bucket_of(seq)].append({**msg, "seq": seq})
+        if by_bucket:
+            # Replace, not push: a rerun after a crash rewrites the same buckets
+            await self.buckets.bulk_write([
+                ReplaceOne(
+                    {"session_id": session_id, "bucket": bucket},
+                    {"session_id": session_id, "bucket": bucket, "messages": msgs, "count": len(msgs),
+                     "created_at": now, "updated_at": now},
+                    upsert=True,
+                )
+                for bucket, msgs in by_bucket.items()
+            ], ordered=False)
+        await self.headers.update_one(
+            {"_id": header["_id"]},
+            {"$unset": {"messages": ""}, "$set": {"legacy_count": len(legacy)}},
+        )
+        return len(legacy)
@@ -1,4 +1,4 @@
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, AsyncIterator
 from app.config import get_settings
 
 settings = get_settings()
@@ -7,6 +7,9 @@ settings = get_settings()
 class BedrockEngine:
     """Adapter for AWS Bedrock Agents."""
 
+    async def close(self) -> None:
+        pass
+
     async def invoke(
         self, message: str, history: List[dict],
         agent_id: Optional[str] = None, context: Dict[str, Any] = {},
@@ -25,3 +28,12 @@ class BedrockEngine:
             "tokens_used": 0,
             "trace": [{"step": "bedrock-invoke", "action": "placeholder"}],
         }
+
+    async def stream(
+        self, message: str, history: List[dict],
+        agent_id: Optional[str] = None, context: Dict[str, Any] = {},
+    ) -> AsyncIterator[dict]:
+        # Placeholder answers arrive whole; forward them as a single token
+        result = await self.invoke(message, history, agent_id, context)
+        yield {"type": "token", "content": result.pop("response")}
+        yield {"type": "done", **result}
@@ -0,0 +1,45 @@
+import asyncio
+from typing import Optional, Dict, Any, List, AsyncIterator
+from app.config import get_settings
+
+settings = get_settings()
+
+
+class FakeEngine:
+    """Local engine for tests and demos: echoes the message back word by word.
+
+    Streams with a fixed per-token delay so clients can exercise incremental
+    rendering without n8n or a model behind the gateway. Only selectable when
+    FAKE_ENGINE_ENABLED is set.
+    """
+
+    async def close(self) -> None:
+        pass
+
+    @staticmethod
+    def _words(message: str) -> List[str]:
+        words = f"Echo: {message}".split(" ")
+        return [w if i == 0 else f" {w}" for i, w in enumerate(words)]
+
+    async def invoke(
+        self, message: str, history: List[dict],
+        agent_id: Optional[str] = None, context: Dict[str, Any] = {},
+    ) -> dict:
+        words = self._words(message)
+        return {
+            "response": "".join(words),
+            "agent_id": agent_id,
+            "tokens_used": len(words),
+            "trace": [{"step": "echo", "history": len(history)}],
+        }
+
+    async def stream(
+        self, message: str, history: List[dict],
+        agent_id: Optional[str] = None, context: Dict[str, Any] = {},
+    ) -> AsyncIterator[dict]:
+        words = self._words(message)
+        yield {"type": "step", "step": {"step": "echo", "history": len(history)}}
+        for word in words:
+            await asyncio.sleep(settings.FAKE_ENGINE_TOKEN_DELAY_MS / 1000)
+            yield {"type": "token", "content": word}
+        yield {"type": "done", "agent_id": agent_id, "tokens_used": len(words)}
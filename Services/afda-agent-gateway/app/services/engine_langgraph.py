@@ -1,4 +1,4 @@
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, AsyncIterator
 from app.config import get_settings
 
 settings = get_settings()
@@ -7,6 +7,9 @@ settings = get_settings()
 class LangGraphEngine:
     """Adapter for LangGraph agent framework."""
 
+    async def close(self) -> None:
+        pass
+
     async def invoke(
         self, message: str, history: List[dict],
         agent_id: Optional[str] = None, context: Dict[str, Any] = {},
@@ -26,3 +29,12 @@ class LangGraphEngine:
             "tokens_used": 0,
             "trace": [{"node": "router", "action": "placeholder"}],
         }
+
+    async def stream(
+        self, message: str, history: List[dict],
+        agent_id: Optional[str] = None, context: Dict[str, Any] = {},
+    ) -> AsyncIterator[dict]:
+        # Placeholder answers arrive whole; forward them as a single token
+        result = await self.invoke(message, history, agent_id, context)
+        yield {"type": "token", "content": result.pop("response")}
+        yield {"type": "done", **result}
@@ -1,46 +1,124 @@
+import json
 import httpx
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, AsyncIterator
 from app.config import get_settings
 
 settings = get_settings()
 
+WEBHOOK_PATH = "/webhook/agent-chat"
+
 
 class N8nEngine:
-    """Adapter for n8n workflow engine."""
+    """Adapter for n8n workflow engine.
 
-    async def invoke(
-        self, message: str, history: List[dict],
-        agent_id: Optional[str] = None, context: Dict[str, Any] = {},
-    ) -> dict:
-        try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                payload = {
-                    "message": message,
-                    "history": history[-10:],  # last 10 messages for context
-                    "agent_id": agent_id,
-                    "context": context,
-                }
-                resp = await client.post(
-                    f"{settings.N8N_BASE_URL}/webhook/agent-chat",
-                    json=payload,
-                    headers={"Authorization": f"Bearer {settings.N8N_API_KEY}"} if settings.N8N_API_KEY else {},
-                )
-                if resp.status_code == 200:
-                    data = resp.json()
-                    return {
-                        "response": data.get("response", data.get("output", str(data))),
-                        "agent_id": data.get("agent_id", agent_id),
-                        "tokens_used": data.get("tokens_used"),
-                        "trace": data.get("trace", []),
-                        "metadata": data.get("metadata"),
-                    }
-                else:
-                    return {"response": f"n8n returned status {resp.status_code}", "agent_id": agent_id}
-        except httpx.ConnectError:
+    One instance lives for the whole process (see engine_pool) and keeps a
+    pooled client, so chat turns reuse warm keep-alive connections instead of
+    paying TCP/TLS setup on every message.
+    """
+
+    def __init__(self):
+        self.client = httpx.AsyncClient(
+            base_url=settings.N8N_BASE_URL,
+            headers={"Authorization": f"Bearer {settings.N8N_API_KEY}"} if settings.N8N_API_KEY else {},
+            timeout=httpx.Timeout(settings.N8N_TIMEOUT_SECONDS, connect=settings.ENGINE_CONNECT_TIMEOUT_SECONDS),
+            limits=httpx.Limits(
+                max_connections=settings.ENGINE_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.ENGINE_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.ENGINE_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+            http2=settings.ENGINE_HTTP2,
+        )
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+    @staticmethod
+    def _payload(message: str, history: List[dict], agent_id: Optional[str], context: Dict[str, Any]) -> dict:
+        return {
+            "message": message,
+            "history": history[-10:],  # last 10 messages for context
+            "agent_id": agent_id,
+            "context": context,
+        }
+
+    @staticmethod
+    def _result(data: dict, agent_id: Optional[str]) -> dict:
+        return {
+            "response": data.get("response", data.get("output", str(data))),
+            "agent_id": data.get("agent_id", agent_id),
+            "tokens_used": data.get("tokens_used"),
+            "trace": data.get("trace", []),
+            "metadata": data.get("metadata"),
+        }
+
+    @staticmethod
+    def _error(e: Exception, agent_id: Optional[str]) -> dict:
+        if isinstance(e, httpx.ConnectError):
             return {
                 "response": "[n8n engine unavailable] I'm currently unable to connect to the workflow engine. "
                             "Please check that n8n is running on port 5678.",
                 "agent_id": agent_id,
             }
+        if isinstance(e, httpx.TimeoutException):
+            return {
+                "response": f"[n8n timeout] The workflow engine did not answer within {settings.N8N_TIMEOUT_SECONDS:g}s.",
+                "agent_id": agent_id,
+            }
+        return {"response": f"[n8n error] {str(e)}", "agent_id": agent_id}
+
+    async def invoke(
+        self, message: str, history: List[dict],
+        agent_id: Optional[str] = None, context: Dict[str, Any] = {},
+    ) -> dict:
+        try:
+            resp = await self.client.post(WEBHOOK_PATH, json=self._payload(message, history, agent_id, context))
+            if resp.status_code == 200:
+                return self._result(resp.json(), agent_id)
+            else:
+                return {"response": f"n8n returned status {resp.status_code}", "agent_id": agent_id}
+        except Exception as e:
+            return self._error(e, agent_id)
+
+    async def stream(
+        self, message: str, history: List[dict],
+        agent_id: Optional[str] = None, context: Dict[str, Any] = {},
+    ) -> AsyncIterator[dict]:
+        """Chunks as the workflow produces them.
+
+        Workflows whose webhook responds in streaming mode send JSON lines
+        ({"type": "begin" | "item" | "end", "content": ...}); each item is
+        forwarded as a token. A workflow that answers with one JSON body is
+        forwarded as a single token, so either kind works behind this method.
+        """
+        done = {"type": "done", "agent_id": agent_id}
+        try:
+            async with self.client.stream(
+                "POST", WEBHOOK_PATH, json=self._payload(message, history, agent_id, context),
+            ) as resp:
+                if resp.status_code != 200:
+                    yield {"type": "token", "content": f"n8n returned status {resp.status_code}"}
+                    yield done
+                    return
+                if resp.headers.get("content-type", "").startswith("application/json"):
+                    result = self._result(json.loads(await resp.aread()), agent_id)
+                    yield {"type": "token", "content": result.pop("response")}
+                    yield {**done, **result}
+                    return
+                async for line in resp.aiter_lines():
+                    if not line.strip():
+                        continue
+                    try:
+                        item = json.loads(line)
+                    except ValueError:
+                        yield {"type": "token", "content": line}
+                        continue
+                    kind = item.get("type")
+                    if kind == "item" and item.get("content"):
+                        yield {"type": "token", "content": item["content"]}
+                    elif kind == "step":
+                        yield {"type": "step", "step": item.get("step") or item.get("metadata")}
+                    elif kind == "end":
+                        done.update({k: item[k] for k in ("agent_id", "tokens_used", "metadata") if item.get(k)})
         except Exception as e:
-            return {"response": f"[n8n error] {str(e)}", "agent_id": agent_id}
+            yield {"type": "token", "content": self._error(e, agent_id)["response"]}
+        yield done
@@ -0,0 +1,37 @@
+import asyncio
+from typing import Dict
+from app.services.engine_n8n import N8nEngine
+from app.services.engine_langgraph import LangGraphEngine
+from app.services.engine_bedrock import BedrockEngine
+from app.services.engine_fake import FakeEngine
+
+ENGINE_MAP = {
+    "n8n": N8nEngine,
+    "langgraph": LangGraphEngine,
+    "bedrock": BedrockEngine,
+    "fake": FakeEngine,
+}
+
+_engines: Dict[str, object] = {}
+
+
+def get_engine(name: str):
+    """Process-wide adapter for `name` (n8n for unknown names), created on first use."""
+    if name not in ENGINE_MAP:
+        name = "n8n"
+    engine = _engines.get(name)
+    if engine is None:
+        engine = _engines[name] = ENGINE_MAP[name]()
+    return engine
+
+
+def start_engines():
+    for name in ENGINE_MAP:
+        get_engine(name)
+
+
+async def stop_engines():
+    """Close every adapter's pooled connections; runs after uvicorn has drained requests."""
+    engines = list(_engines.values())
+    _engines.clear()
+    await asyncio.gather(*(engine.close() for engine in engines), return_exceptions=True)
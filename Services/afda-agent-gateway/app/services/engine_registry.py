@@ -27,6 +27,12 @@ class EngineRegistry:
             config={"region": settings.BEDROCK_REGION, "agent_id": settings.BEDROCK_AGENT_ID},
         ),
     }
+    if settings.FAKE_ENGINE_ENABLED:
+        ENGINES["fake"] = EngineInfo(
+            name="fake", display_name="Local Echo Engine (testing)",
+            status="available", version="local",
+            config={"token_delay_ms": settings.FAKE_ENGINE_TOKEN_DELAY_MS},
+        )
 
     @classmethod
     def list_engines(cls) -> list[EngineInfo]:
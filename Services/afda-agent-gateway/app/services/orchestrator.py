@@ -1,73 +1,94 @@
 import time
 import uuid
-from typing import Optional, Dict, Any
+import json
+import logging
+from typing import Optional, Dict, Any, List, AsyncIterator
 from datetime import datetime
 from app.config import get_settings
 from app.database import get_mongo, get_redis
 from app.services.engine_registry import EngineRegistry
-from app.services.engine_n8n import N8nEngine
-from app.services.engine_langgraph import LangGraphEngine
-from app.services.engine_bedrock import BedrockEngine
+from app.services.conversation_store import ConversationStore
+from app.services.engine_pool import get_engine
 from app.models.agent_response import AgentChatResponse
 
+logger = logging.getLogger("afda-gateway")
 settings = get_settings()
 
-ENGINE_MAP = {
-    "n8n": N8nEngine,
-    "langgraph": LangGraphEngine,
-    "bedrock": BedrockEngine,
-}
+
+async def _publish(channel: str, event: dict) -> None:
+    """Best-effort fan-out to SSE listeners; a Redis hiccup must not break the chat turn."""
+    redis = get_redis()
+    if redis is None:
+        return
+    try:
+        await redis.publish(channel, json.dumps(event, default=str))
+    except Exception as e:
+        logger.warning(f"Stream publish to {channel} failed: {e}")
 
 
 class AgentOrchestrator:
     """Central orchestrator — routes messages to the correct engine."""
 
     @staticmethod
-    async def send_message(
+    async def stream_message(
         message: str,
         session_id: Optional[str] = None,
         engine: Optional[str] = None,
         agent_id: Optional[str] = None,
         context: Optional[Dict[str, Any]] = None,
-    ) -> AgentChatResponse:
+    ) -> AsyncIterator[dict]:
+        """Yield engine chunks as they arrive, then a final "done" chunk with the full response.
+
+        Token and step chunks are also published to `agent:stream:{session_id}`
+        for SSE listeners. The conversation and the execution log are written
+        once, from the accumulated tokens, after the engine finishes.
+        """
         start = time.time()
         session_id = session_id or str(uuid.uuid4())
         engine_name = EngineRegistry.resolve(engine)
-        engine_cls = ENGINE_MAP.get(engine_name, N8nEngine)
+        channel = f"agent:stream:{session_id}"
 
-        # Load conversation history from Mongo
+        # Load the tail of the conversation from Mongo
         mongo = get_mongo()
-        conv = await mongo.agent_conversations.find_one({"session_id": session_id})
-        history = conv.get("messages", []) if conv else []
+        store = ConversationStore(mongo)
+        history, _ = await store.load_recent(session_id, settings.CONVERSATION_HISTORY_MESSAGES)
 
-        # Send to engine
-        engine_instance = engine_cls()
-        result = await engine_instance.invoke(
+        # Stream from the engine
+        parts: List[str] = []
+        steps: List[dict] = []
+        result: dict = {}
+        first_token_ms = None
+        async for chunk in get_engine(engine_name).stream(
             message=message,
             history=history,
             agent_id=agent_id,
             context=context or {},
-        )
+        ):
+            if chunk["type"] == "done":
+                result = chunk
+                continue
+            if chunk["type"] == "token":
+                if first_token_ms is None:
+                    first_token_ms = round((time.time() - start) * 1000, 2)
+                parts.append(chunk["content"])
+            elif chunk["type"] == "step":
+                steps.append(chunk["step"])
+            event = {**chunk, "session_id": session_id}
+            await _publish(channel, event)
+            yield event
 
         latency = round((time.time() - start) * 1000, 2)
+        response = "".join(parts)
+        reply_agent = result.get("agent_id") or agent_id
 
         # Persist conversation
         now = datetime.utcnow()
         new_messages = [
             {"role": "user", "content": message, "timestamp": now.isoformat(), "agent_id": agent_id},
-            {"role": "assistant", "content": result["response"], "timestamp": now.isoformat(),
-             "agent_id": result.get("agent_id", agent_id)},
+            {"role": "assistant", "content": response, "timestamp": now.isoformat(), "agent_id": reply_agent},
         ]
 
-        await mongo.agent_conversations.update_one(
-            {"session_id": session_id},
-            {
-                "$push": {"messages": {"$each": new_messages}},
-                "$set": {"engine": engine_name, "updated_at": now},
-                "$setOnInsert": {"created_at": now},
-            },
-            upsert=True,
-        )
+        await store.append(session_id, new_messages, engine_name, now)
 
         # Log execution
         await mongo.agent_executions.insert_one({
@@ -78,32 +99,56 @@ class AgentOrchestrator:
             "started_at": now,
             "completed_at": datetime.utcnow(),
             "duration_ms": int(latency),
+            "first_token_ms": first_token_ms,
             "input_summary": message[:200],
-            "output_summary": result["response"][:200],
+            "output_summary": response[:200],
             "tokens_used": result.get("tokens_used"),
-            "trace": result.get("trace", []),
+            "trace": result.get("trace") or steps,
             "created_at": now,
         })
 
-        return AgentChatResponse(
+        done = AgentChatResponse(
             session_id=session_id,
-            message=result["response"],
-            agent_id=result.get("agent_id", agent_id),
+            message=response,
+            agent_id=reply_agent,
             engine_used=engine_name,
             tokens_used=result.get("tokens_used"),
             latency_ms=latency,
             metadata=result.get("metadata"),
-        )
+        ).model_dump(mode="json")
+        done["type"] = "done"
+        await _publish(channel, done)
+        yield done
+
+    @staticmethod
+    async def send_message(
+        message: str,
+        session_id: Optional[str] = None,
+        engine: Optional[str] = None,
+        agent_id: Optional[str] = None,
+        context: Optional[Dict[str, Any]] = None,
+    ) -> AgentChatResponse:
+        async for chunk in AgentOrchestrator.stream_message(message, session_id, engine, agent_id, context):
+            if chunk["type"] == "done":
+                return AgentChatResponse.model_validate(chunk)
 
     @staticmethod
     async def get_sessions(limit: int = 50):
         mongo = get_mongo()
         cursor = mongo.agent_conversations.find(
-            {}, {"session_id": 1, "engine": 1, "created_at": 1, "updated_at": 1}
+            {}, {"session_id": 1, "engine": 1, "message_count": 1, "legacy_count": 1, "created_at": 1, "updated_at": 1}
         ).sort("updated_at", -1).limit(limit)
         return await cursor.to_list(length=limit)
 
     @staticmethod
-    async def get_history(session_id: str):
+    async def get_history(session_id: str, limit: int = 100, before: Optional[int] = None):
+        """Session header plus one page of messages, newest page first; page back with `before`."""
         mongo = get_mongo()
-        return await mongo.agent_conversations.find_one({"session_id": session_id})
+        conv = await mongo.agent_conversations.find_one({"session_id": session_id}, {"messages": 0})
+        if not conv:
+            return None
+        messages, has_more = await ConversationStore(mongo).load_recent(session_id, limit, before)
+        conv["messages"] = messages
+        conv["has_more"] = has_more
+        conv["next_before"] = messages[0]["seq"] if has_more and messages else None
+        return conv
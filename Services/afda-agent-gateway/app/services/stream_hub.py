@@ -0,0 +1,100 @@
+import asyncio
+import logging
+from typing import Dict, Optional, Set
+from app.config import get_settings
+from app.database import get_redis
+
+logger = logging.getLogger("afda-gateway")
+settings = get_settings()
+
+
+class Listener:
+    """One SSE connection's bounded queue of raw message payloads."""
+
+    def __init__(self, size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=size)
+        self.overflowed = False
+
+    def offer(self, data: str) -> None:
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(data)
+        except asyncio.QueueFull:
+            # Dropping chunks would corrupt a token stream; cut the client off instead
+            self.overflowed = True
+
+
+class StreamHub:
+    """One Redis pub/sub connection per process, demultiplexed to SSE connections.
+
+    Channels are subscribed when their first listener arrives and dropped
+    with their last one. A single reader blocks on the connection and hands
+    each message straight to the listeners' queues, so events go out as soon
+    as Redis delivers them. If the connection drops, redis-py resubscribes
+    every channel when it reconnects.
+    """
+
+    def __init__(self):
+        self.pubsub = None
+        self.channels: Dict[str, Set[Listener]] = {}
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def subscribe(self, channel: str) -> Listener:
+        listener = Listener(settings.STREAM_CLIENT_QUEUE)
+        async with self._lock:
+            if self.pubsub is None:
+                self.pubsub = get_redis().pubsub()
+            listeners = self.channels.get(channel)
+            if listeners is None:
+                await self.pubsub.subscribe(channel)
+                listeners = self.channels[channel] = set()
+            listeners.add(listener)
+            if self._task is None or self._task.done():
+                self._task = asyncio.create_task(self._run(), name="stream-hub")
+        return listener
+
+    async def unsubscribe(self, channel: str, listener: Listener) -> None:
+        async with self._lock:
+            listeners = self.channels.get(channel)
+            if listeners is None:
+                return
+            listeners.discard(listener)
+            if not listeners:
+                del self.channels[channel]
+                try:
+                    await self.pubsub.unsubscribe(channel)
+                except Exception as e:
+                    logger.warning(f"Unsubscribe from {channel} failed: {e}")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.pubsub is not None:
+            await self.pubsub.aclose()
+            self.pubsub = None
+        self.channels.clear()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=None)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Stream hub read failed: {e}")
+                await asyncio.sleep(1.0)
+                continue
+            if not message or message["type"] != "message":
+                continue
+            for listener in list(self.channels.get(message["channel"], ())):
+                listener.offer(message["data"])
+
+
+stream_hub = StreamHub()
@@ -5,6 +5,8 @@ from prometheus_fastapi_instrumentator import Instrumentator
 
 from app.config import get_settings
 from app.database import connect_all, disconnect_all
+from app.services.engine_pool import start_engines, stop_engines
+from app.services.stream_hub import stream_hub
 from app.middleware.rate_limiter import RateLimiterMiddleware
 from app.middleware.metrics import MetricsMiddleware
 
@@ -20,7 +22,10 @@ settings = get_settings()
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await connect_all()
+    start_engines()
     yield
+    await stream_hub.stop()
+    await stop_engines()
     await disconnect_all()
 
 
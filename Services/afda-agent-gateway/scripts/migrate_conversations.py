@@ -0,0 +1,30 @@
+"""
+Move conversations stored as one unbounded `messages` array into bucket documents.
+Safe to rerun and to run while the gateway is serving; sessions it has not reached
+yet are converted on their next turn.
+Run: cd Services/afda-agent-gateway && python -m scripts.migrate_conversations
+"""
+import asyncio
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import database
+from app.database import connect_all, disconnect_all
+from app.services.conversation_store import ConversationStore
+
+
+async def migrate():
+    await connect_all()
+    mongo = database.get_mongo()
+    store = ConversationStore(mongo)
+    sessions = moved = 0
+    cursor = mongo.agent_conversations.find({"messages": {"$exists": True}}, {"session_id": 1, "messages": 1})
+    async for header in cursor.batch_size(50):
+        moved += await store.convert_legacy(header["session_id"], header)
+        sessions += 1
+        if sessions % 1000 == 0:
+            print(f"  … {sessions} sessions, {moved} messages")
+    print(f"✅ Migrated {sessions} conversations ({moved} messages) into buckets")
+    await disconnect_all()
+
+asyncio.run(migrate())
@@ -51,6 +51,48 @@ class Settings(BaseSettings):
     def REDIS_URL(self) -> str:
         return f"redis://{self.REDIS_HOST}:{self.REDIS_PORT}/{self.REDIS_DB}"
 
+    # Response cache
+    CACHE_ENABLED: bool = True
+
+    # Background jobs
+    METRICS_ROLLUP_INTERVAL_SECONDS: int = 60
+
+    # Service health prober
+    HEALTH_PROBE_ENABLED: bool = True
+    HEALTH_PROBE_INTERVAL_SECONDS: int = 10
+    HEALTH_PROBE_TIMEOUT_SECONDS: float = 2.0
+    HEALTH_PROBE_CONCURRENCY: int = 100
+    HEALTH_PROBE_DEGRADED_MS: int = 1_000
+    HEALTH_PROBE_WINDOW: int = 8_640  # probes kept for rolling uptime (24h at 10s)
+
+    # Anomaly detection
+    ANOMALY_INGEST_INTERVAL_SECONDS: int = 60
+    ANOMALY_INGEST_BATCH_ROWS: int = 50_000
+    ANOMALY_CHECKPOINT_SECONDS: int = 300
+    ANOMALY_MAX_SERIES: int = 1_000_000  # new series beyond this are scored 0 and not tracked
+    ANOMALY_SERIES_IDLE_DAYS: int = 90  # series not observed for this long are dropped at checkpoint
+
+    # Alert push stream (Redis Stream fanned out over SSE)
+    ALERT_STREAM_MAXLEN: int = 10_000  # entries kept for Last-Event-ID replay
+    ALERT_STREAM_CLIENT_QUEUE: int = 1_000  # buffered events before a slow client is cut off
+
+    # Risk scoring
+    RISK_SCORING_INTERVAL_SECONDS: int = 900
+    RISK_SCORING_LOOKBACK_DAYS: int = 90  # incident window
+    RISK_VARIANCE_PERIODS: int = 3  # latest budget periods in the variance profile
+
+    # API metrics retention
+    METRICS_RAW_RETENTION_HOURS: int = 24
+    METRICS_MINUTE_RETENTION_HOURS: int = 48
+    METRICS_HOUR_RETENTION_DAYS: int = 14
+    METRICS_RETENTION_DAYS: int = 90
+
+    # API metrics recorder
+    METRICS_RECORDER_ENABLED: bool = True
+    METRICS_BUFFER_CAPACITY: int = 50_000
+    METRICS_FLUSH_ROWS: int = 2_000
+    METRICS_FLUSH_INTERVAL_MS: int = 1_000
+
     # JWT
     JWT_SECRET: str = "change-me-in-production"
     JWT_ALGORITHM: str = "HS256"
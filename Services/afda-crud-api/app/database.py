@@ -1,3 +1,5 @@
+import asyncio
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import DeclarativeBase
 from motor.motor_asyncio import AsyncIOMotorClient
@@ -23,6 +25,27 @@ async def get_db() -> AsyncSession:
             await session.close()
 
 
+async def run_concurrently(*calls):
+    """Run independent read calls side by side, each on its own pooled session.
+
+    A single AsyncSession cannot run statements concurrently, so every call
+    receives a fresh session: ``await run_concurrently(lambda db: DAO(db).x(), ...)``.
+    """
+    async def run(call):
+        async with AsyncSessionLocal() as session:
+            return await call(session)
+    return await asyncio.gather(*(run(call) for call in calls))
+
+
+async def copy_records(session: AsyncSession, table: str, columns: list, records: list) -> None:
+    """COPY rows through the session's asyncpg connection, inside its transaction."""
+    conn = await session.connection()
+    # asyncpg transactions are opened lazily by the first statement on the connection
+    await conn.execute(text("SELECT 1"))
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(table, records=records, columns=columns)
+
+
 # ── MongoDB ──
 mongo_client: AsyncIOMotorClient = None
 mongo_db = None
@@ -49,7 +72,7 @@ async def connect_all():
     # Ensure indexes (graceful — don't block startup if DB is unavailable)
     try:
         await mongo_db.agent_conversations.create_index("session_id")
-        await mongo_db.agent_executions.create_index([("created_at", -1)])
+        await mongo_db.agent_executions.create_index([("created_at", -1), ("_id", -1)])
         await mongo_db.workflow_definitions.create_index("name")
     except Exception as e:
         import logging
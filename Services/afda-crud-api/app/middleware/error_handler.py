@@ -13,6 +13,7 @@ class ErrorHandlerMiddleware(BaseHTTPMiddleware):
             return await call_next(request)
         except Exception as exc:
             logger.error(f"Unhandled error: {exc}\n{traceback.format_exc()}")
+            request.state.error = str(exc)[:1000]  # picked up by ApiMetricsMiddleware
             return JSONResponse(
                 status_code=500,
                 content={"success": False, "message": "Internal server error", "data": None},
@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Optional
+from app.config import get_settings
+from app.database import AsyncSessionLocal
+from app.modules.monitoring.dao import ApiMetricsDAO
+
+logger = logging.getLogger("afda")
+settings = get_settings()
+
+UNMATCHED_ENDPOINT = "<unmatched>"
+
+
+class ApiMetricsRecorder:
+    """Write-behind buffer for api_metrics_log.
+
+    Requests only append a tuple to a bounded deque; a single background task
+    drains it in batches of up to `batch_rows` via COPY, waking every
+    `flush_interval_ms` or as soon as a full batch is waiting. When Postgres falls
+    behind the buffer stops growing at `capacity` and further rows are counted as
+    dropped instead of queued; a failed batch is dropped and counted as well.
+    """
+
+    def __init__(self, capacity: int, batch_rows: int, flush_interval_ms: int):
+        self.capacity = capacity
+        self.batch_rows = batch_rows
+        self.flush_interval = flush_interval_ms / 1000
+        self.recorded = 0
+        self.dropped_full = 0
+        self.dropped_failed = 0
+        self.flushed = 0
+        self.flush_errors = 0
+        self.last_flush_ms = 0.0
+        self._buffer: deque = deque()
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, row: tuple) -> None:
+        if len(self._buffer) >= self.capacity:
+            self.dropped_full += 1
+            return
+        self._buffer.append(row)
+        self.recorded += 1
+        if self._wake is not None and len(self._buffer) >= self.batch_rows:
+            self._wake.set()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run(), name="api-metrics-recorder")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._wake = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        while self._buffer:
+            size = min(len(self._buffer), self.batch_rows)
+            popleft = self._buffer.popleft
+            batch = [(uuid.uuid4(), *popleft()) for _ in range(size)]
+            start = time.perf_counter()
+            try:
+                async with AsyncSessionLocal() as session:
+                    self.flushed += await ApiMetricsDAO(session).insert_batch(batch)
+            except asyncio.CancelledError:
+                self.dropped_failed += size
+                raise
+            except Exception as e:
+                self.flush_errors += 1
+                self.dropped_failed += size
+                logger.warning(f"API metrics flush of {size} rows failed: {e}")
+            self.last_flush_ms = round((time.perf_counter() - start) * 1000, 2)
+            if size < self.batch_rows:
+                break
+
+    def stats(self) -> dict:
+        return {
+            "buffered": len(self._buffer),
+            "capacity": self.capacity,
+            "recorded": self.recorded,
+            "flushed": self.flushed,
+            "dropped_buffer_full": self.dropped_full,
+            "dropped_flush_failed": self.dropped_failed,
+            "flush_errors": self.flush_errors,
+            "last_flush_ms": self.last_flush_ms,
+        }
+
+
+metrics_recorder = ApiMetricsRecorder(
+    capacity=settings.METRICS_BUFFER_CAPACITY,
+    batch_rows=settings.METRICS_FLUSH_ROWS,
+    flush_interval_ms=settings.METRICS_FLUSH_INTERVAL_MS,
+)
+
+
+class ApiMetricsMiddleware:
+    """Pure ASGI middleware that hands one row per API request to the recorder.
+
+    The endpoint is the matched route template (e.g. /alerts/{alert_id}) so rows
+    aggregate per route; user_id is whatever authentication left in request.state,
+    and error_message is what ErrorHandlerMiddleware (which runs inside this
+    one and turns exceptions into 500s) left there as `error`.
+    Request size is the bytes read, or Content-Length if the body went unread.
+    """
+
+    def __init__(self, app, recorder: ApiMetricsRecorder = metrics_recorder, prefix: str = settings.API_PREFIX):
+        self.app = app
+        self.recorder = recorder
+        self.prefix = prefix
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        sizes = [0, 0]
+        status = [500]
+        declared = 0
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                declared = int(value) if value.isdigit() else 0
+                break
+
+        async def receive_counted():
+            message = await receive()
+            sizes[0] += len(message.get("body", b""))
+            return message
+
+        async def send_counted(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            elif message["type"] == "http.response.body":
+                sizes[1] += len(message.get("body", b""))
+            await send(message)
+
+        error = None
+        try:
+            await self.app(scope, receive_counted, send_counted)
+        except Exception as e:
+            error = str(e)[:1000]
+            raise
+        finally:
+            route = scope.get("route")
+            state = scope.get("state") or {}
+            self.recorder.record((
+                route.path if route is not None else UNMATCHED_ENDPOINT,
+                scope["method"],
+                status[0],
+                round((time.perf_counter() - start) * 1000, 3),
+                max(declared, sizes[0]),
+                sizes[1],
+                state.get("user_id"),
+                error or state.get("error"),
+                datetime.utcnow(),
+            ))
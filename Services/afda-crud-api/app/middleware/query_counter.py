@@ -0,0 +1,31 @@
+from contextvars import ContextVar
+from typing import Optional
+from fastapi import Request
+from sqlalchemy import event
+from starlette.middleware.base import BaseHTTPMiddleware
+from app.database import engine
+
+# Holds a one-element list so tasks spawned during the request (which copy the
+# context) still increment the same counter.
+_query_count: ContextVar[Optional[list]] = ContextVar("db_query_count", default=None)
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    counter = _query_count.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+class QueryCountMiddleware(BaseHTTPMiddleware):
+    """Reports the number of SQL statements a request issued in X-DB-Query-Count."""
+
+    async def dispatch(self, request: Request, call_next):
+        counter = [0]
+        token = _query_count.set(counter)
+        try:
+            response = await call_next(request)
+        finally:
+            _query_count.reset(token)
+        response.headers["X-DB-Query-Count"] = str(counter[0])
+        return response
@@ -0,0 +1,195 @@
+import csv
+import json
+import math
+import uuid
+from datetime import date
+from typing import AsyncIterator, List, Optional
+
+MAX_REPORTED_ERRORS = 1000
+MAX_CSV_RECORD = 1 << 20  # a quoted field left open longer than this is rejected
+
+# Column limits mirror journal_entries / journal_lines
+FIELD_LIMITS = {
+    "entry_number": 50,
+    "source": 50,
+    "account_code": 20,
+    "account_name": 200,
+    "description": 500,
+}
+
+
+class RowError(ValueError):
+    pass
+
+
+def _text(row: dict, field: str, required: bool = False) -> Optional[str]:
+    value = row.get(field)
+    value = str(value).strip() if value is not None else ""
+    if not value:
+        if required:
+            raise RowError(f"{field} is required")
+        return None
+    limit = FIELD_LIMITS.get(field)
+    if limit and len(value) > limit:
+        raise RowError(f"{field} exceeds {limit} characters")
+    return value
+
+
+def _amount(row: dict, field: str) -> float:
+    value = row.get(field)
+    if value is None or value == "":
+        return 0.0
+    try:
+        amount = float(value)
+    except (TypeError, ValueError):
+        raise RowError(f"{field} is not a number: {value!r}")
+    if not math.isfinite(amount) or amount < 0:
+        raise RowError(f"{field} must be a finite non-negative number")
+    return amount
+
+
+class JournalImportParser:
+    """Streams flat journal lines (NDJSON or CSV) and groups them into entries.
+
+    Each record is one line: entry_number, entry_date, entry_description, source,
+    account_code, account_name, debit, credit, description. Lines of an entry must
+    be contiguous, so only the entry being assembled is held in memory. Invalid
+    entries are dropped and reported in `errors`; valid ones are yielded.
+    """
+
+    def __init__(self, fmt: str, default_source: str = "import"):
+        self.fmt = fmt
+        self.default_source = default_source
+        self.rows_read = 0
+        self.rejected = 0
+        self.errors: List[dict] = []
+        self._seen = set()
+        self._current: Optional[dict] = None
+
+    def reject(self, entry_number: Optional[str], row: int, message: str):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"entry_number": entry_number, "row": row, "error": message})
+
+    async def _lines(self, chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+        buffer = b""
+        first = True
+        async for chunk in chunks:
+            buffer += chunk
+            *complete, buffer = buffer.split(b"\n")
+            for raw in complete:
+                yield raw.decode("utf-8-sig" if first else "utf-8")
+                first = False
+        if buffer.strip():
+            yield buffer.decode("utf-8-sig" if first else "utf-8")
+
+    async def _rows(self, chunks: AsyncIterator[bytes]) -> AsyncIterator[Optional[dict]]:
+        header = None
+        pending = ""  # CSV record whose quoted field continues on the next line
+        async for line in self._lines(chunks):
+            line = line.rstrip("\r")
+            if self.fmt == "csv":
+                record = pending + line
+                if record.count('"') % 2:
+                    if len(record) > MAX_CSV_RECORD:
+                        self.rows_read += 1
+                        self.reject(None, self.rows_read, "unterminated quoted field")
+                        yield None
+                        pending = ""
+                    else:
+                        pending = record + "\n"
+                    continue
+                pending = ""
+                if not record.strip():
+                    continue
+                values = next(csv.reader([record]))
+                if header is None:
+                    header = [h.strip() for h in values]
+                    continue
+                self.rows_read += 1
+                yield dict(zip(header, values))
+            else:
+                if not line.strip():
+                    continue
+                self.rows_read += 1
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    self.reject(None, self.rows_read, f"invalid JSON: {e}")
+                    yield None
+                    continue
+                if not isinstance(record, dict):
+                    self.reject(None, self.rows_read, "record must be a JSON object")
+                    yield None
+                    continue
+                yield record
+        if pending:
+            self.rows_read += 1
+            self.reject(None, self.rows_read, "unterminated quoted field")
+
+    def _start(self, entry_number: str, row: dict, row_num: int) -> dict:
+        entry = {"entry_number": entry_number, "row": row_num, "error": None, "lines": []}
+        if entry_number in self._seen:
+            entry["error"] = "duplicate or non-contiguous entry_number"
+            return entry
+        self._seen.add(entry_number)
+        try:
+            raw_date = _text(row, "entry_date", required=True)
+            try:
+                entry["entry_date"] = date.fromisoformat(raw_date)
+            except ValueError:
+                raise RowError(f"entry_date is not an ISO date: {raw_date!r}")
+            entry["description"] = _text(row, "entry_description")
+            entry["source"] = _text(row, "source") or self.default_source
+        except RowError as e:
+            entry["error"] = str(e)
+        return entry
+
+    def _finish(self, entry: Optional[dict]) -> Optional[dict]:
+        if entry is None:
+            return None
+        if entry["error"] is None:
+            total_debit = sum(l[2] for l in entry["lines"])
+            total_credit = sum(l[3] for l in entry["lines"])
+            if not entry["lines"]:
+                entry["error"] = "entry has no lines"
+            elif abs(total_debit - total_credit) > 0.01:
+                entry["error"] = f"Entry unbalanced: debits ({total_debit}) != credits ({total_credit})"
+        if entry["error"] is not None:
+            self.reject(entry["entry_number"], entry["row"], entry["error"])
+            return None
+        entry["id"] = uuid.uuid4()
+        return entry
+
+    async def entries(self, chunks: AsyncIterator[bytes]) -> AsyncIterator[dict]:
+        async for row in self._rows(chunks):
+            row_num = self.rows_read
+            if row is None:
+                continue
+            try:
+                entry_number = _text(row, "entry_number", required=True)
+            except RowError as e:
+                self.reject(None, row_num, str(e))
+                continue
+            if self._current is None or self._current["entry_number"] != entry_number:
+                done = self._finish(self._current)
+                if done:
+                    yield done
+                self._current = self._start(entry_number, row, row_num)
+            entry = self._current
+            if entry["error"] is not None:
+                continue
+            try:
+                entry["lines"].append((
+                    _text(row, "account_code", required=True),
+                    _text(row, "account_name", required=True),
+                    _amount(row, "debit"),
+                    _amount(row, "credit"),
+                    _text(row, "description"),
+                ))
+            except RowError as e:
+                entry["error"] = f"row {row_num}: {e}"
+        done = self._finish(self._current)
+        self._current = None
+        if done:
+            yield done
@@ -1,24 +1,129 @@
+import time
+import uuid
+from datetime import date, datetime
 from uuid import UUID
-from typing import Optional, List
-from sqlalchemy import select, func, update, delete
+from typing import AsyncIterator, Optional, List, Tuple
+import numpy as np
+from sqlalchemy import (
+    select, func, update, delete, insert, values, column, text, case, cast, any_, bindparam, Numeric, String,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
+from app.database import copy_records
+from app.shared.pagination import keyset_paginate, cursor_page
 from app.modules.accounting.models import (
-    JournalEntry, JournalLine, TrialBalance, IntercompanyTransaction,
+    ChartOfAccount, JournalEntry, JournalEntryStatus, JournalLine, AccountBalance, IntercompanyTransaction,
     Reconciliation, ReconItem, ClosePeriod, CloseTask,
 )
+from app.modules.accounting.hierarchy import (
+    AccountHierarchy, cached_hierarchy, current_generation, store_hierarchy, invalidate_hierarchy,
+)
+from app.modules.accounting.matching import IntercompanyMatcher
+from app.modules.accounting.reconciliation_engine import NO_DATE, RULE_NAMES
+from app.modules.fpa.models import BudgetLineItem, VarianceRecord
+
+BALANCE_BACKFILL_LOCK_ID = 0x4146_4441_0003  # pg advisory lock key for the one-off balance backfill
+
+
+class ChartOfAccountDAO:
+    ROLLUP_MEASURES = {
+        "trial_balance": ("debit", "credit", "net"),
+        "variance": ("budgeted", "actual", "variance"),
+        "budget": ("budgeted", "actual", "variance"),
+    }
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_all(self, category: Optional[str] = None, active_only: bool = False) -> List[ChartOfAccount]:
+        q = select(ChartOfAccount)
+        if category:
+            q = q.where(ChartOfAccount.category == category)
+        if active_only:
+            q = q.where(ChartOfAccount.is_active.is_(True))
+        result = await self.db.execute(q.order_by(ChartOfAccount.account_code))
+        return list(result.scalars().all())
+
+    async def get_by_code(self, account_code: str) -> Optional[ChartOfAccount]:
+        result = await self.db.execute(select(ChartOfAccount).where(ChartOfAccount.account_code == account_code))
+        return result.scalar_one_or_none()
+
+    async def create(self, data: dict) -> ChartOfAccount:
+        account = ChartOfAccount(**data)
+        self.db.add(account)
+        await self.db.commit()
+        await self.db.refresh(account)
+        invalidate_hierarchy()
+        return account
+
+    async def update(self, account_code: str, data: dict) -> Optional[ChartOfAccount]:
+        await self.db.execute(
+            update(ChartOfAccount).where(ChartOfAccount.account_code == account_code).values(**data)
+        )
+        await self.db.commit()
+        invalidate_hierarchy()
+        return await self.get_by_code(account_code)
+
+    async def get_hierarchy(self) -> AccountHierarchy:
+        hierarchy = cached_hierarchy()
+        if hierarchy is None:
+            generation = current_generation()
+            result = await self.db.execute(select(
+                ChartOfAccount.account_code, ChartOfAccount.account_name,
+                ChartOfAccount.category, ChartOfAccount.parent_code,
+            ))
+            hierarchy = AccountHierarchy([
+                (code, name, category.value, parent) for code, name, category, parent in result.all()
+            ])
+            store_hierarchy(hierarchy, generation)
+        return hierarchy
+
+    async def get_rollup_source(self, source: str, period: Optional[str] = None) -> Tuple[list, np.ndarray]:
+        """Per-account measures for a rollup source, aggregated in SQL."""
+        if source == "trial_balance":
+            code = AccountBalance.account_code
+            debit = func.sum(AccountBalance.debit_total)
+            credit = func.sum(AccountBalance.credit_total)
+            q = select(code, debit, credit, debit - credit)
+            if period:
+                q = q.where(AccountBalance.period == period)
+        elif source == "variance":
+            code = VarianceRecord.account_code
+            q = select(
+                code, func.sum(VarianceRecord.budgeted), func.sum(VarianceRecord.actual),
+                func.sum(VarianceRecord.variance_amount),
+            )
+            if period:
+                q = q.where(VarianceRecord.period == period)
+        else:
+            code = BudgetLineItem.account_code
+            budgeted = func.sum(BudgetLineItem.budgeted_amount)
+            actual = func.sum(BudgetLineItem.actual_amount)
+            q = select(code, budgeted, actual, actual - budgeted)
+            if period:
+                q = q.where(BudgetLineItem.period == period)
+        result = await self.db.execute(q.group_by(code))
+        rows = result.all()
+        codes = [r[0] for r in rows]
+        measures = np.array([r[1:] for r in rows], dtype=np.float64).reshape(len(rows), 3)
+        return codes, np.nan_to_num(measures)
 
 
 class JournalEntryDAO:
     def __init__(self, db: AsyncSession):
         self.db = db
 
-    async def get_all(self, status: Optional[str] = None, limit: int = 50, offset: int = 0) -> List[JournalEntry]:
+    async def get_all(self, status: Optional[str] = None, limit: int = 50, offset: int = 0,
+                      cursor: Optional[str] = None) -> dict:
         q = select(JournalEntry)
         if status:
             q = q.where(JournalEntry.status == status)
-        result = await self.db.execute(q.order_by(JournalEntry.entry_date.desc()).offset(offset).limit(limit))
-        return list(result.scalars().all())
+        q = keyset_paginate(q, JournalEntry.entry_date, JournalEntry.id, cursor, limit)
+        result = await self.db.execute(q if cursor else q.offset(offset))
+        return cursor_page(list(result.scalars().all()), limit, "entry_date")
 
     async def get_by_id(self, entry_id: UUID) -> Optional[JournalEntry]:
         result = await self.db.execute(
@@ -32,46 +137,239 @@ class JournalEntryDAO:
         await self.db.flush()
         for line in lines_data:
             self.db.add(JournalLine(**line, entry_id=entry.id))
+        await AccountBalanceDAO(self.db).apply_lines(period_of(entry.entry_date), lines_data)
         await self.db.commit()
         await self.db.refresh(entry)
         return await self.get_by_id(entry.id)
 
+    async def existing_numbers(self, entry_numbers: List[str]) -> set:
+        result = await self.db.execute(
+            select(JournalEntry.entry_number).where(
+                JournalEntry.entry_number == any_(bindparam("numbers", entry_numbers, type_=ARRAY(String)))
+            )
+        )
+        return set(result.scalars().all())
+
+    async def bulk_insert(self, entries: list, created_by: Optional[str] = None) -> int:
+        """COPY pre-validated entries and their lines, then fold them into account_balances."""
+        now = datetime.utcnow()
+        entry_records, line_records = [], []
+        totals: dict = {}
+        for e in entries:
+            entry_records.append((
+                e["id"], e["entry_number"], e["entry_date"], e["description"],
+                JournalEntryStatus.POSTED.name, e["source"], created_by, now, now,
+            ))
+            period = period_of(e["entry_date"])
+            for account_code, account_name, debit, credit, description in e["lines"]:
+                line_records.append((uuid.uuid4(), e["id"], account_code, account_name, debit, credit, description))
+                t = totals.setdefault((period, account_code), {
+                    "period": period, "account_code": account_code, "account_name": account_name,
+                    "debit_total": 0.0, "credit_total": 0.0, "line_count": 0,
+                })
+                t["debit_total"] += debit
+                t["credit_total"] += credit
+                t["line_count"] += 1
+        await copy_records(self.db, "journal_entries", [
+            "id", "entry_number", "entry_date", "description", "status", "source",
+            "created_by", "posted_at", "created_at",
+        ], entry_records)
+        await copy_records(self.db, "journal_lines", [
+            "id", "entry_id", "account_code", "account_name", "debit", "credit", "description",
+        ], line_records)
+        await AccountBalanceDAO(self.db).apply_deltas(list(totals.values()))
+        await self.db.commit()
+        return len(line_records)
+
+
+def period_of(entry_date: date) -> str:
+    return entry_date.strftime("%Y-%m")
+
+
+class AccountBalanceDAO:
+    UPSERT_CHUNK_SIZE = 2_000
 
-class TrialBalanceDAO:
     def __init__(self, db: AsyncSession):
         self.db = db
 
-    async def get_by_period(self, period: str) -> List[TrialBalance]:
+    async def apply_deltas(self, deltas: list) -> None:
+        """Upsert-add pre-aggregated deltas; caller owns the transaction."""
+        # Multi-row VALUES binds 7 params per row; stay well under the 32767 limit
+        for i in range(0, len(deltas), self.UPSERT_CHUNK_SIZE):
+            stmt = pg_insert(AccountBalance).values([
+                {"id": uuid.uuid4(), **d} for d in deltas[i:i + self.UPSERT_CHUNK_SIZE]
+            ])
+            await self.db.execute(stmt.on_conflict_do_update(
+                constraint="uq_account_balances_period_account",
+                set_={
+                    "account_name": stmt.excluded.account_name,
+                    "debit_total": AccountBalance.debit_total + stmt.excluded.debit_total,
+                    "credit_total": AccountBalance.credit_total + stmt.excluded.credit_total,
+                    "line_count": AccountBalance.line_count + stmt.excluded.line_count,
+                    "updated_at": datetime.utcnow(),
+                },
+            ))
+
+    async def apply_lines(self, period: str, lines: list) -> None:
+        totals: dict = {}
+        for line in lines:
+            t = totals.setdefault(line["account_code"], {
+                "period": period, "account_code": line["account_code"], "account_name": line["account_name"],
+                "debit_total": 0.0, "credit_total": 0.0, "line_count": 0,
+            })
+            t["debit_total"] += line.get("debit") or 0.0
+            t["credit_total"] += line.get("credit") or 0.0
+            t["line_count"] += 1
+        await self.apply_deltas(list(totals.values()))
+
+    async def rebuild(self) -> int:
+        """Recompute every balance from journal lines in one set-based pass."""
+        period = func.to_char(JournalEntry.entry_date, "YYYY-MM")
+        source = (
+            select(
+                func.gen_random_uuid(),
+                period,
+                JournalLine.account_code,
+                func.max(JournalLine.account_name),
+                func.coalesce(func.sum(JournalLine.debit), 0.0),
+                func.coalesce(func.sum(JournalLine.credit), 0.0),
+                func.count(),
+                func.now(),
+            )
+            .join(JournalEntry, JournalEntry.id == JournalLine.entry_id)
+            .where(JournalEntry.status != JournalEntryStatus.REVERSED)
+            .group_by(period, JournalLine.account_code)
+        )
+        await self.db.execute(delete(AccountBalance))
         result = await self.db.execute(
-            select(TrialBalance).where(TrialBalance.period == period).order_by(TrialBalance.account_code)
+            insert(AccountBalance).from_select(
+                ["id", "period", "account_code", "account_name", "debit_total", "credit_total",
+                 "line_count", "updated_at"],
+                source,
+            )
         )
-        return list(result.scalars().all())
+        await self.db.commit()
+        return result.rowcount
+
+    async def backfill(self) -> int:
+        """Rebuild once if account_balances is empty but journal lines exist (a database that predates it).
+
+        One worker rebuilds under an advisory lock; the others skip it, or find the table filled.
+        """
+        locked = await self.db.scalar(select(func.pg_try_advisory_xact_lock(BALANCE_BACKFILL_LOCK_ID)))
+        if locked:
+            filled = await self.db.scalar(select(AccountBalance.id).limit(1)) is not None
+            has_source = await self.db.scalar(select(JournalLine.id).limit(1)) is not None
+            if has_source and not filled:
+                return await self.rebuild()  # commits, releasing the lock
+        await self.db.rollback()
+        return 0
+
+    async def get_by_period(self, period: str) -> list:
+        result = await self.db.execute(
+            select(
+                AccountBalance.id,
+                AccountBalance.period,
+                AccountBalance.account_code,
+                func.coalesce(ChartOfAccount.account_name, AccountBalance.account_name).label("account_name"),
+                ChartOfAccount.category,
+                AccountBalance.debit_total,
+                AccountBalance.credit_total,
+            )
+            .outerjoin(ChartOfAccount, ChartOfAccount.account_code == AccountBalance.account_code)
+            .where(AccountBalance.period == period)
+            .order_by(AccountBalance.account_code)
+        )
+        return [
+            {
+                "id": r.id,
+                "period": r.period,
+                "account_code": r.account_code,
+                "account_name": r.account_name,
+                "category": r.category.value if r.category else "unmapped",
+                "debit_balance": r.debit_total,
+                "credit_balance": r.credit_total,
+                "net_balance": round(r.debit_total - r.credit_total, 2),
+            }
+            for r in result.all()
+        ]
+
+
+class TrialBalanceDAO:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.balances = AccountBalanceDAO(db)
+
+    async def get_by_period(self, period: str) -> list:
+        return await self.balances.get_by_period(period)
+
+    def _comparison_query(self, base_period: str, compare_periods: List[str]):
+        """Pivot N periods into columns with one GROUP BY scan of the balance ledger."""
+        periods = [base_period, *compare_periods]
+        net = AccountBalance.debit_total - AccountBalance.credit_total
+        pivot = (
+            select(
+                AccountBalance.account_code,
+                func.max(AccountBalance.account_name).label("account_name"),
+                *[
+                    func.coalesce(func.sum(net).filter(AccountBalance.period == p), 0.0).label(f"b{i}")
+                    for i, p in enumerate(periods)
+                ],
+            )
+            .where(AccountBalance.period.in_(periods))
+            .group_by(AccountBalance.account_code)
+            .subquery("pivot")
+        )
+        base = pivot.c.b0
+        columns = [
+            pivot.c.account_code,
+            func.coalesce(ChartOfAccount.account_name, pivot.c.account_name).label("account_name"),
+            ChartOfAccount.category,
+            base.label("balance"),
+        ]
+        for i in range(1, len(periods)):
+            prior = pivot.c[f"b{i}"]
+            change = base - prior
+            columns += [
+                prior.label(f"balance_{i}"),
+                change.label(f"change_{i}"),
+                case(
+                    (prior != 0, func.round(cast(change / prior * 100, Numeric), 2)),
+                    else_=0,
+                ).label(f"change_pct_{i}"),
+            ]
+        return (
+            select(*columns)
+            .outerjoin(ChartOfAccount, ChartOfAccount.account_code == pivot.c.account_code)
+            .order_by(pivot.c.account_code)
+        )
+
+    async def stream_comparison(self, base_period: str, compare_periods: List[str]) -> AsyncIterator:
+        q = self._comparison_query(base_period, compare_periods).execution_options(yield_per=1000)
+        result = await self.db.stream(q)
+        async for row in result:
+            yield row
 
     async def get_comparison(self, period1: str, period2: str) -> list:
-        tb1 = {r.account_code: r for r in await self.get_by_period(period1)}
-        tb2 = {r.account_code: r for r in await self.get_by_period(period2)}
-        all_codes = sorted(set(list(tb1.keys()) + list(tb2.keys())))
-        comparison = []
-        for code in all_codes:
-            r1 = tb1.get(code)
-            r2 = tb2.get(code)
-            b1 = r1.net_balance if r1 else 0
-            b2 = r2.net_balance if r2 else 0
-            change = b2 - b1
-            pct = round((change / b1) * 100, 2) if b1 != 0 else 0
-            comparison.append({
-                "account_code": code,
-                "account_name": (r1 or r2).account_name,
-                "category": (r1 or r2).category,
-                "period_1_balance": b1,
-                "period_2_balance": b2,
-                "change": change,
-                "change_pct": pct,
-            })
-        return comparison
+        result = await self.db.execute(self._comparison_query(period2, [period1]))
+        return [
+            {
+                "account_code": r.account_code,
+                "account_name": r.account_name,
+                "category": r.category.value if r.category else "unmapped",
+                "period_1_balance": r.balance_1,
+                "period_2_balance": r.balance,
+                "change": r.change_1,
+                "change_pct": float(r.change_pct_1),
+            }
+            for r in result.all()
+        ]
 
 
 class IntercompanyDAO:
+    # Two bind params per row; keeps each statement well under asyncpg's 32767 limit
+    UPDATE_CHUNK_SIZE = 10_000
+
     def __init__(self, db: AsyncSession):
         self.db = db
 
@@ -82,30 +380,78 @@ class IntercompanyDAO:
         result = await self.db.execute(q.order_by(IntercompanyTransaction.transaction_date.desc()))
         return list(result.scalars().all())
 
-    async def auto_match(self) -> dict:
-        pending = await self.get_all(status="pending")
-        matched = 0
-        for i, t1 in enumerate(pending):
-            for t2 in pending[i + 1:]:
-                if (t1.from_entity == t2.to_entity and t1.to_entity == t2.from_entity
-                        and abs(t1.amount - t2.amount) < 0.01 and t1.matched_with_id is None):
-                    await self.db.execute(
-                        update(IntercompanyTransaction).where(IntercompanyTransaction.id == t1.id)
-                            .values(status="matched", matched_with_id=t2.id)
-                    )
-                    await self.db.execute(
-                        update(IntercompanyTransaction).where(IntercompanyTransaction.id == t2.id)
-                            .values(status="matched", matched_with_id=t1.id)
+    async def auto_match(self, amount_tolerance: float = 0.01,
+                         date_tolerance_days: Optional[int] = None) -> dict:
+        start = time.perf_counter()
+        result = await self.db.execute(
+            select(
+                IntercompanyTransaction.id,
+                IntercompanyTransaction.from_entity,
+                IntercompanyTransaction.to_entity,
+                IntercompanyTransaction.amount,
+                IntercompanyTransaction.currency,
+                IntercompanyTransaction.transaction_date,
+            ).where(
+                IntercompanyTransaction.status == "pending",
+                IntercompanyTransaction.matched_with_id.is_(None),
+            ).with_for_update(skip_locked=True)
+        )
+        pending = [tuple(row) for row in result.all()]
+        matcher = IntercompanyMatcher(amount_tolerance, date_tolerance_days)
+        outcome = matcher.match(pending)
+
+        updated = 0
+        rows = outcome["pairs"] + [(b, a) for a, b in outcome["pairs"]]
+        for i in range(0, len(rows), self.UPDATE_CHUNK_SIZE):
+            chunk = values(
+                column("id", PG_UUID(as_uuid=True)),
+                column("matched_with_id", PG_UUID(as_uuid=True)),
+                name="matches",
+            ).data(rows[i:i + self.UPDATE_CHUNK_SIZE])
+            res = await self.db.execute(
+                update(IntercompanyTransaction)
+                    .where(
+                        IntercompanyTransaction.id == chunk.c.id,
+                        IntercompanyTransaction.status == "pending",
                     )
-                    matched += 1
+                    .values(status="matched", matched_with_id=chunk.c.matched_with_id)
+                    .execution_options(synchronize_session=False)
+            )
+            updated += res.rowcount
         await self.db.commit()
-        return {"matched_pairs": matched, "total_pending": len(pending)}
+
+        elapsed = time.perf_counter() - start
+        return {
+            "matched_pairs": len(outcome["pairs"]),
+            "total_pending": len(pending),
+            "rows_updated": updated,
+            "match_ms": outcome["elapsed_ms"],
+            "total_ms": round(elapsed * 1000, 2),
+            "rows_per_sec": round(len(pending) / elapsed, 2) if elapsed > 0 else 0.0,
+        }
 
 
 class ReconciliationDAO:
+    # Rows per unnest() UPDATE; bounds the size of each array parameter
+    WRITE_CHUNK_SIZE = 250_000
+
     def __init__(self, db: AsyncSession):
         self.db = db
 
+    async def upgrade_schema(self) -> None:
+        """Add the matching columns and index to a recon_items table created before them; idempotent."""
+        await self.db.execute(text(
+            "ALTER TABLE recon_items"
+            " ADD COLUMN IF NOT EXISTS source_date DATE,"
+            " ADD COLUMN IF NOT EXISTS target_date DATE,"
+            " ADD COLUMN IF NOT EXISTS matched_item_id UUID,"
+            " ADD COLUMN IF NOT EXISTS match_rule VARCHAR(20)"
+        ))
+        await self.db.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_recon_items_reconciliation_id ON recon_items (reconciliation_id)"
+        ))
+        await self.db.commit()
+
     async def get_all(self, status: Optional[str] = None) -> List[Reconciliation]:
         q = select(Reconciliation)
         if status:
@@ -125,6 +471,64 @@ class ReconciliationDAO:
         )
         return list(result.scalars().all())
 
+    async def get_header(self, recon_id: UUID) -> Optional[Reconciliation]:
+        result = await self.db.execute(select(Reconciliation).where(Reconciliation.id == recon_id))
+        return result.scalar_one_or_none()
+
+    async def load_item_columns(self, recon_id: UUID) -> Tuple[list, dict]:
+        result = await self.db.execute(
+            select(
+                ReconItem.id, ReconItem.source_ref, ReconItem.target_ref,
+                ReconItem.source_amount, ReconItem.target_amount,
+                ReconItem.source_date, ReconItem.target_date,
+            ).where(ReconItem.reconciliation_id == recon_id)
+        )
+        rows = result.all()
+        n = len(rows)
+        if not n:
+            return [], {}
+        ids, src_ref, tgt_ref, src_amt, tgt_amt, src_date, tgt_date = zip(*rows)
+        cols = {
+            "source_ref": np.array(src_ref, dtype=object),
+            "target_ref": np.array(tgt_ref, dtype=object),
+            "source_amount": np.nan_to_num(np.array(src_amt, dtype=np.float64)),
+            "target_amount": np.nan_to_num(np.array(tgt_amt, dtype=np.float64)),
+            "source_date": np.fromiter((d.toordinal() if d else NO_DATE for d in src_date), np.int64, n),
+            "target_date": np.fromiter((d.toordinal() if d else NO_DATE for d in tgt_date), np.int64, n),
+        }
+        return list(ids), cols
+
+    async def apply_match_results(self, recon_id: UUID, ids: list, outcome: dict, header: dict) -> int:
+        counterpart = outcome["counterpart"]
+        matched_ids = [ids[c] if c >= 0 else None for c in counterpart.tolist()]
+        rules = [RULE_NAMES.get(r) for r in outcome["rule"].tolist()]
+        is_matched = outcome["is_matched"].tolist()
+        difference = outcome["difference"].round(2).tolist()
+
+        updated = 0
+        for i in range(0, len(ids), self.WRITE_CHUNK_SIZE):
+            sl = slice(i, i + self.WRITE_CHUNK_SIZE)
+            res = await self.db.execute(
+                text(
+                    "UPDATE recon_items AS r "
+                    "SET is_matched = v.is_matched, difference = v.difference, "
+                    "    matched_item_id = v.matched_item_id, match_rule = v.match_rule "
+                    "FROM unnest(CAST(:ids AS uuid[]), CAST(:is_matched AS boolean[]), "
+                    "            CAST(:difference AS double precision[]), CAST(:matched_ids AS uuid[]), "
+                    "            CAST(:rules AS varchar[])) "
+                    "     AS v(id, is_matched, difference, matched_item_id, match_rule) "
+                    "WHERE r.id = v.id"
+                ),
+                {
+                    "ids": ids[sl], "is_matched": is_matched[sl], "difference": difference[sl],
+                    "matched_ids": matched_ids[sl], "rules": rules[sl],
+                },
+            )
+            updated += res.rowcount
+        await self.db.execute(update(Reconciliation).where(Reconciliation.id == recon_id).values(**header))
+        await self.db.commit()
+        return updated
+
 
 class ClosePeriodDAO:
     def __init__(self, db: AsyncSession):
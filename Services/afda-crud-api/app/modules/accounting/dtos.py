@@ -1,9 +1,58 @@
 from datetime import datetime, date
-from typing import Optional, List
+from typing import Optional, List, Dict
 from uuid import UUID
 from pydantic import BaseModel, Field
 
 
+# ── Chart of Accounts ──
+class ChartOfAccountCreate(BaseModel):
+    account_code: str = Field(..., max_length=20)
+    account_name: str = Field(..., max_length=200)
+    category: str
+    parent_code: Optional[str] = Field(None, max_length=20)
+    is_active: bool = True
+
+
+class ChartOfAccountUpdate(BaseModel):
+    account_name: Optional[str] = Field(None, max_length=200)
+    category: Optional[str] = None
+    parent_code: Optional[str] = Field(None, max_length=20)
+    is_active: Optional[bool] = None
+
+
+class ChartOfAccountOut(BaseModel):
+    id: UUID
+    account_code: str
+    account_name: str
+    category: str
+    parent_code: Optional[str]
+    is_active: bool
+    created_at: datetime
+    model_config = {"from_attributes": True}
+
+
+class AccountRollupNode(BaseModel):
+    account_code: str
+    account_name: str
+    category: str
+    parent_code: Optional[str]
+    depth: int
+    is_leaf: bool
+    own: Dict[str, float]
+    total: Dict[str, float]
+
+
+class AccountRollup(BaseModel):
+    source: str
+    period: Optional[str]
+    measures: List[str]
+    nodes: List[AccountRollupNode]
+    categories: Dict[str, Dict[str, float]]
+    grand_total: Dict[str, float]
+    unmapped_accounts: List[str]
+    unmapped_total: Dict[str, float]
+
+
 # ── Journal Entry ──
 class JournalLineCreate(BaseModel):
     account_code: str
@@ -48,6 +97,22 @@ class JournalEntryDetailOut(JournalEntryOut):
     lines: List[JournalLineOut] = []
 
 
+class BulkImportError(BaseModel):
+    entry_number: Optional[str]
+    row: int
+    error: str
+
+
+class BulkImportResult(BaseModel):
+    rows_read: int
+    entries_imported: int
+    lines_imported: int
+    entries_rejected: int
+    errors: List[BulkImportError] = []
+    elapsed_ms: float
+    lines_per_sec: float
+
+
 # ── Trial Balance ──
 class TrialBalanceOut(BaseModel):
     id: UUID
@@ -86,6 +151,15 @@ class IntercompanyOut(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class IntercompanyMatchResult(BaseModel):
+    matched_pairs: int
+    total_pending: int
+    rows_updated: int
+    match_ms: float
+    total_ms: float
+    rows_per_sec: float
+
+
 # ── Reconciliation ──
 class ReconOut(BaseModel):
     id: UUID
@@ -109,12 +183,30 @@ class ReconItemOut(BaseModel):
     target_ref: Optional[str]
     source_amount: float
     target_amount: float
+    source_date: Optional[date] = None
+    target_date: Optional[date] = None
     difference: float
     is_matched: bool
+    matched_item_id: Optional[UUID] = None
+    match_rule: Optional[str] = None
     notes: Optional[str]
     model_config = {"from_attributes": True}
 
 
+class ReconRunResult(BaseModel):
+    recon_id: UUID
+    status: str
+    total_items: int
+    matched_count: int
+    unmatched_count: int
+    source_balance: float
+    target_balance: float
+    difference: float
+    matches_by_rule: Dict[str, int]
+    match_ms: float
+    total_ms: float
+
+
 # ── Close Management ──
 class ClosePeriodCreate(BaseModel):
     period: str
@@ -0,0 +1,132 @@
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+# (account_code, account_name, category, parent_code)
+AccountRow = Tuple[str, str, str, Optional[str]]
+
+HIERARCHY_TTL_SECONDS = 300
+
+
+class AccountHierarchy:
+    """Nested-set index over the chart of accounts.
+
+    Accounts are laid out in depth-first preorder, so the subtree of the account at
+    position i is exactly the slice [i, end[i]). Subtree totals for every account are
+    then a difference of two prefix sums over that order: one cumsum, no recursion.
+    Accounts whose parent is missing are treated as roots, and a parent cycle is
+    broken at the first account reached in code order.
+    """
+
+    def __init__(self, rows: Sequence[AccountRow]):
+        rows = sorted(rows, key=lambda r: r[0])
+        by_code = {r[0]: r for r in rows}
+        children: Dict[str, List[str]] = defaultdict(list)
+        roots = []
+        for code, _, _, parent in rows:
+            if parent and parent != code and parent in by_code:
+                children[parent].append(code)
+            else:
+                roots.append(code)
+
+        self.codes: List[str] = []
+        parent_pos: List[int] = []
+        depth: List[int] = []
+        visited = set()
+
+        def walk(root: str):
+            stack = [(root, -1, 0)]
+            while stack:
+                code, parent, level = stack.pop()
+                if code in visited:
+                    continue
+                visited.add(code)
+                pos = len(self.codes)
+                self.codes.append(code)
+                parent_pos.append(parent)
+                depth.append(level)
+                for child in reversed(children.get(code, ())):
+                    stack.append((child, pos, level + 1))
+
+        for code in roots:
+            walk(code)
+        for code, *_ in rows:
+            if code not in visited:
+                walk(code)
+
+        n = len(self.codes)
+        self.index: Dict[str, int] = {code: i for i, code in enumerate(self.codes)}
+        self.names = [by_code[c][1] for c in self.codes]
+        self.categories = [by_code[c][2] for c in self.codes]
+        self.parent = np.array(parent_pos, dtype=np.int64)
+        self.depth = np.array(depth, dtype=np.int64)
+        size = np.ones(n, dtype=np.int64)
+        # Children always follow their parent in preorder, so one reverse pass suffices
+        for i in range(n - 1, 0, -1):
+            if parent_pos[i] >= 0:
+                size[parent_pos[i]] += size[i]
+        self.start = np.arange(n, dtype=np.int64)
+        self.end = self.start + size
+        self.built_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def parent_code(self, pos: int) -> Optional[str]:
+        p = int(self.parent[pos])
+        return self.codes[p] if p >= 0 else None
+
+    def is_descendant(self, code: str, ancestor: str) -> bool:
+        i, a = self.index.get(code), self.index.get(ancestor)
+        if i is None or a is None:
+            return False
+        return bool(self.start[a] <= i < self.end[a])
+
+    def subtree(self, code: Optional[str] = None) -> Tuple[int, int]:
+        if code is None:
+            return 0, len(self.codes)
+        i = self.index[code]
+        return i, int(self.end[i])
+
+    def rollup(self, codes: Sequence[str], measures: np.ndarray):
+        """Aggregate per-account measure rows (len(codes) x k) onto the tree.
+
+        Returns (own, subtree, unmapped) where own and subtree are aligned with
+        self.codes and unmapped flags input rows whose code is not in the chart.
+        """
+        measures = np.asarray(measures, dtype=np.float64).reshape(len(codes), -1)
+        pos = np.array([self.index.get(c, -1) for c in codes], dtype=np.int64)
+        mapped = pos >= 0
+        own = np.zeros((len(self.codes), measures.shape[1]))
+        np.add.at(own, pos[mapped], measures[mapped])
+        prefix = np.vstack([np.zeros((1, measures.shape[1])), np.cumsum(own, axis=0)])
+        subtree = prefix[self.end] - prefix[self.start]
+        return own, subtree, ~mapped
+
+
+_cached: Optional[AccountHierarchy] = None
+_generation = 0
+
+
+def cached_hierarchy() -> Optional[AccountHierarchy]:
+    if _cached is not None and time.monotonic() - _cached.built_at < HIERARCHY_TTL_SECONDS:
+        return _cached
+    return None
+
+
+def current_generation() -> int:
+    return _generation
+
+
+def store_hierarchy(hierarchy: AccountHierarchy, generation: int) -> None:
+    """Cache a freshly built index unless the chart changed while it was loading."""
+    global _cached
+    if generation == _generation:
+        _cached = hierarchy
+
+
+def invalidate_hierarchy() -> None:
+    global _cached, _generation
+    _cached = None
+    _generation += 1
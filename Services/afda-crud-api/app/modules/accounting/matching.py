@@ -0,0 +1,71 @@
+import math
+import time
+from collections import defaultdict
+from datetime import date
+from typing import Optional, Sequence, Tuple
+from uuid import UUID
+
+# (id, from_entity, to_entity, amount, currency, transaction_date)
+IntercompanyRow = Tuple[UUID, str, str, float, str, date]
+
+
+class IntercompanyMatcher:
+    """Single-pass hash-join matcher for intercompany transactions.
+
+    Transactions are bucketed by (from_entity, to_entity, currency, rounded amount).
+    Each transaction probes the mirrored bucket (to_entity, from_entity, ...) and its
+    two neighbours, so a pair whose amounts straddle a bucket edge is still found.
+    A transaction is consumed from its bucket as soon as it is matched, so it can
+    never be paired twice.
+    """
+
+    def __init__(self, amount_tolerance: float = 0.01, date_tolerance_days: Optional[int] = None):
+        self.amount_tolerance = amount_tolerance
+        self.date_tolerance_days = date_tolerance_days
+        # Bucket width must be > 0; a zero tolerance still buckets on cents
+        self._bucket_width = max(amount_tolerance, 0.01)
+
+    def _bucket(self, amount: float) -> int:
+        return math.floor(amount / self._bucket_width)
+
+    def _within_dates(self, d1: date, d2: date) -> bool:
+        if self.date_tolerance_days is None or d1 is None or d2 is None:
+            return True
+        return abs((d1 - d2).days) <= self.date_tolerance_days
+
+    def match(self, rows: Sequence[IntercompanyRow]) -> dict:
+        start = time.perf_counter()
+        open_buckets: dict = defaultdict(list)
+        pairs: list[Tuple[UUID, UUID]] = []
+
+        # Oldest first so the earliest counterparty wins when several qualify
+        for row in sorted(rows, key=lambda r: (r[5] or date.min)):
+            txn_id, from_entity, to_entity, amount, currency, txn_date = row
+            bucket = self._bucket(amount)
+            match_idx = None
+            candidates = None
+            for b in (bucket, bucket - 1, bucket + 1):
+                candidates = open_buckets.get((to_entity, from_entity, currency, b))
+                if not candidates:
+                    continue
+                best_gap = None
+                for idx, cand in enumerate(candidates):
+                    if abs(cand[3] - amount) > self.amount_tolerance or not self._within_dates(cand[5], txn_date):
+                        continue
+                    gap = abs((cand[5] - txn_date).days) if cand[5] and txn_date else 0
+                    if best_gap is None or gap < best_gap:
+                        best_gap, match_idx = gap, idx
+                if match_idx is not None:
+                    break
+            if match_idx is not None:
+                other = candidates.pop(match_idx)
+                pairs.append((other[0], txn_id))
+            else:
+                open_buckets[(from_entity, to_entity, currency, bucket)].append(row)
+
+        elapsed = time.perf_counter() - start
+        return {
+            "pairs": pairs,
+            "elapsed_ms": round(elapsed * 1000, 2),
+            "rows_per_sec": round(len(rows) / elapsed, 2) if elapsed > 0 else 0.0,
+        }
@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime, date
-from sqlalchemy import String, Text, Float, Integer, Boolean, DateTime, Date, ForeignKey, Enum as SAEnum
+from sqlalchemy import String, Text, Float, Integer, Boolean, DateTime, Date, ForeignKey, Index, UniqueConstraint, Enum as SAEnum
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.dialects.postgresql import UUID
 from app.database import Base
@@ -35,6 +35,7 @@ class JournalEntryStatus(str, enum.Enum):
 
 class JournalEntry(Base):
     __tablename__ = "journal_entries"
+    __table_args__ = (Index("ix_journal_entries_entry_date_id", "entry_date", "id"),)
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     entry_number: Mapped[str] = mapped_column(String(50), unique=True, nullable=False)
@@ -77,6 +78,20 @@ class TrialBalance(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
 
+class AccountBalance(Base):
+    __tablename__ = "account_balances"
+    __table_args__ = (UniqueConstraint("period", "account_code", name="uq_account_balances_period_account"),)
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    period: Mapped[str] = mapped_column(String(20), nullable=False)  # 2025-01
+    account_code: Mapped[str] = mapped_column(String(20), nullable=False)
+    account_name: Mapped[str] = mapped_column(String(200), nullable=False)
+    debit_total: Mapped[float] = mapped_column(Float, default=0.0)
+    credit_total: Mapped[float] = mapped_column(Float, default=0.0)
+    line_count: Mapped[int] = mapped_column(Integer, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 class IntercompanyTransaction(Base):
     __tablename__ = "intercompany_transactions"
 
@@ -122,13 +137,17 @@ class ReconItem(Base):
     __tablename__ = "recon_items"
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    reconciliation_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("reconciliations.id"))
+    reconciliation_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("reconciliations.id"), index=True)
     source_ref: Mapped[str] = mapped_column(String(100), nullable=True)
     target_ref: Mapped[str] = mapped_column(String(100), nullable=True)
     source_amount: Mapped[float] = mapped_column(Float, default=0.0)
     target_amount: Mapped[float] = mapped_column(Float, default=0.0)
+    source_date: Mapped[date] = mapped_column(Date, nullable=True)
+    target_date: Mapped[date] = mapped_column(Date, nullable=True)
     difference: Mapped[float] = mapped_column(Float, default=0.0)
     is_matched: Mapped[bool] = mapped_column(Boolean, default=False)
+    matched_item_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=True)
+    match_rule: Mapped[str] = mapped_column(String(20), nullable=True)  # paired, reference_exact, reference, exact_amount, tolerance
     notes: Mapped[str] = mapped_column(Text, nullable=True)
 
     reconciliation: Mapped["Reconciliation"] = relationship(back_populates="items")
@@ -0,0 +1,184 @@
+import time
+import numpy as np
+
+NO_DATE = np.iinfo(np.int64).min
+
+RULE_NONE = 0
+RULE_PAIRED = 1
+RULE_REFERENCE_EXACT = 2
+RULE_REFERENCE = 3
+RULE_EXACT_AMOUNT = 4
+RULE_TOLERANCE = 5
+
+RULE_NAMES = {
+    RULE_PAIRED: "paired",
+    RULE_REFERENCE_EXACT: "reference_exact",
+    RULE_REFERENCE: "reference",
+    RULE_EXACT_AMOUNT: "exact_amount",
+    RULE_TOLERANCE: "tolerance",
+}
+
+
+def _dense_codes(keys: np.ndarray) -> np.ndarray:
+    _, codes = np.unique(keys, return_inverse=True)
+    return codes.astype(np.int64)
+
+
+def _occurrence_rank(keys: np.ndarray) -> np.ndarray:
+    """0 for the first occurrence of each key, 1 for the second, and so on."""
+    n = len(keys)
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    starts = np.ones(n, dtype=bool)
+    starts[1:] = sorted_keys[1:] != sorted_keys[:-1]
+    group_start = np.maximum.accumulate(np.where(starts, np.arange(n), 0))
+    rank = np.empty(n, dtype=np.int64)
+    rank[order] = np.arange(n) - group_start
+    return rank
+
+
+def _join_one_to_one(src_keys: np.ndarray, tgt_keys: np.ndarray):
+    """Equi-join two integer key arrays, pairing duplicates in order of appearance."""
+    if not len(src_keys) or not len(tgt_keys):
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    codes = _dense_codes(np.concatenate([src_keys, tgt_keys]))
+    src_rank = _occurrence_rank(src_keys)
+    tgt_rank = _occurrence_rank(tgt_keys)
+    width = int(max(src_rank.max(), tgt_rank.max())) + 1
+    src_comp = codes[:len(src_keys)] * width + src_rank
+    tgt_comp = codes[len(src_keys):] * width + tgt_rank
+    _, src_pos, tgt_pos = np.intersect1d(src_comp, tgt_comp, assume_unique=True, return_indices=True)
+    return src_pos, tgt_pos
+
+
+class ReconciliationEngine:
+    """Columnar matcher for the source and target sides of a reconciliation.
+
+    Rows with both refs set are pre-paired and only checked against the tolerance.
+    The remaining source-only and target-only rows go through, in order:
+    reference + exact amount, reference within tolerance, exact amount within the
+    date window, and nearest amount within tolerance and the date window.
+    Every pass is a sorted/hashed join over NumPy arrays; no per-row Python.
+    """
+
+    def __init__(self, amount_tolerance: float = 0.01, date_window_days: int = 3, max_rounds: int = 3):
+        self.amount_tolerance = amount_tolerance
+        self.date_window_days = date_window_days
+        self.max_rounds = max_rounds
+
+    def _dates_ok(self, d1: np.ndarray, d2: np.ndarray) -> np.ndarray:
+        return (d1 == NO_DATE) | (d2 == NO_DATE) | (np.abs(d1 - d2) <= self.date_window_days)
+
+    def run(self, cols: dict) -> dict:
+        start = time.perf_counter()
+        src_ref = cols["source_ref"]
+        tgt_ref = cols["target_ref"]
+        src_amt = cols["source_amount"]
+        tgt_amt = cols["target_amount"]
+        src_date = cols["source_date"]
+        tgt_date = cols["target_date"]
+        n = len(src_amt)
+
+        has_src_ref = np.not_equal(src_ref, None).astype(bool)
+        has_tgt_ref = np.not_equal(tgt_ref, None).astype(bool)
+        src_side = ~has_tgt_ref & (has_src_ref | (tgt_amt == 0))
+        tgt_side = ~has_src_ref & ~src_side
+        paired = ~src_side & ~tgt_side
+
+        is_matched = np.zeros(n, dtype=bool)
+        difference = src_amt - tgt_amt
+        counterpart = np.full(n, -1, dtype=np.int64)
+        rule = np.zeros(n, dtype=np.int8)
+
+        paired_ok = paired & (np.abs(difference) <= self.amount_tolerance)
+        is_matched[paired_ok] = True
+        rule[paired_ok] = RULE_PAIRED
+
+        src_idx = np.flatnonzero(src_side)
+        tgt_idx = np.flatnonzero(tgt_side)
+
+        def commit(s: np.ndarray, t: np.ndarray, rule_code: int):
+            is_matched[s] = True
+            is_matched[t] = True
+            counterpart[s] = t
+            counterpart[t] = s
+            diff = src_amt[s] - tgt_amt[t]
+            difference[s] = diff
+            difference[t] = diff
+            rule[s] = rule_code
+            rule[t] = rule_code
+
+        def remaining(idx: np.ndarray) -> np.ndarray:
+            return idx[~is_matched[idx]]
+
+        cents_src = np.rint(src_amt * 100).astype(np.int64)
+        cents_tgt = np.rint(tgt_amt * 100).astype(np.int64)
+
+        # ── Pass 1 + 2: reference ──
+        s = src_idx[has_src_ref[src_idx]]
+        t = tgt_idx[has_tgt_ref[tgt_idx]]
+        if len(s) and len(t):
+            ref_codes = _dense_codes(np.concatenate([src_ref[s], tgt_ref[t]]).astype(str))
+            s_ref, t_ref = ref_codes[:len(s)], ref_codes[len(s):]
+            cent_codes = _dense_codes(np.concatenate([cents_src[s], cents_tgt[t]]))
+            width = int(cent_codes.max()) + 1
+            sp, tp = _join_one_to_one(s_ref * width + cent_codes[:len(s)], t_ref * width + cent_codes[len(s):])
+            commit(s[sp], t[tp], RULE_REFERENCE_EXACT)
+
+            keep_s, keep_t = ~is_matched[s], ~is_matched[t]
+            s, s_ref = s[keep_s], s_ref[keep_s]
+            t, t_ref = t[keep_t], t_ref[keep_t]
+            sp, tp = _join_one_to_one(s_ref, t_ref)
+            ok = np.abs(src_amt[s[sp]] - tgt_amt[t[tp]]) <= self.amount_tolerance
+            commit(s[sp][ok], t[tp][ok], RULE_REFERENCE)
+
+        # ── Pass 3: exact amount within date window ──
+        s, t = remaining(src_idx), remaining(tgt_idx)
+        sp, tp = _join_one_to_one(cents_src[s], cents_tgt[t])
+        ok = self._dates_ok(src_date[s[sp]], tgt_date[t[tp]])
+        commit(s[sp][ok], t[tp][ok], RULE_EXACT_AMOUNT)
+
+        # ── Pass 4: nearest amount within tolerance and date window ──
+        for _ in range(self.max_rounds):
+            s, t = remaining(src_idx), remaining(tgt_idx)
+            if not len(s) or not len(t):
+                break
+            order = np.argsort(tgt_amt[t], kind="stable")
+            sorted_amt = tgt_amt[t][order]
+            pos = np.searchsorted(sorted_amt, src_amt[s])
+            left = np.clip(pos - 1, 0, len(t) - 1)
+            right = np.clip(pos, 0, len(t) - 1)
+            d_left = np.abs(src_amt[s] - sorted_amt[left])
+            d_right = np.abs(src_amt[s] - sorted_amt[right])
+            pick = np.where(d_right < d_left, right, left)
+            gap = np.minimum(d_left, d_right)
+            cand = t[order[pick]]
+            ok = (gap <= self.amount_tolerance) & self._dates_ok(src_date[s], tgt_date[cand])
+            if not ok.any():
+                break
+            s_ok, cand_ok, gap_ok = s[ok], cand[ok], gap[ok]
+            # Several sources may pick the same target: keep the closest one
+            by_target = np.lexsort((gap_ok, cand_ok))
+            cand_sorted = cand_ok[by_target]
+            first = np.ones(len(cand_sorted), dtype=bool)
+            first[1:] = cand_sorted[1:] != cand_sorted[:-1]
+            commit(s_ok[by_target][first], cand_sorted[first], RULE_TOLERANCE)
+
+        matched_count = int(is_matched.sum())
+        source_balance = float(src_amt.sum())
+        target_balance = float(tgt_amt.sum())
+        rules, counts = np.unique(rule[is_matched], return_counts=True)
+        elapsed = time.perf_counter() - start
+        return {
+            "is_matched": is_matched,
+            "difference": difference,
+            "counterpart": counterpart,
+            "rule": rule,
+            "matched_count": matched_count,
+            "unmatched_count": n - matched_count,
+            "source_balance": round(source_balance, 2),
+            "target_balance": round(target_balance, 2),
+            "difference_total": round(source_balance - target_balance, 2),
+            "matches_by_rule": {RULE_NAMES[int(r)]: int(c) for r, c in zip(rules, counts)},
+            "elapsed_ms": round(elapsed * 1000, 2),
+        }
@@ -1,35 +1,75 @@
 from uuid import UUID
 from typing import Optional
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.database import get_db
-from app.shared.responses import ApiResponse
+from app.database import get_db, AsyncSessionLocal
+from app.shared.responses import ApiResponse, CursorResponse, stream_api_response
 from app.modules.accounting.service import (
-    GeneralLedgerService, TrialBalanceService, IntercompanyService,
-    ReconciliationService, CloseManagementService,
+    ChartOfAccountService, GeneralLedgerService, TrialBalanceService, IntercompanyService,
+    ReconciliationService, CloseManagementService, resolve_flux_periods,
 )
 from app.modules.accounting.dtos import (
-    JournalEntryCreate, JournalEntryOut, JournalEntryDetailOut,
+    ChartOfAccountCreate, ChartOfAccountUpdate, ChartOfAccountOut, AccountRollup,
+    JournalEntryCreate, JournalEntryOut, JournalEntryDetailOut, BulkImportResult,
     TrialBalanceOut, TrialBalanceComparison,
-    IntercompanyOut,
-    ReconOut, ReconItemOut,
+    IntercompanyOut, IntercompanyMatchResult,
+    ReconOut, ReconItemOut, ReconRunResult,
     ClosePeriodCreate, ClosePeriodOut, CloseTaskOut, CloseTaskUpdate, CloseDashboard,
 )
 
 router = APIRouter()
 
 
+# ── Chart of Accounts ──
+@router.get("/chart-of-accounts", response_model=ApiResponse[list[ChartOfAccountOut]])
+async def list_accounts(
+    category: Optional[str] = None, active_only: bool = False, db: AsyncSession = Depends(get_db),
+):
+    svc = ChartOfAccountService(db)
+    accounts = await svc.list_accounts(category, active_only)
+    return ApiResponse(data=accounts)
+
+
+@router.post("/chart-of-accounts", response_model=ApiResponse[ChartOfAccountOut], status_code=201)
+async def create_account(data: ChartOfAccountCreate, db: AsyncSession = Depends(get_db)):
+    svc = ChartOfAccountService(db)
+    account = await svc.create_account(data)
+    return ApiResponse(data=account, message="Account created")
+
+
+@router.get("/chart-of-accounts/rollup", response_model=ApiResponse[AccountRollup])
+async def account_rollup(
+    source: str = Query("trial_balance", pattern="^(trial_balance|variance|budget)$"),
+    period: Optional[str] = None,
+    root: Optional[str] = None,
+    max_depth: Optional[int] = Query(None, ge=0),
+    db: AsyncSession = Depends(get_db),
+):
+    svc = ChartOfAccountService(db)
+    rollup = await svc.get_rollup(source, period, root, max_depth)
+    return ApiResponse(data=rollup)
+
+
+@router.put("/chart-of-accounts/{account_code}", response_model=ApiResponse[ChartOfAccountOut])
+async def update_account(account_code: str, data: ChartOfAccountUpdate, db: AsyncSession = Depends(get_db)):
+    svc = ChartOfAccountService(db)
+    account = await svc.update_account(account_code, data)
+    return ApiResponse(data=account, message="Account updated")
+
+
 # ── General Ledger ──
-@router.get("/general-ledger", response_model=ApiResponse[list[JournalEntryOut]])
+@router.get("/general-ledger", response_model=CursorResponse[JournalEntryOut])
 async def list_gl_entries(
     status: Optional[str] = None,
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
     db: AsyncSession = Depends(get_db),
 ):
     svc = GeneralLedgerService(db)
-    entries = await svc.list_entries(status, limit, offset)
-    return ApiResponse(data=entries)
+    page = await svc.list_entries(status, limit, offset, cursor)
+    return CursorResponse(**page)
 
 
 @router.post("/general-ledger", response_model=ApiResponse[JournalEntryDetailOut], status_code=201)
@@ -39,6 +79,18 @@ async def create_gl_entry(data: JournalEntryCreate, db: AsyncSession = Depends(g
     return ApiResponse(data=entry, message="Journal entry created")
 
 
+@router.post("/general-ledger/bulk", response_model=ApiResponse[BulkImportResult])
+async def bulk_import_gl_entries(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(ndjson|csv)$"),
+    db: AsyncSession = Depends(get_db),
+):
+    fmt = format or ("csv" if "csv" in request.headers.get("content-type", "") else "ndjson")
+    svc = GeneralLedgerService(db)
+    result = await svc.bulk_import(request.stream(), fmt)
+    return ApiResponse(data=result, message=f"Imported {result['entries_imported']} journal entries")
+
+
 @router.get("/general-ledger/{entry_id}", response_model=ApiResponse[JournalEntryDetailOut])
 async def get_gl_entry(entry_id: UUID, db: AsyncSession = Depends(get_db)):
     svc = GeneralLedgerService(db)
@@ -63,6 +115,23 @@ async def trial_balance_comparison(
     return ApiResponse(data=comparison)
 
 
+@router.get("/trial-balance/flux")
+async def trial_balance_flux(
+    period: str = Query(...),
+    compare: list[str] = Query(["mom", "qoq", "yoy"]),
+):
+    # Validate before streaming starts so errors still map to a 400
+    periods = resolve_flux_periods(period, compare)
+
+    async def rows():
+        # The request-scoped session is released before a streamed body is sent
+        async with AsyncSessionLocal() as db:
+            async for row in TrialBalanceService(db).stream_flux(period, periods):
+                yield row
+
+    return StreamingResponse(stream_api_response(rows()), media_type="application/json")
+
+
 # ── Intercompany ──
 @router.get("/intercompany", response_model=ApiResponse[list[IntercompanyOut]])
 async def list_intercompany(status: Optional[str] = None, db: AsyncSession = Depends(get_db)):
@@ -71,10 +140,14 @@ async def list_intercompany(status: Optional[str] = None, db: AsyncSession = Dep
     return ApiResponse(data=txns)
 
 
-@router.post("/intercompany/match")
-async def auto_match_intercompany(db: AsyncSession = Depends(get_db)):
+@router.post("/intercompany/match", response_model=ApiResponse[IntercompanyMatchResult])
+async def auto_match_intercompany(
+    amount_tolerance: float = Query(0.01, ge=0, description="Max absolute amount difference"),
+    date_tolerance_days: Optional[int] = Query(None, ge=0, description="Max days between dates; unset ignores dates"),
+    db: AsyncSession = Depends(get_db),
+):
     svc = IntercompanyService(db)
-    result = await svc.auto_match()
+    result = await svc.auto_match(amount_tolerance, date_tolerance_days)
     return ApiResponse(data=result, message="Auto-match completed")
 
 
@@ -86,11 +159,16 @@ async def list_reconciliations(status: Optional[str] = None, db: AsyncSession =
     return ApiResponse(data=recons)
 
 
-@router.post("/reconciliation/{recon_id}/reconcile")
-async def execute_reconciliation(recon_id: UUID, db: AsyncSession = Depends(get_db)):
+@router.post("/reconciliation/{recon_id}/reconcile", response_model=ApiResponse[ReconRunResult])
+async def execute_reconciliation(
+    recon_id: UUID,
+    amount_tolerance: float = Query(0.01, ge=0),
+    date_window_days: int = Query(3, ge=0, le=365),
+    db: AsyncSession = Depends(get_db),
+):
     svc = ReconciliationService(db)
-    result = await svc.execute_reconciliation(recon_id)
-    return ApiResponse(data=result, message="Reconciliation triggered")
+    result = await svc.execute_reconciliation(recon_id, amount_tolerance, date_window_days)
+    return ApiResponse(data=result, message="Reconciliation completed")
 
 
 @router.get("/reconciliation/{recon_id}/items", response_model=ApiResponse[list[ReconItemOut]])
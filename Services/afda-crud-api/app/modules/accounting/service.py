@@ -1,22 +1,116 @@
+import logging
+import time
+import numpy as np
 from uuid import UUID
 from datetime import datetime, date
-from typing import Optional
+from typing import AsyncIterator, List, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.modules.accounting.dao import (
-    JournalEntryDAO, TrialBalanceDAO, IntercompanyDAO, ReconciliationDAO, ClosePeriodDAO,
+    AccountBalanceDAO, ChartOfAccountDAO, JournalEntryDAO, TrialBalanceDAO, IntercompanyDAO, ReconciliationDAO, ClosePeriodDAO,
 )
 from app.modules.accounting.dtos import (
-    JournalEntryCreate, ClosePeriodCreate, CloseTaskUpdate, CloseDashboard,
+    ChartOfAccountCreate, ChartOfAccountUpdate, JournalEntryCreate, ClosePeriodCreate, CloseTaskUpdate, CloseDashboard, ReconRunResult,
 )
+from app.modules.accounting.models import AccountCategory, ReconStatus
+from app.modules.accounting.bulk_import import JournalImportParser
+from app.modules.accounting.reconciliation_engine import ReconciliationEngine
 from app.shared.exceptions import NotFoundException, BadRequestException
 
+logger = logging.getLogger("afda")
+
+BULK_CHUNK_LINES = 20_000
+
+
+class ChartOfAccountService:
+    def __init__(self, db: AsyncSession):
+        self.dao = ChartOfAccountDAO(db)
+
+    async def list_accounts(self, category=None, active_only=False):
+        return await self.dao.get_all(category, active_only)
+
+    def _check_category(self, category: Optional[str]):
+        if category is not None and category not in {c.value for c in AccountCategory}:
+            raise BadRequestException(f"Invalid category '{category}'")
+
+    async def create_account(self, data: ChartOfAccountCreate):
+        self._check_category(data.category)
+        if await self.dao.get_by_code(data.account_code):
+            raise BadRequestException(f"Account '{data.account_code}' already exists")
+        if data.parent_code and not await self.dao.get_by_code(data.parent_code):
+            raise BadRequestException(f"Parent account '{data.parent_code}' not found")
+        return await self.dao.create(data.model_dump())
+
+    async def update_account(self, account_code: str, data: ChartOfAccountUpdate):
+        if not await self.dao.get_by_code(account_code):
+            raise NotFoundException("Account", account_code)
+        changes = data.model_dump(exclude_unset=True)
+        self._check_category(changes.get("category"))
+        parent = changes.get("parent_code")
+        if parent:
+            if not await self.dao.get_by_code(parent):
+                raise BadRequestException(f"Parent account '{parent}' not found")
+            hierarchy = await self.dao.get_hierarchy()
+            if parent == account_code or hierarchy.is_descendant(parent, account_code):
+                raise BadRequestException(f"Account '{parent}' is within the subtree of '{account_code}'")
+        return await self.dao.update(account_code, changes)
+
+    async def get_rollup(self, source: str, period: Optional[str] = None,
+                         root: Optional[str] = None, max_depth: Optional[int] = None) -> dict:
+        measures = ChartOfAccountDAO.ROLLUP_MEASURES.get(source)
+        if measures is None:
+            raise BadRequestException(f"Unknown rollup source '{source}'")
+        if source == "trial_balance" and not period:
+            raise BadRequestException("period is required for the trial_balance rollup")
+        hierarchy = await self.dao.get_hierarchy()
+        if root is not None and root not in hierarchy.index:
+            raise NotFoundException("Account", root)
+        codes, values = await self.dao.get_rollup_source(source, period)
+        own, total, unmapped = hierarchy.rollup(codes, values)
+
+        start, end = hierarchy.subtree(root)
+        base_depth = int(hierarchy.depth[start]) if root is not None else 0
+        nodes = []
+        for i in range(start, end):
+            depth = int(hierarchy.depth[i]) - base_depth
+            if max_depth is not None and depth > max_depth:
+                continue
+            nodes.append({
+                "account_code": hierarchy.codes[i],
+                "account_name": hierarchy.names[i],
+                "category": hierarchy.categories[i],
+                "parent_code": hierarchy.parent_code(i),
+                "depth": depth,
+                "is_leaf": bool(hierarchy.end[i] - i == 1),
+                "own": dict(zip(measures, np.round(own[i], 2).tolist())),
+                "total": dict(zip(measures, np.round(total[i], 2).tolist())),
+            })
+
+        # Category totals sum each account's own figures, so mixed-category subtrees are not double counted
+        in_scope = own[start:end]
+        categories = {}
+        for category in sorted(set(hierarchy.categories[start:end])):
+            mask = np.array([c == category for c in hierarchy.categories[start:end]])
+            categories[category] = dict(zip(measures, np.round(in_scope[mask].sum(axis=0), 2).tolist()))
+        unmapped_codes = sorted(c for c, u in zip(codes, unmapped) if u) if root is None else []
+        unmapped_total = values[unmapped].sum(axis=0) if root is None else np.zeros(len(measures))
+        return {
+            "source": source,
+            "period": period,
+            "measures": list(measures),
+            "nodes": nodes,
+            "categories": categories,
+            "grand_total": dict(zip(measures, np.round(in_scope.sum(axis=0), 2).tolist())),
+            "unmapped_accounts": unmapped_codes,
+            "unmapped_total": dict(zip(measures, np.round(unmapped_total, 2).tolist())),
+        }
+
 
 class GeneralLedgerService:
     def __init__(self, db: AsyncSession):
         self.dao = JournalEntryDAO(db)
 
-    async def list_entries(self, status=None, limit=50, offset=0):
-        return await self.dao.get_all(status, limit, offset)
+    async def list_entries(self, status=None, limit=50, offset=0, cursor=None):
+        return await self.dao.get_all(status, limit, offset, cursor)
 
     async def get_entry(self, entry_id: UUID):
         entry = await self.dao.get_by_id(entry_id)
@@ -36,6 +130,45 @@ class GeneralLedgerService:
         entry_data = data.model_dump(exclude={"lines"})
         return await self.dao.create(entry_data, lines)
 
+    async def bulk_import(self, chunks: AsyncIterator[bytes], fmt: str, created_by: Optional[str] = None) -> dict:
+        start = time.perf_counter()
+        parser = JournalImportParser(fmt)
+        imported = lines_imported = 0
+        batch, batch_lines = [], 0
+
+        async def flush():
+            nonlocal imported, lines_imported
+            existing = await self.dao.existing_numbers([e["entry_number"] for e in batch])
+            fresh = []
+            for e in batch:
+                if e["entry_number"] in existing:
+                    parser.reject(e["entry_number"], e["row"], "entry_number already exists")
+                else:
+                    fresh.append(e)
+            if fresh:
+                lines_imported += await self.dao.bulk_insert(fresh, created_by)
+                imported += len(fresh)
+
+        async for entry in parser.entries(chunks):
+            batch.append(entry)
+            batch_lines += len(entry["lines"])
+            if batch_lines >= BULK_CHUNK_LINES:
+                await flush()
+                batch, batch_lines = [], 0
+        if batch:
+            await flush()
+
+        elapsed = time.perf_counter() - start
+        return {
+            "rows_read": parser.rows_read,
+            "entries_imported": imported,
+            "lines_imported": lines_imported,
+            "entries_rejected": parser.rejected,
+            "errors": parser.errors,
+            "elapsed_ms": round(elapsed * 1000, 2),
+            "lines_per_sec": round(lines_imported / elapsed, 2) if elapsed > 0 else 0.0,
+        }
+
 
 class TrialBalanceService:
     def __init__(self, db: AsyncSession):
@@ -50,6 +183,59 @@ class TrialBalanceService:
     async def get_comparison(self, period1: str, period2: str):
         return await self.dao.get_comparison(period1, period2)
 
+    async def stream_flux(self, period: str, compare: List[Tuple[str, str]]) -> AsyncIterator[dict]:
+        labels = [label for label, _ in compare]
+        periods = [p for _, p in compare]
+        async for r in self.dao.stream_comparison(period, periods):
+            row = r._mapping
+            comparisons = {}
+            for i, (label, p) in enumerate(zip(labels, periods), start=1):
+                comparisons[label] = {
+                    "period": p,
+                    "balance": row[f"balance_{i}"],
+                    "change": row[f"change_{i}"],
+                    "change_pct": float(row[f"change_pct_{i}"]),
+                }
+            yield {
+                "account_code": r.account_code,
+                "account_name": r.account_name,
+                "category": r.category.value if r.category else "unmapped",
+                "balance": r.balance,
+                "comparisons": comparisons,
+            }
+
+
+FLUX_OFFSETS = {"mom": 1, "qoq": 3, "yoy": 12}
+MAX_FLUX_PERIODS = 24
+
+
+def shift_period(period: str, months: int) -> str:
+    try:
+        year, month = (int(p) for p in period.split("-"))
+    except ValueError:
+        raise BadRequestException(f"Invalid period '{period}', expected YYYY-MM")
+    if not 1 <= month <= 12:
+        raise BadRequestException(f"Invalid period '{period}', expected YYYY-MM")
+    index = year * 12 + month - 1 + months
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def resolve_flux_periods(period: str, compare: List[str]) -> List[Tuple[str, str]]:
+    """Turn mom/qoq/yoy shorthands and explicit YYYY-MM periods into (label, period) pairs."""
+    shift_period(period, 0)
+    resolved = []
+    for item in compare:
+        key = item.strip().lower()
+        if key in FLUX_OFFSETS:
+            resolved.append((key, shift_period(period, -FLUX_OFFSETS[key])))
+        else:
+            resolved.append((key, shift_period(key, 0)))
+    if not resolved:
+        raise BadRequestException("At least one comparison period is required")
+    if len(resolved) > MAX_FLUX_PERIODS:
+        raise BadRequestException(f"At most {MAX_FLUX_PERIODS} comparison periods are supported")
+    return resolved
+
 
 class IntercompanyService:
     def __init__(self, db: AsyncSession):
@@ -58,8 +244,8 @@ class IntercompanyService:
     async def list_transactions(self, status=None):
         return await self.dao.get_all(status)
 
-    async def auto_match(self):
-        return await self.dao.auto_match()
+    async def auto_match(self, amount_tolerance: float = 0.01, date_tolerance_days: Optional[int] = None):
+        return await self.dao.auto_match(amount_tolerance, date_tolerance_days)
 
 
 class ReconciliationService:
@@ -69,12 +255,44 @@ class ReconciliationService:
     async def list_reconciliations(self, status=None):
         return await self.dao.get_all(status)
 
-    async def execute_reconciliation(self, recon_id: UUID):
-        recon = await self.dao.get_by_id(recon_id)
+    async def execute_reconciliation(self, recon_id: UUID, amount_tolerance: float = 0.01,
+                                     date_window_days: int = 3) -> ReconRunResult:
+        start = time.perf_counter()
+        recon = await self.dao.get_header(recon_id)
         if not recon:
             raise NotFoundException("Reconciliation", recon_id)
-        # Placeholder — AGT-045 (Auto-Reconciliation Agent) handles this
-        return {"recon_id": str(recon_id), "status": "in_progress", "message": "Reconciliation started"}
+        if recon.status == ReconStatus.COMPLETED:
+            raise BadRequestException("Reconciliation already completed")
+
+        ids, cols = await self.dao.load_item_columns(recon_id)
+        if not ids:
+            raise BadRequestException("Reconciliation has no items to match")
+        engine = ReconciliationEngine(amount_tolerance, date_window_days)
+        outcome = engine.run(cols)
+
+        status = ReconStatus.COMPLETED if outcome["unmatched_count"] == 0 else ReconStatus.EXCEPTION
+        await self.dao.apply_match_results(recon_id, ids, outcome, {
+            "status": status,
+            "matched_count": outcome["matched_count"],
+            "unmatched_count": outcome["unmatched_count"],
+            "source_balance": outcome["source_balance"],
+            "target_balance": outcome["target_balance"],
+            "difference": outcome["difference_total"],
+            "completed_at": datetime.utcnow() if status == ReconStatus.COMPLETED else None,
+        })
+        return ReconRunResult(
+            recon_id=recon_id,
+            status=status.value,
+            total_items=len(ids),
+            matched_count=outcome["matched_count"],
+            unmatched_count=outcome["unmatched_count"],
+            source_balance=outcome["source_balance"],
+            target_balance=outcome["target_balance"],
+            difference=outcome["difference_total"],
+            matches_by_rule=outcome["matches_by_rule"],
+            match_ms=outcome["elapsed_ms"],
+            total_ms=round((time.perf_counter() - start) * 1000, 2),
+        )
 
     async def get_items(self, recon_id: UUID):
         return await self.dao.get_items(recon_id)
@@ -127,3 +345,24 @@ class CloseManagementService:
         if not task:
             raise NotFoundException("Close Task", task_id)
         return task
+
+
+async def upgrade_recon_items(db: AsyncSession) -> None:
+    """Startup: bring a recon_items table that predates the reconciliation engine up to date."""
+    try:
+        await ReconciliationDAO(db).upgrade_schema()
+    except Exception as e:
+        await db.rollback()
+        logger.warning(f"recon_items upgrade skipped: {e}")
+
+
+async def backfill_account_balances(db: AsyncSession) -> None:
+    """Startup: fill account_balances from journal lines on a database that predates it."""
+    try:
+        rows = await AccountBalanceDAO(db).backfill()
+    except Exception as e:
+        await db.rollback()
+        logger.warning(f"Account balance backfill skipped: {e}")
+        return
+    if rows:
+        logger.info(f"Backfilled {rows} account balance rows")
@@ -3,6 +3,7 @@ from typing import Optional, List
 from sqlalchemy import select, func, update, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
+from app.shared.pagination import keyset_paginate, cursor_page
 from app.modules.admin.models import (
     User, Role, UserRole, ApiKey, DataConnection, AuditLog, PlatformSetting,
 )
@@ -126,14 +127,15 @@ class AuditLogDAO:
         self.db = db
 
     async def get_all(self, resource_type: Optional[str] = None, action: Optional[str] = None,
-                      limit: int = 100, offset: int = 0) -> List[AuditLog]:
+                      limit: int = 100, offset: int = 0, cursor: Optional[str] = None) -> dict:
         q = select(AuditLog)
         if resource_type:
             q = q.where(AuditLog.resource_type == resource_type)
         if action:
             q = q.where(AuditLog.action == action)
-        result = await self.db.execute(q.order_by(AuditLog.created_at.desc()).offset(offset).limit(limit))
-        return list(result.scalars().all())
+        q = keyset_paginate(q, AuditLog.created_at, AuditLog.id, cursor, limit)
+        result = await self.db.execute(q if cursor else q.offset(offset))
+        return cursor_page(list(result.scalars().all()), limit, "created_at")
 
     async def create(self, data: dict) -> AuditLog:
         entry = AuditLog(**data)
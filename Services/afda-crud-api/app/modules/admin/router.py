@@ -3,7 +3,7 @@ from typing import Optional
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
-from app.shared.responses import ApiResponse
+from app.shared.responses import ApiResponse, CursorResponse
 from app.modules.admin.service import (
     UserService, RoleService, ApiKeyService, DataConnectionService, AuditLogService, SettingsService,
 )
@@ -127,17 +127,18 @@ async def test_connection(conn_id: UUID, db: AsyncSession = Depends(get_db)):
 
 
 # ── Audit Log ──
-@router.get("/audit-log", response_model=ApiResponse[list[AuditLogOut]])
+@router.get("/audit-log", response_model=CursorResponse[AuditLogOut])
 async def get_audit_log(
     resource_type: Optional[str] = None,
     action: Optional[str] = None,
     limit: int = Query(100, ge=1, le=500),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
     db: AsyncSession = Depends(get_db),
 ):
     svc = AuditLogService(db)
-    logs = await svc.get_logs(resource_type, action, limit, offset)
-    return ApiResponse(data=logs)
+    page = await svc.get_logs(resource_type, action, limit, offset, cursor)
+    return CursorResponse(**page)
 
 
 # ── Settings ──
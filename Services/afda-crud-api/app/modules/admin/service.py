@@ -160,8 +160,8 @@ class AuditLogService:
     def __init__(self, db: AsyncSession):
         self.dao = AuditLogDAO(db)
 
-    async def get_logs(self, resource_type=None, action=None, limit=100, offset=0):
-        return await self.dao.get_all(resource_type, action, limit, offset)
+    async def get_logs(self, resource_type=None, action=None, limit=100, offset=0, cursor=None):
+        return await self.dao.get_all(resource_type, action, limit, offset, cursor)
 
     async def log(self, user_id: str, action: str, resource_type: str,
                   resource_id: str = None, details: dict = None, ip: str = None):
@@ -2,6 +2,7 @@ from uuid import UUID
 from typing import Optional, List
 from sqlalchemy import select, func, update, delete
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.shared.cache import invalidate_tags
 from app.modules.command_center.models import (
     KpiDefinition, KpiValue, ExecutiveBriefing, ActionItem,
     KpiStatus, ActionItemStatus, ActionItemPriority,
@@ -27,12 +28,14 @@ class KpiDAO:
         kpi = KpiDefinition(**data)
         self.db.add(kpi)
         await self.db.commit()
+        await invalidate_tags("kpis")
         await self.db.refresh(kpi)
         return kpi
 
     async def update(self, kpi_id: UUID, data: dict) -> Optional[KpiDefinition]:
         await self.db.execute(update(KpiDefinition).where(KpiDefinition.id == kpi_id).values(**data))
         await self.db.commit()
+        await invalidate_tags("kpis")
         return await self.get_by_id(kpi_id)
 
     async def count_by_status(self) -> dict:
@@ -42,6 +45,42 @@ class KpiDAO:
         return {row[0]: row[1] for row in result.all()}
 
 
+class OverviewDAO:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_stats(self) -> dict:
+        """KPI status counts, action item counts and latest briefing date in one statement."""
+        kpis = (
+            select(
+                func.count().label("total"),
+                func.count().filter(KpiDefinition.status == KpiStatus.ON_TRACK).label("on_track"),
+                func.count().filter(KpiDefinition.status == KpiStatus.AT_RISK).label("at_risk"),
+                func.count().filter(KpiDefinition.status == KpiStatus.OFF_TRACK).label("off_track"),
+            )
+            .where(KpiDefinition.is_active == True)
+            .cte("kpis")
+        )
+        open_items = (
+            select(func.count()).select_from(ActionItem)
+                .where(ActionItem.status == ActionItemStatus.OPEN).scalar_subquery()
+        )
+        all_items = select(func.count()).select_from(ActionItem).scalar_subquery()
+        latest_briefing = (
+            select(ExecutiveBriefing.created_at).where(ExecutiveBriefing.is_latest == True)
+                .limit(1).scalar_subquery()
+        )
+        result = await self.db.execute(
+            select(
+                kpis.c.total, kpis.c.on_track, kpis.c.at_risk, kpis.c.off_track,
+                open_items.label("open_action_items"),
+                all_items.label("all_action_items"),
+                latest_briefing.label("latest_briefing_date"),
+            )
+        )
+        return dict(result.one()._mapping)
+
+
 class BriefingDAO:
     def __init__(self, db: AsyncSession):
         self.db = db
@@ -66,6 +105,7 @@ class BriefingDAO:
         briefing = ExecutiveBriefing(**data, is_latest=True)
         self.db.add(briefing)
         await self.db.commit()
+        await invalidate_tags("briefings")
         await self.db.refresh(briefing)
         return briefing
 
@@ -99,17 +139,20 @@ class ActionItemDAO:
         item = ActionItem(**data)
         self.db.add(item)
         await self.db.commit()
+        await invalidate_tags("action_items")
         await self.db.refresh(item)
         return item
 
     async def update(self, item_id: UUID, data: dict) -> Optional[ActionItem]:
         await self.db.execute(update(ActionItem).where(ActionItem.id == item_id).values(**data))
         await self.db.commit()
+        await invalidate_tags("action_items")
         return await self.get_by_id(item_id)
 
     async def delete(self, item_id: UUID) -> bool:
         result = await self.db.execute(delete(ActionItem).where(ActionItem.id == item_id))
         await self.db.commit()
+        await invalidate_tags("action_items")
         return result.rowcount > 0
 
     async def summary(self) -> dict:
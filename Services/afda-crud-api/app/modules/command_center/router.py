@@ -3,6 +3,7 @@ from typing import Optional
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
+from app.shared.cache import cache_response
 from app.shared.responses import ApiResponse
 from app.modules.command_center.facade import CommandCenterFacade
 from app.modules.command_center.service import KpiService, BriefingService, ActionItemService
@@ -18,6 +19,7 @@ router = APIRouter()
 
 # ── Overview ──
 @router.get("/overview/stats", response_model=ApiResponse[OverviewStats])
+@cache_response(ttl=300, tags=["kpis", "action_items", "briefings"])
 async def get_overview(db: AsyncSession = Depends(get_db)):
     facade = CommandCenterFacade(db)
     stats = await facade.get_overview()
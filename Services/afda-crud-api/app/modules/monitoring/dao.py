@@ -1,9 +1,39 @@
 from uuid import UUID
 from datetime import datetime, timedelta
 from typing import Optional, List
-from sqlalchemy import select, func, update, text
+from sqlalchemy import (
+    select, func, update, delete, text, cast, literal, true, false, and_, or_, union_all, Integer, BigInteger, String,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.modules.monitoring.models import ServiceRegistry, Incident, ApiMetricsLog
+from app.database import copy_records
+from app.shared.cache import invalidate_tags
+from app.modules.monitoring import rollups
+from app.modules.monitoring.dependency_graph import (
+    DependencyGraph, cached_graph, current_generation, store_graph, invalidate_graph,
+)
+from app.modules.monitoring.models import (
+    ServiceRegistry, ServiceHealth, Incident, ApiMetricsLog, ApiMetricsRollup, RollupGranularity,
+)
+from app.modules.monitoring.sketches import LOG_GAMMA, MIN_VALUE_MS
+
+ROLLUP_LOOKBACK = timedelta(hours=24)
+ROLLUP_LOCK_ID = 0x4146_4441_0001  # pg advisory lock key for the rollup builder
+
+ROLLUP_COLUMNS = [
+    "id", "granularity", "bucket_start", "endpoint", "method", "status_class",
+    "request_count", "total_ms", "max_ms", "last_recorded_at", "buckets",
+]
+ROLLUP_COUNTER_COLUMNS = ROLLUP_COLUMNS[6:]
+
+# 2 for 2xx, 5 for 5xx; integer division in Postgres
+STATUS_CLASS = ApiMetricsLog.status_code // 100
+LATENCY_BUCKET = cast(func.ceil(func.ln(func.greatest(ApiMetricsLog.response_time_ms, MIN_VALUE_MS)) / LOG_GAMMA), Integer)
+
+METRICS_COLUMNS = [
+    "id", "endpoint", "method", "status_code", "response_time_ms", "request_size_bytes",
+    "response_size_bytes", "user_id", "error_message", "recorded_at",
+]
 
 
 class ServiceRegistryDAO:
@@ -30,12 +60,75 @@ class ServiceRegistryDAO:
         result = await self.db.execute(select(func.avg(ServiceRegistry.uptime_pct)))
         return round(result.scalar() or 0, 2)
 
+    async def get_health_stats(self) -> dict:
+        """Status counts, average uptime and active incidents in a single statement."""
+        active_incidents = (
+            select(func.count()).select_from(Incident)
+                .where(Incident.status.in_(["open", "investigating", "mitigated"]))
+                .scalar_subquery()
+        )
+        result = await self.db.execute(
+            select(
+                func.count().label("total"),
+                func.count().filter(ServiceRegistry.status == ServiceHealth.HEALTHY).label("healthy"),
+                func.count().filter(ServiceRegistry.status == ServiceHealth.DEGRADED).label("degraded"),
+                func.count().filter(ServiceRegistry.status == ServiceHealth.DOWN).label("down"),
+                func.coalesce(func.avg(ServiceRegistry.uptime_pct), 0.0).label("avg_uptime"),
+                active_incidents.label("active_incidents"),
+            )
+        )
+        return dict(result.one()._mapping)
+
+    async def get_dependency_graph(self) -> DependencyGraph:
+        graph = cached_graph()
+        if graph is None:
+            generation = current_generation()
+            result = await self.db.execute(
+                select(ServiceRegistry.service_name, ServiceRegistry.status, ServiceRegistry.depends_on)
+            )
+            graph = DependencyGraph([
+                (name, status.value, depends_on if isinstance(depends_on, list) else [])
+                for name, status, depends_on in result.all()
+            ])
+            store_graph(graph, generation)
+        return graph
+
     async def update_status(self, service_name: str, status: str, error: Optional[str] = None):
         data = {"status": status, "last_check_at": datetime.utcnow(), "last_error": error}
         await self.db.execute(
             update(ServiceRegistry).where(ServiceRegistry.service_name == service_name).values(**data)
         )
         await self.db.commit()
+        invalidate_graph()
+        await invalidate_tags("services")
+
+    async def update_statuses(self, results: list, checked_at: datetime) -> int:
+        """Write one probe sweep back in a single UPDATE.
+
+        `results` holds (service_name, status, uptime_pct, last_error) tuples.
+        """
+        if not results:
+            return 0
+        names, statuses, uptimes, errors = zip(*results)
+        res = await self.db.execute(
+            text(
+                "UPDATE service_registry AS s "
+                "SET status = v.status, uptime_pct = v.uptime_pct, last_error = v.last_error, "
+                "    last_check_at = :checked_at, updated_at = :checked_at "
+                "FROM unnest(CAST(:names AS varchar[]), CAST(:statuses AS servicehealth[]), "
+                "            CAST(:uptimes AS double precision[]), CAST(:errors AS text[])) "
+                "     AS v(service_name, status, uptime_pct, last_error) "
+                "WHERE s.service_name = v.service_name"
+            ),
+            {
+                "names": list(names), "statuses": [s.name for s in statuses],
+                "uptimes": list(uptimes), "errors": list(errors), "checked_at": checked_at,
+            },
+        )
+        await self.db.commit()
+        invalidate_graph()
+        await invalidate_tags("services")
+        return res.rowcount
 
 
 class IncidentDAO:
@@ -67,64 +160,307 @@ class ApiMetricsDAO:
         )
         return list(result.scalars().all())
 
-    async def get_summary_24h(self) -> dict:
-        cutoff = datetime.utcnow() - timedelta(hours=24)
-        total_q = await self.db.execute(
-            select(func.count()).select_from(ApiMetricsLog).where(ApiMetricsLog.recorded_at >= cutoff)
+    async def insert_batch(self, records: list) -> int:
+        """COPY recorder rows (METRICS_COLUMNS order) into api_metrics_log."""
+        await copy_records(self.db, "api_metrics_log", METRICS_COLUMNS, records)
+        await self.db.commit()
+        return len(records)
+
+    async def get_rollup_watermarks(self) -> dict:
+        """Start of the last built bucket per granularity (None if never built)."""
+        marks = [
+            select(func.max(ApiMetricsRollup.bucket_start))
+                .where(ApiMetricsRollup.granularity == level)
+                .scalar_subquery()
+                .label(level.name)
+            for level in rollups.LEVELS
+        ]
+        result = await self.db.execute(select(*marks))
+        row = result.one()._mapping
+        return {level: row[level.name] for level in rollups.LEVELS}
+
+    async def plan_window(self, start: datetime, end: datetime) -> tuple:
+        """Rollup segments and raw ranges that together cover [start, end)."""
+        marks = await self.get_rollup_watermarks()
+        covered = {
+            level: mark + rollups.WIDTHS[level] if mark is not None else None
+            for level, mark in marks.items()
+        }
+        return rollups.plan_window(start, end, covered)
+
+    def _window_filters(self, window: tuple):
+        segments, raw = window
+        in_rollup = or_(false(), *(
+            and_(
+                ApiMetricsRollup.granularity == level,
+                ApiMetricsRollup.bucket_start >= lo,
+                ApiMetricsRollup.bucket_start < hi,
+            )
+            for level, lo, hi in segments
+        ))
+        in_raw = or_(false(), *(
+            and_(ApiMetricsLog.recorded_at >= lo, ApiMetricsLog.recorded_at < hi) for lo, hi in raw
+        ))
+        return in_rollup, in_raw
+
+    def _counters(self, window: tuple):
+        """Per (endpoint, method, status class) counters over the window: rollups plus raw tail."""
+        in_rollup, in_raw = self._window_filters(window)
+        rolled = (
+            select(
+                ApiMetricsRollup.endpoint,
+                ApiMetricsRollup.method,
+                ApiMetricsRollup.status_class,
+                ApiMetricsRollup.request_count.label("requests"),
+                ApiMetricsRollup.total_ms,
+                ApiMetricsRollup.max_ms,
+                ApiMetricsRollup.last_recorded_at,
+            )
+            .where(in_rollup)
         )
-        avg_q = await self.db.execute(
-            select(func.avg(ApiMetricsLog.response_time_ms)).where(ApiMetricsLog.recorded_at >= cutoff)
+        tail = (
+            select(
+                ApiMetricsLog.endpoint,
+                ApiMetricsLog.method,
+                STATUS_CLASS,
+                func.count(),
+                func.sum(ApiMetricsLog.response_time_ms),
+                func.max(ApiMetricsLog.response_time_ms),
+                func.max(ApiMetricsLog.recorded_at),
+            )
+            .where(in_raw)
+            .group_by(ApiMetricsLog.endpoint, ApiMetricsLog.method, STATUS_CLASS)
         )
-        error_q = await self.db.execute(
-            select(func.count()).select_from(ApiMetricsLog)
-                .where(ApiMetricsLog.recorded_at >= cutoff, ApiMetricsLog.status_code >= 500)
+        return union_all(rolled, tail).subquery()
+
+    async def get_totals(self, window: tuple) -> dict:
+        counters = self._counters(window)
+        result = await self.db.execute(
+            select(
+                func.coalesce(func.sum(counters.c.requests), 0).label("total"),
+                func.coalesce(func.sum(counters.c.total_ms), 0.0).label("total_ms"),
+                func.coalesce(func.sum(counters.c.requests).filter(counters.c.status_class == 5), 0).label("errors"),
+            )
         )
-        total = total_q.scalar() or 0
-        errors = error_q.scalar() or 0
+        row = result.one()
+        total = int(row.total)
         return {
-            "total_requests_24h": total,
-            "avg_response_ms": round(avg_q.scalar() or 0, 2),
-            "error_rate_pct": round((errors / total * 100) if total else 0, 2),
+            "total_requests": total,
+            "avg_response_ms": round(row.total_ms / total, 2) if total else 0,
+            "error_rate_pct": round(row.errors / total * 100, 2) if total else 0,
         }
 
-    async def get_by_endpoint(self) -> list:
+    async def get_by_endpoint(self, window: tuple, limit: Optional[int] = None) -> list:
+        counters = self._counters(window)
+        total = func.sum(counters.c.requests)
+        avg_ms = func.sum(counters.c.total_ms) / func.nullif(total, 0)
         result = await self.db.execute(
             select(
-                ApiMetricsLog.endpoint,
-                ApiMetricsLog.method,
-                func.count().label("total_requests"),
-                func.avg(ApiMetricsLog.response_time_ms).label("avg_response_ms"),
-                func.max(ApiMetricsLog.recorded_at).label("last_called_at"),
+                counters.c.endpoint,
+                counters.c.method,
+                total.label("total_requests"),
+                func.coalesce(func.sum(counters.c.requests).filter(counters.c.status_class == 5), 0).label("errors"),
+                avg_ms.label("avg_response_ms"),
+                func.max(counters.c.max_ms).label("max_response_ms"),
+                func.max(counters.c.last_recorded_at).label("last_called_at"),
             )
-            .group_by(ApiMetricsLog.endpoint, ApiMetricsLog.method)
-            .order_by(func.avg(ApiMetricsLog.response_time_ms).desc())
+            .group_by(counters.c.endpoint, counters.c.method)
+            .order_by(avg_ms.desc().nulls_last())
+            .limit(limit)
         )
         return [dict(row._mapping) for row in result.all()]
 
-    async def get_status_distribution(self) -> dict:
-        cutoff = datetime.utcnow() - timedelta(hours=24)
+    async def get_status_distribution(self, window: tuple) -> dict:
+        counters = self._counters(window)
         result = await self.db.execute(
-            select(ApiMetricsLog.status_code, func.count())
-                .where(ApiMetricsLog.recorded_at >= cutoff)
-                .group_by(ApiMetricsLog.status_code)
+            select(counters.c.status_class, func.sum(counters.c.requests))
+                .group_by(counters.c.status_class)
+                .order_by(counters.c.status_class)
         )
-        return {str(row[0]): row[1] for row in result.all()}
+        return {f"{row[0]}xx": int(row[1]) for row in result.all()}
 
-    async def get_latency_percentiles(self) -> dict:
-        cutoff = datetime.utcnow() - timedelta(hours=24)
+    async def get_latency_buckets(self, window: tuple, per_endpoint: bool = False) -> list:
+        """Merged sketch buckets over the window: rollup buckets plus the raw tail."""
+        in_rollup, in_raw = self._window_filters(window)
+        kv = func.jsonb_each_text(ApiMetricsRollup.buckets).table_valued("key", "value").alias("kv")
+        rolled = (
+            select(
+                ApiMetricsRollup.endpoint,
+                ApiMetricsRollup.method,
+                cast(kv.c.key, Integer).label("bucket"),
+                cast(kv.c.value, BigInteger).label("n"),
+            )
+            .select_from(ApiMetricsRollup)
+            .join(kv, true())
+            .where(in_rollup)
+        )
+        tail = (
+            select(ApiMetricsLog.endpoint, ApiMetricsLog.method, LATENCY_BUCKET.label("bucket"), func.count().label("n"))
+            .where(in_raw)
+            .group_by(ApiMetricsLog.endpoint, ApiMetricsLog.method, LATENCY_BUCKET)
+        )
+        merged = union_all(rolled, tail).subquery()
+        keys = [merged.c.endpoint, merged.c.method] if per_endpoint else []
         result = await self.db.execute(
-            select(ApiMetricsLog.response_time_ms)
-                .where(ApiMetricsLog.recorded_at >= cutoff)
-                .order_by(ApiMetricsLog.response_time_ms)
-        )
-        values = [row[0] for row in result.all()]
-        if not values:
-            return {"p50": 0, "p75": 0, "p90": 0, "p95": 0, "p99": 0}
-        n = len(values)
-        return {
-            "p50": values[int(n * 0.50)] if n else 0,
-            "p75": values[int(n * 0.75)] if n else 0,
-            "p90": values[int(n * 0.90)] if n else 0,
-            "p95": values[min(int(n * 0.95), n - 1)] if n else 0,
-            "p99": values[min(int(n * 0.99), n - 1)] if n else 0,
+            select(*keys, merged.c.bucket, func.sum(merged.c.n).label("n")).group_by(*keys, merged.c.bucket)
+        )
+        return [tuple(row) for row in result.all()]
+
+    async def build_rollups(self, until: datetime) -> dict:
+        """Fold raw rows into 1m buckets, 1m into 1h and 1h into 1d, up to `until`.
+
+        Only complete buckets are built. Each level resumes from its last built
+        bucket and rebuilds it so rows that landed late are picked up; upserts
+        make the rebuild idempotent. Concurrent builders skip via an advisory lock.
+        """
+        locked = await self.db.execute(select(func.pg_try_advisory_xact_lock(ROLLUP_LOCK_ID)))
+        if not locked.scalar():
+            return {}
+        marks = await self.get_rollup_watermarks()
+        minute_until = rollups.floor_to(until, rollups.WIDTHS[RollupGranularity.MINUTE])
+        built = {
+            RollupGranularity.MINUTE: await self._build_minutes(
+                marks[RollupGranularity.MINUTE] or minute_until - ROLLUP_LOOKBACK, minute_until,
+            ),
         }
+        for finer, level in ((RollupGranularity.MINUTE, RollupGranularity.HOUR),
+                             (RollupGranularity.HOUR, RollupGranularity.DAY)):
+            level_until = rollups.floor_to(until, rollups.WIDTHS[level])
+            built[level] = await self._build_from(finer, level, marks[level] or rollups.EPOCH, level_until)
+        await self.db.commit()
+        return {level.value: count for level, count in built.items()}
+
+    async def _build_minutes(self, start: datetime, end: datetime) -> int:
+        minute = func.date_trunc("minute", ApiMetricsLog.recorded_at)
+        per_bucket = (
+            select(
+                minute.label("bucket_start"),
+                ApiMetricsLog.endpoint,
+                ApiMetricsLog.method,
+                STATUS_CLASS.label("status_class"),
+                LATENCY_BUCKET.label("bucket"),
+                func.count().label("n"),
+                func.sum(ApiMetricsLog.response_time_ms).label("total_ms"),
+                func.max(ApiMetricsLog.response_time_ms).label("max_ms"),
+                func.max(ApiMetricsLog.recorded_at).label("last_recorded_at"),
+            )
+            .where(ApiMetricsLog.recorded_at >= start, ApiMetricsLog.recorded_at < end)
+            .group_by(minute, ApiMetricsLog.endpoint, ApiMetricsLog.method, STATUS_CLASS, LATENCY_BUCKET)
+            .subquery()
+        )
+        keys = [per_bucket.c.bucket_start, per_bucket.c.endpoint, per_bucket.c.method, per_bucket.c.status_class]
+        source = (
+            select(
+                func.gen_random_uuid(),
+                literal(RollupGranularity.MINUTE, ApiMetricsRollup.granularity.type),
+                *keys,
+                func.sum(per_bucket.c.n),
+                func.sum(per_bucket.c.total_ms),
+                func.max(per_bucket.c.max_ms),
+                func.max(per_bucket.c.last_recorded_at),
+                func.jsonb_object_agg(cast(per_bucket.c.bucket, String), per_bucket.c.n),
+            )
+            .group_by(*keys)
+        )
+        return await self._upsert_rollups(source)
+
+    async def _build_from(self, finer: RollupGranularity, level: RollupGranularity, start: datetime, end: datetime) -> int:
+        """Merge `finer` rollups into `level` buckets: counters are summed, sketch buckets added key by key."""
+        bucket_start = func.date_trunc(rollups.TRUNC_UNITS[level], ApiMetricsRollup.bucket_start)
+        dims = [ApiMetricsRollup.endpoint, ApiMetricsRollup.method, ApiMetricsRollup.status_class]
+        in_range = (
+            ApiMetricsRollup.granularity == finer,
+            ApiMetricsRollup.bucket_start >= start,
+            ApiMetricsRollup.bucket_start < end,
+        )
+        kv = func.jsonb_each_text(ApiMetricsRollup.buckets).table_valued("key", "value").alias("kv")
+        per_bucket = (
+            select(
+                bucket_start.label("bucket_start"),
+                *dims,
+                kv.c.key.label("bucket"),
+                func.sum(cast(kv.c.value, BigInteger)).label("n"),
+            )
+            .select_from(ApiMetricsRollup)
+            .join(kv, true())
+            .where(*in_range)
+            .group_by(bucket_start, *dims, kv.c.key)
+            .subquery()
+        )
+        sketches = (
+            select(
+                per_bucket.c.bucket_start,
+                per_bucket.c.endpoint,
+                per_bucket.c.method,
+                per_bucket.c.status_class,
+                func.jsonb_object_agg(per_bucket.c.bucket, per_bucket.c.n).label("buckets"),
+            )
+            .group_by(per_bucket.c.bucket_start, per_bucket.c.endpoint, per_bucket.c.method, per_bucket.c.status_class)
+            .subquery()
+        )
+        totals = (
+            select(
+                bucket_start.label("bucket_start"),
+                *dims,
+                func.sum(ApiMetricsRollup.request_count).label("request_count"),
+                func.sum(ApiMetricsRollup.total_ms).label("total_ms"),
+                func.max(ApiMetricsRollup.max_ms).label("max_ms"),
+                func.max(ApiMetricsRollup.last_recorded_at).label("last_recorded_at"),
+            )
+            .where(*in_range)
+            .group_by(bucket_start, *dims)
+            .subquery()
+        )
+        keys = ("bucket_start", "endpoint", "method", "status_class")
+        source = (
+            select(
+                func.gen_random_uuid(),
+                literal(level, ApiMetricsRollup.granularity.type),
+                *(totals.c[k] for k in keys),
+                totals.c.request_count,
+                totals.c.total_ms,
+                totals.c.max_ms,
+                totals.c.last_recorded_at,
+                sketches.c.buckets,
+            )
+            .join_from(totals, sketches, and_(*(totals.c[k] == sketches.c[k] for k in keys)))
+        )
+        return await self._upsert_rollups(source)
+
+    async def _upsert_rollups(self, source) -> int:
+        stmt = pg_insert(ApiMetricsRollup).from_select(ROLLUP_COLUMNS, source)
+        result = await self.db.execute(stmt.on_conflict_do_update(
+            constraint="uq_api_metrics_rollups_bucket",
+            set_={column: stmt.excluded[column] for column in ROLLUP_COUNTER_COLUMNS},
+        ))
+        return result.rowcount
+
+    async def prune(self, now: datetime, raw_retention: timedelta, retention: dict) -> dict:
+        """Apply retention: raw rows and each rollup level are deleted once past their
+        retention, but never before the next coarser level has absorbed them."""
+        marks = await self.get_rollup_watermarks()
+        covered = {
+            level: mark + rollups.WIDTHS[level] if mark is not None else None
+            for level, mark in marks.items()
+        }
+        deleted = {}
+        if covered[RollupGranularity.MINUTE] is not None:
+            cutoff = min(now - raw_retention, covered[RollupGranularity.MINUTE])
+            result = await self.db.execute(delete(ApiMetricsLog).where(ApiMetricsLog.recorded_at < cutoff))
+            deleted["raw"] = result.rowcount
+        for level, coarser in ((RollupGranularity.MINUTE, RollupGranularity.HOUR),
+                               (RollupGranularity.HOUR, RollupGranularity.DAY),
+                               (RollupGranularity.DAY, None)):
+            cutoff = now - retention[level]
+            if coarser is not None:
+                if covered[coarser] is None:
+                    continue
+                cutoff = min(cutoff, covered[coarser])
+            result = await self.db.execute(
+                delete(ApiMetricsRollup).where(
+                    ApiMetricsRollup.granularity == level, ApiMetricsRollup.bucket_start < cutoff,
+                )
+            )
+            deleted[level.value] = result.rowcount
+        await self.db.commit()
+        return deleted
@@ -0,0 +1,193 @@
+import time
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+# (service_name, status, depends_on)
+ServiceRow = Tuple[str, str, Sequence[str]]
+
+# Statuses change with every probe sweep, so the cache is short-lived even though
+# local registry writes invalidate it immediately.
+GRAPH_TTL_SECONDS = 10
+
+UNHEALTHY = ("down", "degraded")
+
+
+class DependencyGraph:
+    """Adjacency index over service_registry.depends_on.
+
+    Services are numbered in name order and edges are kept both ways as int
+    lists, so blast radius is a BFS over dependents and never touches the DB.
+    Topological order (dependencies first) comes from Kahn's algorithm and
+    cycles from Tarjan's SCC pass, both once per build. Dependencies on names
+    that are not registered are reported rather than followed.
+    """
+
+    def __init__(self, rows: Sequence[ServiceRow]):
+        rows = sorted(rows, key=lambda r: r[0])
+        self.names: List[str] = [r[0] for r in rows]
+        self.statuses: List[str] = [r[1] for r in rows]
+        self.index: Dict[str, int] = {name: i for i, name in enumerate(self.names)}
+        n = len(self.names)
+        self.deps: List[List[int]] = [[] for _ in range(n)]
+        self.dependents: List[List[int]] = [[] for _ in range(n)]
+        self.unknown: Dict[str, List[str]] = {}
+        for i, (name, _, depends_on) in enumerate(rows):
+            for dep in dict.fromkeys(depends_on or ()):
+                j = self.index.get(dep)
+                if j is None:
+                    self.unknown.setdefault(name, []).append(dep)
+                else:
+                    self.deps[i].append(j)
+                    self.dependents[j].append(i)
+
+        self.scc = self._strongly_connected()
+        self.cycles: List[List[str]] = []
+        members: Dict[int, List[int]] = {}
+        for i, c in enumerate(self.scc):
+            members.setdefault(c, []).append(i)
+        for group in members.values():
+            if len(group) > 1 or group[0] in self.deps[group[0]]:
+                self.cycles.append([self.names[i] for i in group])
+        self.order: List[str] = self._topological_order()
+        self._blast: Dict[int, List[int]] = {}
+        self._impact: Optional[dict] = None
+        self.built_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _strongly_connected(self) -> List[int]:
+        """Iterative Tarjan; returns the component id of every node."""
+        n = len(self.names)
+        low, num, comp = [0] * n, [-1] * n, [-1] * n
+        stack, on_stack = [], [False] * n
+        counter = components = 0
+        for root in range(n):
+            if num[root] >= 0:
+                continue
+            work = [(root, 0)]
+            while work:
+                v, k = work.pop()
+                if k == 0:
+                    num[v] = low[v] = counter
+                    counter += 1
+                    stack.append(v)
+                    on_stack[v] = True
+                if k < len(self.deps[v]):
+                    work.append((v, k + 1))
+                    w = self.deps[v][k]
+                    if num[w] < 0:
+                        work.append((w, 0))
+                    elif on_stack[w]:
+                        low[v] = min(low[v], num[w])
+                    continue
+                if low[v] == num[v]:
+                    while True:
+                        w = stack.pop()
+                        on_stack[w] = False
+                        comp[w] = components
+                        if w == v:
+                            break
+                    components += 1
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[v])
+        return comp
+
+    def _topological_order(self) -> List[str]:
+        """Dependencies before dependents; services on or behind a cycle are appended last in name order."""
+        remaining = [len(d) for d in self.deps]
+        ready = deque(i for i, r in enumerate(remaining) if r == 0)
+        order = []
+        while ready:
+            i = ready.popleft()
+            order.append(i)
+            for j in self.dependents[i]:
+                remaining[j] -= 1
+                if remaining[j] == 0:
+                    ready.append(j)
+        placed = set(order)
+        order.extend(i for i in range(len(self.names)) if i not in placed)
+        return [self.names[i] for i in order]
+
+    def blast_radius(self, name: str) -> List[str]:
+        """Every service that transitively depends on `name`, nearest first."""
+        i = self.index[name]
+        if i not in self._blast:
+            self._blast[i] = self._reach(i)
+        return [self.names[j] for j in self._blast[i]]
+
+    def _reach(self, start: int) -> List[int]:
+        seen = {start}
+        queue = deque([start])
+        reached = []
+        while queue:
+            for j in self.dependents[queue.popleft()]:
+                if j not in seen:
+                    seen.add(j)
+                    reached.append(j)
+                    queue.append(j)
+        return reached
+
+    def impact(self) -> dict:
+        """Current blast radius of every unhealthy service.
+
+        Root causes are unhealthy services with no unhealthy dependency outside
+        their own cycle; every service they reach is impacted and lists the
+        root causes that reach it.
+        """
+        if self._impact is not None:
+            return self._impact
+        unhealthy = [i for i, s in enumerate(self.statuses) if s in UNHEALTHY]
+        reached_by: Dict[int, Set[int]] = {}
+        for u in unhealthy:
+            if u not in self._blast:
+                self._blast[u] = self._reach(u)
+            for v in self._blast[u]:
+                reached_by.setdefault(v, set()).add(u)
+        roots = [
+            u for u in unhealthy
+            if all(self.scc[r] == self.scc[u] for r in reached_by.get(u, ()))
+        ]
+        root_set = set(roots)
+        impacted = []
+        for v in sorted(reached_by, key=lambda i: self.names[i]):
+            causes = sorted(self.names[r] for r in reached_by[v] & root_set if r != v)
+            if causes:
+                impacted.append({
+                    "service_name": self.names[v],
+                    "status": self.statuses[v],
+                    "caused_by": causes,
+                })
+        self._impact = {
+            "root_causes": [self.names[u] for u in roots],
+            "impacted": impacted,
+        }
+        return self._impact
+
+
+_cached: Optional[DependencyGraph] = None
+_generation = 0
+
+
+def cached_graph() -> Optional[DependencyGraph]:
+    if _cached is not None and time.monotonic() - _cached.built_at < GRAPH_TTL_SECONDS:
+        return _cached
+    return None
+
+
+def current_generation() -> int:
+    return _generation
+
+
+def store_graph(graph: DependencyGraph, generation: int) -> None:
+    """Cache a freshly built graph unless the registry changed while it was loading."""
+    global _cached
+    if generation == _generation:
+        _cached = graph
+
+
+def invalidate_graph() -> None:
+    global _cached, _generation
+    _cached = None
+    _generation += 1
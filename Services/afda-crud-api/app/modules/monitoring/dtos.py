@@ -39,6 +39,21 @@ class DependencyNode(BaseModel):
     depends_on: List[str]
 
 
+class ImpactedService(BaseModel):
+    service_name: str
+    status: str
+    caused_by: List[str]
+
+
+class ServiceImpactReport(BaseModel):
+    failed_service: Optional[str] = None  # set when asking "what if this service goes down"
+    root_causes: List[str]
+    impacted: List[ImpactedService]
+    topological_order: List[str]  # dependencies first
+    cycles: List[List[str]]
+    unknown_dependencies: Dict[str, List[str]]
+
+
 # ── API Metrics ──
 class ApiMetricsOut(BaseModel):
     id: UUID
@@ -78,6 +93,17 @@ class ApiMetricsSummary(BaseModel):
     status_code_distribution: Dict[str, int]
 
 
+class MetricsRecorderStats(BaseModel):
+    buffered: int
+    capacity: int
+    recorded: int
+    flushed: int
+    dropped_buffer_full: int
+    dropped_flush_failed: int
+    flush_errors: int
+    last_flush_ms: float
+
+
 # ── Incident ──
 class IncidentOut(BaseModel):
     id: UUID
@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import String, Text, Float, Integer, Boolean, DateTime, Enum as SAEnum
+from sqlalchemy import String, Text, Float, Integer, SmallInteger, Boolean, DateTime, Index, UniqueConstraint, Enum as SAEnum
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from app.database import Base
@@ -63,4 +63,33 @@ class ApiMetricsLog(Base):
     response_size_bytes: Mapped[int] = mapped_column(Integer, default=0)
     user_id: Mapped[str] = mapped_column(String(200), nullable=True)
     error_message: Mapped[str] = mapped_column(Text, nullable=True)
-    recorded_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    recorded_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
+
+
+class RollupGranularity(str, enum.Enum):
+    MINUTE = "1m"
+    HOUR = "1h"
+    DAY = "1d"
+
+
+class ApiMetricsRollup(Base):
+    __tablename__ = "api_metrics_rollups"
+    __table_args__ = (
+        UniqueConstraint(
+            "granularity", "bucket_start", "endpoint", "method", "status_class",
+            name="uq_api_metrics_rollups_bucket",
+        ),
+        Index("ix_api_metrics_rollups_granularity_bucket", "granularity", "bucket_start"),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    granularity: Mapped[RollupGranularity] = mapped_column(SAEnum(RollupGranularity), nullable=False)
+    bucket_start: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    endpoint: Mapped[str] = mapped_column(String(300), nullable=False)
+    method: Mapped[str] = mapped_column(String(10), nullable=False)
+    status_class: Mapped[int] = mapped_column(SmallInteger, nullable=False)  # 2 for 2xx, 5 for 5xx
+    request_count: Mapped[int] = mapped_column(Integer, default=0)
+    total_ms: Mapped[float] = mapped_column(Float, default=0.0)
+    max_ms: Mapped[float] = mapped_column(Float, default=0.0)
+    last_recorded_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+    buckets: Mapped[dict] = mapped_column(JSONB, nullable=False)  # {"<log-gamma bucket>": count}
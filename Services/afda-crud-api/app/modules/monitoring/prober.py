@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+import httpx
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import get_settings
+from app.modules.monitoring.dao import ServiceRegistryDAO
+from app.modules.monitoring.models import ServiceHealth, ServiceRegistry
+
+logger = logging.getLogger("afda")
+settings = get_settings()
+
+
+class UptimeRing:
+    """Fixed-size ring of the last `size` probe results (1 = up, 0 = down).
+
+    Keeps a running count of ups so recording a result and reading the rolling
+    uptime are both O(1), at one byte per remembered probe.
+    """
+
+    __slots__ = ("results", "pos", "filled", "ups")
+
+    def __init__(self, size: int):
+        self.results = bytearray(size)
+        self.pos = 0
+        self.filled = 0
+        self.ups = 0
+
+    def record(self, up: bool) -> None:
+        if self.filled == len(self.results):
+            self.ups -= self.results[self.pos]
+        else:
+            self.filled += 1
+        self.results[self.pos] = 1 if up else 0
+        self.ups += self.results[self.pos]
+        self.pos = (self.pos + 1) % len(self.results)
+
+    @property
+    def uptime_pct(self) -> float:
+        return round(self.ups / self.filled * 100, 2) if self.filled else 100.0
+
+
+class HealthProber:
+    """Probes every registered service concurrently and writes the sweep back in one UPDATE.
+
+    Services with a health_endpoint get an HTTP GET through a shared pooled
+    client; the rest get a TCP connect. Every probe is bounded by `timeout`
+    and at most `concurrency` run at once, so a sweep over hundreds of
+    services takes roughly one timeout even when many of them hang.
+    """
+
+    def __init__(self, timeout: float, concurrency: int, degraded_ms: float, window: int):
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.degraded_ms = degraded_ms
+        self.window = window
+        self.rings: Dict[str, UptimeRing] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+            )
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def probe(self, service: ServiceRegistry) -> Tuple[ServiceHealth, Optional[str]]:
+        started = time.perf_counter()
+        try:
+            if service.health_endpoint:
+                path = service.health_endpoint if service.health_endpoint.startswith("/") else f"/{service.health_endpoint}"
+                url = f"http://{service.host}:{service.port}{path}"
+                response = await self._get_client().get(url)
+                if response.status_code >= 500:
+                    return ServiceHealth.DOWN, f"HTTP {response.status_code}"
+                if response.status_code >= 400:
+                    return ServiceHealth.DEGRADED, f"HTTP {response.status_code}"
+            else:
+                _, writer = await asyncio.wait_for(
+                    asyncio.open_connection(service.host, service.port), timeout=self.timeout,
+                )
+                writer.close()
+                await writer.wait_closed()
+        except (httpx.TimeoutException, asyncio.TimeoutError):
+            return ServiceHealth.DOWN, f"Timed out after {self.timeout}s"
+        except Exception as e:  # one bad registry row must not abort the whole sweep
+            return ServiceHealth.DOWN, str(e) or type(e).__name__
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if elapsed_ms > self.degraded_ms:
+            return ServiceHealth.DEGRADED, f"Slow response: {elapsed_ms:.0f}ms"
+        return ServiceHealth.HEALTHY, None
+
+    async def sweep(self, db: AsyncSession) -> int:
+        """Probe all services once and persist status, rolling uptime and last error."""
+        dao = ServiceRegistryDAO(db)
+        services = await dao.get_all()
+        if not services:
+            return 0
+        await db.commit()  # release the pooled connection while probes are in flight
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def bounded(service: ServiceRegistry):
+            async with semaphore:
+                return await self.probe(service)
+
+        outcomes = await asyncio.gather(*(bounded(s) for s in services))
+        results = []
+        for service, (status, error) in zip(services, outcomes):
+            ring = self.rings.get(service.service_name)
+            if ring is None:
+                ring = self.rings[service.service_name] = UptimeRing(self.window)
+            ring.record(status != ServiceHealth.DOWN)
+            results.append((service.service_name, status, ring.uptime_pct, error))
+        known = {s.service_name for s in services}
+        for name in list(self.rings):
+            if name not in known:
+                del self.rings[name]
+        return await dao.update_statuses(results, datetime.utcnow())
+
+
+health_prober = HealthProber(
+    timeout=settings.HEALTH_PROBE_TIMEOUT_SECONDS,
+    concurrency=settings.HEALTH_PROBE_CONCURRENCY,
+    degraded_ms=settings.HEALTH_PROBE_DEGRADED_MS,
+    window=settings.HEALTH_PROBE_WINDOW,
+)
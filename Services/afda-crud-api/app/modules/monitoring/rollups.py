@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from app.modules.monitoring.models import RollupGranularity
+
+EPOCH = datetime(1970, 1, 1)
+
+# Coarsest first; each level is built from the one below it
+LEVELS = [RollupGranularity.DAY, RollupGranularity.HOUR, RollupGranularity.MINUTE]
+WIDTHS = {
+    RollupGranularity.DAY: timedelta(days=1),
+    RollupGranularity.HOUR: timedelta(hours=1),
+    RollupGranularity.MINUTE: timedelta(minutes=1),
+}
+TRUNC_UNITS = {
+    RollupGranularity.DAY: "day",
+    RollupGranularity.HOUR: "hour",
+    RollupGranularity.MINUTE: "minute",
+}
+
+Segment = Tuple[RollupGranularity, datetime, datetime]
+Range = Tuple[datetime, datetime]
+
+
+def floor_to(ts: datetime, width: timedelta) -> datetime:
+    return EPOCH + (ts - EPOCH) // width * width
+
+
+def ceil_to(ts: datetime, width: timedelta) -> datetime:
+    floored = floor_to(ts, width)
+    return floored if floored == ts else floored + width
+
+
+def plan_window(
+    start: datetime, end: datetime, covered_until: Dict[RollupGranularity, Optional[datetime]],
+) -> Tuple[List[Segment], List[Range]]:
+    """Tile [start, end) with the coarsest rollups that fully cover each part.
+
+    `covered_until` is the end of the last built bucket per granularity. Whole
+    days come from the 1d rollup, the hours either side of them from 1h, the
+    remaining minutes from 1m, and anything newer than the last built minute
+    from the raw log. Returns the rollup segments and the raw ranges.
+    """
+    segments: List[Segment] = []
+    raw: List[Range] = []
+
+    def tile(lo: datetime, hi: datetime, levels: list) -> None:
+        if lo >= hi:
+            return
+        if not levels:
+            raw.append((lo, hi))
+            return
+        level, finer = levels[0], levels[1:]
+        width = WIDTHS[level]
+        inner_lo = ceil_to(lo, width)
+        inner_hi = floor_to(hi, width)
+        if covered_until.get(level) is not None:
+            inner_hi = min(inner_hi, covered_until[level])
+        else:
+            inner_hi = inner_lo
+        if inner_lo >= inner_hi:
+            tile(lo, hi, finer)
+            return
+        tile(lo, inner_lo, finer)
+        segments.append((level, inner_lo, inner_hi))
+        tile(inner_hi, hi, finer)
+
+    tile(floor_to(start, WIDTHS[RollupGranularity.MINUTE]), end, LEVELS)
+    return segments, raw
@@ -1,22 +1,27 @@
 from typing import Optional
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
+from app.config import get_settings
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
+from app.middleware.metrics_recorder import metrics_recorder
+from app.shared.cache import cache_response
 from app.shared.responses import ApiResponse
 from app.modules.monitoring.service import (
     SystemHealthService, ServiceStatusService, ApiMetricsService, GrafanaService,
 )
 from app.modules.monitoring.dtos import (
-    ServiceOut, SystemHealthSummary, DependencyNode,
-    ApiMetricsSummary, LatencyPercentiles,
+    ServiceOut, SystemHealthSummary, DependencyNode, ServiceImpactReport,
+    ApiMetricsSummary, LatencyPercentiles, MetricsRecorderStats,
     GrafanaDashboard,
 )
 
 router = APIRouter()
+settings = get_settings()
 
 
 # ── System Health ──
 @router.get("/system-health", response_model=ApiResponse[SystemHealthSummary])
+@cache_response(ttl=60, tags=["services", "incidents"])
 async def system_health(db: AsyncSession = Depends(get_db)):
     svc = SystemHealthService(db)
     summary = await svc.get_summary()
@@ -38,6 +43,16 @@ async def service_dependency_map(db: AsyncSession = Depends(get_db)):
     return ApiResponse(data=deps)
 
 
+@router.get("/service-status/impact", response_model=ApiResponse[ServiceImpactReport])
+async def service_impact(
+    service: Optional[str] = Query(None, description="Report the blast radius if this service went down"),
+    db: AsyncSession = Depends(get_db),
+):
+    svc = ServiceStatusService(db)
+    report = await svc.get_impact(service)
+    return ApiResponse(data=report)
+
+
 @router.get("/service-status/{name}", response_model=ApiResponse[ServiceOut])
 async def service_detail(name: str, db: AsyncSession = Depends(get_db)):
     svc = ServiceStatusService(db)
@@ -54,9 +69,12 @@ async def api_metrics(db: AsyncSession = Depends(get_db)):
 
 
 @router.get("/api-metrics/endpoints")
-async def api_metrics_endpoints(db: AsyncSession = Depends(get_db)):
+async def api_metrics_endpoints(
+    days: int = Query(settings.METRICS_RETENTION_DAYS, ge=1, le=settings.METRICS_RETENTION_DAYS),
+    db: AsyncSession = Depends(get_db),
+):
     svc = ApiMetricsService(db)
-    endpoints = await svc.get_endpoints()
+    endpoints = await svc.get_endpoints(days)
     return ApiResponse(data=endpoints)
 
 
@@ -67,6 +85,11 @@ async def api_latency(db: AsyncSession = Depends(get_db)):
     return ApiResponse(data=latency)
 
 
+@router.get("/api-metrics/recorder", response_model=ApiResponse[MetricsRecorderStats])
+async def api_metrics_recorder():
+    return ApiResponse(data=metrics_recorder.stats())
+
+
 # ── Grafana ──
 @router.get("/grafana/dashboards", response_model=ApiResponse[list[GrafanaDashboard]])
 async def grafana_dashboards():
@@ -1,12 +1,19 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
 from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import get_settings
 from app.modules.monitoring.dao import ServiceRegistryDAO, IncidentDAO, ApiMetricsDAO
 from app.modules.monitoring.dtos import (
-    SystemHealthSummary, DependencyNode, ApiMetricsSummary, EndpointMetrics,
+    SystemHealthSummary, DependencyNode, ServiceImpactReport, ApiMetricsSummary, EndpointMetrics,
     LatencyPercentiles, GrafanaDashboard,
 )
+from app.modules.monitoring.models import RollupGranularity
+from app.modules.monitoring.sketches import LatencySketch
 from app.shared.exceptions import NotFoundException
 
+settings = get_settings()
+
 
 class SystemHealthService:
     def __init__(self, db: AsyncSession):
@@ -14,26 +21,23 @@ class SystemHealthService:
         self.incident_dao = IncidentDAO(db)
 
     async def get_summary(self) -> SystemHealthSummary:
-        counts = await self.svc_dao.count_by_status()
-        services = await self.svc_dao.get_all()
-        avg_uptime = await self.svc_dao.avg_uptime()
-        incidents = await self.incident_dao.count_active()
-        healthy = counts.get("healthy", 0)
-        degraded = counts.get("degraded", 0)
-        down = counts.get("down", 0)
+        stats = await self.svc_dao.get_health_stats()
+        healthy = stats["healthy"]
+        degraded = stats["degraded"]
+        down = stats["down"]
         overall = "healthy"
         if down > 0:
             overall = "critical"
         elif degraded > 0:
             overall = "degraded"
         return SystemHealthSummary(
-            total_services=len(services),
+            total_services=stats["total"],
             healthy=healthy,
             degraded=degraded,
             down=down,
             overall_status=overall,
-            avg_uptime_pct=avg_uptime,
-            active_incidents=incidents,
+            avg_uptime_pct=round(stats["avg_uptime"], 2),
+            active_incidents=stats["active_incidents"],
         )
 
     async def get_services(self):
@@ -55,6 +59,28 @@ class ServiceStatusService:
             for s in services
         ]
 
+    async def get_impact(self, service: Optional[str] = None) -> ServiceImpactReport:
+        graph = await self.dao.get_dependency_graph()
+        if service is None:
+            impact = graph.impact()
+        else:
+            if service not in graph.index:
+                raise NotFoundException("Service", service)
+            impact = {
+                "root_causes": [service],
+                "impacted": [
+                    {"service_name": name, "status": graph.statuses[graph.index[name]], "caused_by": [service]}
+                    for name in graph.blast_radius(service)
+                ],
+            }
+        return ServiceImpactReport(
+            failed_service=service,
+            **impact,
+            topological_order=graph.order,
+            cycles=graph.cycles,
+            unknown_dependencies=graph.unknown,
+        )
+
     async def get_service(self, name: str):
         svc = await self.dao.get_by_name(name)
         if not svc:
@@ -67,36 +93,66 @@ class ApiMetricsService:
         self.dao = ApiMetricsDAO(db)
 
     async def get_summary(self) -> ApiMetricsSummary:
-        base = await self.dao.get_summary_24h()
-        endpoints_raw = await self.dao.get_by_endpoint()
-        status_dist = await self.dao.get_status_distribution()
-        endpoints = [
-            EndpointMetrics(
+        now = datetime.utcnow()
+        window = await self.dao.plan_window(now - timedelta(hours=24), now)
+        base = await self.dao.get_totals(window)
+        endpoints_raw = await self.dao.get_by_endpoint(window, limit=10)
+        status_dist = await self.dao.get_status_distribution(window)
+        sketches = defaultdict(LatencySketch)
+        for endpoint, method, bucket, n in await self.dao.get_latency_buckets(window, per_endpoint=True):
+            sketches[(endpoint, method)].buckets[bucket] = int(n)
+        endpoints = []
+        for e in endpoints_raw:
+            pcts = sketches[(e["endpoint"], e["method"])].quantiles([0.95, 0.99])
+            total = e["total_requests"] or 0
+            endpoints.append(EndpointMetrics(
                 endpoint=e["endpoint"],
                 method=e["method"],
-                total_requests=e["total_requests"],
+                total_requests=total,
                 avg_response_ms=round(e["avg_response_ms"] or 0, 2),
-                p95_response_ms=0,  # simplified
-                p99_response_ms=0,
-                error_rate=0,
+                p95_response_ms=pcts[0.95],
+                p99_response_ms=pcts[0.99],
+                error_rate=round((e["errors"] or 0) / total * 100, 2) if total else 0,
                 last_called_at=e["last_called_at"],
-            )
-            for e in endpoints_raw[:10]
-        ]
+            ))
         return ApiMetricsSummary(
-            total_requests_24h=base["total_requests_24h"],
+            total_requests_24h=base["total_requests"],
             avg_response_ms=base["avg_response_ms"],
             error_rate_pct=base["error_rate_pct"],
             top_slow_endpoints=endpoints,
             status_code_distribution=status_dist,
         )
 
-    async def get_endpoints(self):
-        return await self.dao.get_by_endpoint()
+    async def get_endpoints(self, days: int):
+        now = datetime.utcnow()
+        window = await self.dao.plan_window(now - timedelta(days=days), now)
+        return await self.dao.get_by_endpoint(window)
 
     async def get_latency(self) -> LatencyPercentiles:
-        pcts = await self.dao.get_latency_percentiles()
-        return LatencyPercentiles(**pcts, period="24h")
+        now = datetime.utcnow()
+        window = await self.dao.plan_window(now - timedelta(hours=24), now)
+        rows = await self.dao.get_latency_buckets(window)
+        pcts = LatencySketch.from_rows(rows).quantiles([0.50, 0.75, 0.90, 0.95, 0.99])
+        return LatencyPercentiles(
+            p50=pcts[0.50], p75=pcts[0.75], p90=pcts[0.90], p95=pcts[0.95], p99=pcts[0.99], period="24h",
+        )
+
+
+async def maintain_api_metrics(db: AsyncSession) -> dict:
+    """Periodic job: roll raw API metrics up into 1m/1h/1d buckets, then apply retention."""
+    dao = ApiMetricsDAO(db)
+    now = datetime.utcnow()
+    built = await dao.build_rollups(now)
+    pruned = await dao.prune(
+        now,
+        raw_retention=timedelta(hours=settings.METRICS_RAW_RETENTION_HOURS),
+        retention={
+            RollupGranularity.MINUTE: timedelta(hours=settings.METRICS_MINUTE_RETENTION_HOURS),
+            RollupGranularity.HOUR: timedelta(days=settings.METRICS_HOUR_RETENTION_DAYS),
+            RollupGranularity.DAY: timedelta(days=settings.METRICS_RETENTION_DAYS),
+        },
+    )
+    return {"built": built, "pruned": pruned}
 
 
 class GrafanaService:
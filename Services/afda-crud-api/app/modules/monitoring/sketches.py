@@ -0,0 +1,69 @@
+import math
+from typing import Dict, Iterable, Tuple
+import numpy as np
+
+# Relative accuracy of every quantile estimate (1%)
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+LOG_GAMMA = math.log(GAMMA)
+# Latencies at or below this land in the lowest bucket
+MIN_VALUE_MS = 0.01
+
+
+def bucket_index(value_ms: float) -> int:
+    return math.ceil(math.log(max(value_ms, MIN_VALUE_MS)) / LOG_GAMMA)
+
+
+def bucket_value(index: int) -> float:
+    """Representative value of a bucket; within RELATIVE_ACCURACY of anything in it."""
+    return 2 * GAMMA ** index / (GAMMA + 1)
+
+
+class LatencySketch:
+    """Log-bucketed, mergeable latency sketch (DDSketch-style).
+
+    A value v falls in bucket ceil(log_gamma(v)), so every bucket spans a fixed
+    relative width and any quantile read back is within 1% of the true value.
+    Sketches merge by adding bucket counts, which lets per-minute sketches be
+    summed in SQL and read in O(buckets) rather than O(requests).
+    """
+
+    def __init__(self, buckets: Dict[int, int] = None):
+        self.buckets: Dict[int, int] = dict(buckets or {})
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[int, int]]) -> "LatencySketch":
+        sketch = cls()
+        for index, count in rows:
+            sketch.buckets[int(index)] = sketch.buckets.get(int(index), 0) + int(count)
+        return sketch
+
+    @property
+    def count(self) -> int:
+        return sum(self.buckets.values())
+
+    def add(self, value_ms: float, count: int = 1) -> None:
+        index = bucket_index(value_ms)
+        self.buckets[index] = self.buckets.get(index, 0) + count
+
+    def merge(self, other: "LatencySketch") -> "LatencySketch":
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        return self
+
+    def quantiles(self, qs: Iterable[float]) -> Dict[float, float]:
+        qs = list(qs)
+        if not self.buckets:
+            return {q: 0.0 for q in qs}
+        indexes = np.array(sorted(self.buckets), dtype=np.int64)
+        cumulative = np.cumsum([self.buckets[i] for i in indexes])
+        total = cumulative[-1]
+        out = {}
+        for q in qs:
+            rank = q * (total - 1)
+            pos = int(np.searchsorted(cumulative, rank, side="right"))
+            out[q] = round(bucket_value(int(indexes[min(pos, len(indexes) - 1)])), 2)
+        return out
+
+    def to_json(self) -> Dict[str, int]:
+        return {str(i): c for i, c in self.buckets.items()}
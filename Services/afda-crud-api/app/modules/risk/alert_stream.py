@@ -0,0 +1,160 @@
+import asyncio
+import logging
+from typing import AsyncIterator, Iterable, Optional, Set, Tuple
+from app.config import get_settings
+from app.database import get_redis
+from app.modules.risk.dtos import AlertOut
+
+logger = logging.getLogger("afda")
+settings = get_settings()
+
+STREAM_KEY = "alerts:events"
+
+
+def _stream_id(entry_id: str) -> Tuple[int, int]:
+    ms, _, seq = entry_id.partition("-")
+    return int(ms), int(seq or 0)
+
+
+async def publish_alert_events(kind: str, alerts: Iterable) -> None:
+    """Append one stream entry per alert (ORM row, Row or dict) after its write has committed.
+
+    Entries carry severity and category as plain fields so subscribers filter
+    without decoding the payload. Redis trouble is logged and swallowed: the
+    write already happened and clients catch up by replaying or refetching.
+    """
+    redis = get_redis()
+    if redis is None:
+        return
+    try:
+        pipe = redis.pipeline(transaction=False)
+        for alert in alerts:
+            out = AlertOut.model_validate(alert, from_attributes=not isinstance(alert, dict))
+            pipe.xadd(
+                STREAM_KEY,
+                {"event": kind, "severity": out.severity, "category": out.category, "alert": out.model_dump_json()},
+                maxlen=settings.ALERT_STREAM_MAXLEN,
+                approximate=True,
+            )
+        await pipe.execute()
+    except Exception as e:
+        logger.warning(f"Alert stream publish failed: {e}")
+
+
+class Subscription:
+    """One SSE client: its filters and a bounded queue of matching entries."""
+
+    def __init__(self, severities: Optional[Set[str]], categories: Optional[Set[str]], size: int):
+        self.severities = severities
+        self.categories = categories
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=size)
+        self.overflowed = False
+
+    def wants(self, fields: dict) -> bool:
+        return ((self.severities is None or fields.get("severity") in self.severities)
+                and (self.categories is None or fields.get("category") in self.categories))
+
+    def offer(self, entry_id: str, fields: dict) -> None:
+        if self.overflowed or not self.wants(fields):
+            return
+        try:
+            self.queue.put_nowait((entry_id, fields))
+        except asyncio.QueueFull:
+            # A client this far behind is cut off; it reconnects with Last-Event-ID and replays
+            self.overflowed = True
+
+
+class AlertStreamHub:
+    """Fans the alert stream out to every SSE client of this process from one XREAD loop.
+
+    A single blocking XREAD per process, however many clients are connected,
+    replaces each portal tab polling /risk/alerts. Clients that reconnect with
+    a Last-Event-ID replay the gap with XRANGE before switching to live
+    entries, so nothing is lost or repeated across reconnects.
+    """
+
+    def __init__(self, block_ms: int = 5_000, batch: int = 500):
+        self.block_ms = block_ms
+        self.batch = batch
+        self.subscribers: Set[Subscription] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, severities: Optional[Set[str]], categories: Optional[Set[str]]) -> Subscription:
+        sub = Subscription(severities, categories, settings.ALERT_STREAM_CLIENT_QUEUE)
+        self.subscribers.add(sub)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="alert-stream-hub")
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        self.subscribers.discard(sub)
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        redis = get_redis()
+        last = "$"
+        while True:
+            try:
+                if last == "$":
+                    # Pin the position so entries added while the first XREAD is set up are not skipped
+                    newest = await redis.xrevrange(STREAM_KEY, count=1)
+                    last = newest[0][0] if newest else "0-0"
+                response = await redis.xread({STREAM_KEY: last}, count=self.batch, block=self.block_ms)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Alert stream read failed: {e}")
+                await asyncio.sleep(1.0)
+                continue
+            for _, entries in response or ():
+                for entry_id, fields in entries:
+                    last = entry_id
+                    for sub in list(self.subscribers):
+                        sub.offer(entry_id, fields)
+
+    async def events(self, severities: Optional[Set[str]], categories: Optional[Set[str]],
+                     last_event_id: Optional[str]) -> AsyncIterator[dict]:
+        """SSE events for one client: replay after `last_event_id` if given, then live entries."""
+        sub = self.subscribe(severities, categories)  # before the replay, so the two overlap instead of gap
+        redis = get_redis()
+        try:
+            try:
+                sent = _stream_id(last_event_id) if last_event_id else None
+            except ValueError:
+                sent = None  # not one of our ids; treat as a fresh connection
+            if sent is not None:
+                oldest = await redis.xrange(STREAM_KEY, count=1)
+                if oldest and _stream_id(oldest[0][0]) > sent:
+                    # The stream was trimmed past this client; it has to refetch instead of replaying
+                    yield {"event": "resync", "data": "{}"}
+                start = f"({last_event_id}"
+                while True:
+                    entries = await redis.xrange(STREAM_KEY, min=start, count=self.batch)
+                    for entry_id, fields in entries:
+                        sent = _stream_id(entry_id)
+                        if sub.wants(fields):
+                            yield {"id": entry_id, "event": fields["event"], "data": fields["alert"]}
+                    if len(entries) < self.batch:
+                        break
+                    start = f"({entries[-1][0]}"
+            while not sub.overflowed:
+                entry_id, fields = await sub.queue.get()
+                entry = _stream_id(entry_id)
+                if sent is not None and entry <= sent:
+                    continue  # already sent during the replay
+                sent = entry
+                yield {"id": entry_id, "event": fields["event"], "data": fields["alert"]}
+        finally:
+            self.unsubscribe(sub)
+
+
+alert_stream_hub = AlertStreamHub()
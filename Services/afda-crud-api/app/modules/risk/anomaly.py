@@ -0,0 +1,219 @@
+import io
+import json
+import time
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+from app.config import get_settings
+
+settings = get_settings()
+
+DETECTORS = ("ewma", "seasonal", "mad")
+SEASON_LENGTH = 7  # day-of-week baseline
+MAD_SCALE = 1.4826  # MAD of a normal distribution is 0.6745 sigma
+
+
+class AnomalyDetectors:
+    """Online per-series anomaly detectors over compact column arrays.
+
+    Every series (metric + entity) owns one slot in a set of numpy arrays:
+    EWMA mean/variance for a z-score, a day-of-week EWMA baseline for a
+    seasonal z-score, and a stochastic-approximation median/MAD for a robust
+    score. Scoring an observation and folding it into the state is O(1) and is
+    done for a whole batch at once; a series that appears k times in a batch
+    is handled in k vectorized rounds so its observations still apply in order.
+    Each observation is scored against the state *before* it is absorbed.
+
+    Series are bounded: once `max_series` exist, new keys are scored 0 and not
+    tracked, and `prune` drops series not observed for a while.
+    """
+
+    def __init__(self, alpha: float = 0.05, seasonal_alpha: float = 0.1, mad_rate: float = 0.05,
+                 warmup: int = 10, capacity: int = 1024, max_series: int = 1_000_000):
+        self.alpha = alpha
+        self.seasonal_alpha = seasonal_alpha
+        self.mad_rate = mad_rate
+        self.warmup = warmup
+        self.max_series = max_series
+        self.slots: Dict[str, int] = {}
+        self.watermarks: dict = {}
+        self._allocate(capacity)
+
+    def _allocate(self, capacity: int) -> None:
+        self.count = np.zeros(capacity, dtype=np.int64)
+        self.mean = np.zeros(capacity, dtype=np.float64)
+        self.var = np.zeros(capacity, dtype=np.float64)
+        self.season_count = np.zeros((capacity, SEASON_LENGTH), dtype=np.int32)
+        self.season_mean = np.zeros((capacity, SEASON_LENGTH), dtype=np.float32)
+        self.season_var = np.zeros((capacity, SEASON_LENGTH), dtype=np.float32)
+        self.median = np.zeros(capacity, dtype=np.float64)
+        self.mad = np.zeros(capacity, dtype=np.float64)
+        self.last_seen = np.zeros(capacity, dtype=np.float64)  # epoch seconds of the latest observation
+
+    def _state(self) -> Dict[str, np.ndarray]:
+        return {
+            "count": self.count, "mean": self.mean, "var": self.var,
+            "season_count": self.season_count, "season_mean": self.season_mean, "season_var": self.season_var,
+            "median": self.median, "mad": self.mad, "last_seen": self.last_seen,
+        }
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def _grow(self, needed: int) -> None:
+        capacity = len(self.count)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        old = self._state()
+        self._allocate(capacity)
+        for name, arr in self._state().items():
+            arr[: len(old[name])] = old[name]
+
+    def slot_ids(self, keys: Sequence[str], create: bool = True) -> np.ndarray:
+        """Slot per key; -1 for keys without one (not created, or over `max_series`)."""
+        slots = self.slots
+        ids = np.empty(len(keys), dtype=np.int64)
+        for i, key in enumerate(keys):
+            slot = slots.get(key)
+            if slot is None:
+                if create and len(slots) < self.max_series:
+                    slot = slots[key] = len(slots)
+                else:
+                    slot = -1
+            ids[i] = slot
+        self._grow(len(slots))
+        return ids
+
+    def observe(self, keys: Sequence[str], values: np.ndarray, seasons: np.ndarray,
+                learn: bool = True) -> Dict[str, np.ndarray]:
+        """Score a batch of observations (in time order) and absorb them.
+
+        Returns one |score| array per detector, aligned with `values`; scores
+        are 0 while a series (or its season slot) is still warming up. With
+        `learn=False` the batch is only scored against the current baselines:
+        no state changes and no new series are created.
+        """
+        n = len(values)
+        scores = {name: np.zeros(n) for name in DETECTORS}
+        if not n:
+            return scores
+        slots = self.slot_ids(keys, create=learn)
+        values = np.asarray(values, dtype=np.float64)
+        seasons = np.asarray(seasons, dtype=np.int64) % SEASON_LENGTH
+        tracked = np.flatnonzero(slots >= 0)  # positions of observations whose series has a slot
+        slots, values, seasons = slots[tracked], values[tracked], seasons[tracked]
+        m = len(tracked)
+        if not m:
+            return scores
+        if not learn:
+            self._step(slots, values, seasons, tracked, scores, learn=False)
+            return scores
+        self.last_seen[slots] = time.time()
+        # rank[i] = how many earlier observations of the same series are in this batch
+        order = np.argsort(slots, kind="stable")
+        sorted_slots = slots[order]
+        starts = np.flatnonzero(np.r_[True, sorted_slots[1:] != sorted_slots[:-1]])
+        group_start = np.repeat(starts, np.diff(np.r_[starts, m]))
+        rank = np.empty(m, dtype=np.int64)
+        rank[order] = np.arange(m) - group_start
+        for r in range(int(rank.max()) + 1):
+            idx = np.flatnonzero(rank == r)
+            self._step(slots[idx], values[idx], seasons[idx], tracked[idx], scores)
+        return scores
+
+    def _step(self, s: np.ndarray, x: np.ndarray, season: np.ndarray, idx: np.ndarray, scores: dict,
+              learn: bool = True) -> None:
+        """One vectorized update; every slot in `s` is distinct unless `learn` is off."""
+        count = self.count[s]
+        first = count == 0
+        warm = count >= self.warmup
+
+        # EWMA z-score
+        mean, var = self.mean[s], self.var[s]
+        d = x - mean
+        std = np.sqrt(var)
+        scores["ewma"][idx] = np.where(warm & (std > 0), np.abs(d) / np.where(std > 0, std, 1), 0.0)
+
+        # Seasonal baseline z-score
+        s_count = self.season_count[s, season]
+        s_mean = self.season_mean[s, season].astype(np.float64)
+        s_var = self.season_var[s, season].astype(np.float64)
+        sd = x - s_mean
+        s_std = np.sqrt(s_var)
+        s_warm = s_count >= self.warmup
+        scores["seasonal"][idx] = np.where(s_warm & (s_std > 0), np.abs(sd) / np.where(s_std > 0, s_std, 1), 0.0)
+
+        # Robust score from a streaming median / MAD
+        median, mad = self.median[s], self.mad[s]
+        dev = x - median
+        scores["mad"][idx] = np.where(warm & (mad > 0), np.abs(dev) / (MAD_SCALE * np.where(mad > 0, mad, 1)), 0.0)
+
+        if not learn:
+            return
+        a = self.alpha
+        self.mean[s] = np.where(first, x, mean + a * d)
+        self.var[s] = np.where(first, 0.0, (1 - a) * (var + a * d * d))
+
+        sa = self.seasonal_alpha
+        s_first = s_count == 0
+        self.season_mean[s, season] = np.where(s_first, x, s_mean + sa * sd)
+        self.season_var[s, season] = np.where(s_first, 0.0, (1 - sa) * (s_var + sa * sd * sd))
+        self.season_count[s, season] = s_count + 1
+
+        # Larger steps while a series is young so the estimates settle within the warmup
+        rate = np.maximum(self.mad_rate, 1.0 / (count + 1))
+        step = rate * np.where(mad > 0, mad, np.abs(dev))
+        self.median[s] = np.where(first, x, median + step * np.sign(dev))
+        self.mad[s] = np.where(first, 0.0, np.maximum(mad + step * np.sign(np.abs(dev) - mad), 0.0))
+
+        self.count[s] = count + 1
+
+    def prune(self, idle_before: float) -> int:
+        """Drop series last observed before `idle_before` (epoch seconds); returns how many."""
+        n = len(self.slots)
+        keep = self.last_seen[:n] >= idle_before
+        dropped = n - int(keep.sum())
+        if not dropped:
+            return 0
+        keys = sorted(self.slots, key=self.slots.get)
+        kept = [key for key, k in zip(keys, keep) if k]
+        self.slots = {key: i for i, key in enumerate(kept)}
+        for arr in self._state().values():
+            arr[: len(kept)] = arr[:n][keep]
+            arr[len(kept):n] = 0
+        return dropped
+
+    # ── Persistence ──
+    def snapshot(self) -> Tuple[List[str], Dict[str, np.ndarray]]:
+        """Copy of the live state; cheap enough to take on the event loop, then encode elsewhere."""
+        n = len(self.slots)
+        keys = sorted(self.slots, key=self.slots.get)
+        return keys, {name: arr[:n].copy() for name, arr in self._state().items()}
+
+    @staticmethod
+    def encode(snapshot: Tuple[List[str], Dict[str, np.ndarray]]) -> bytes:
+        keys, arrays = snapshot
+        buf = io.BytesIO()
+        np.savez_compressed(buf, keys=np.frombuffer(json.dumps(keys).encode(), dtype=np.uint8), **arrays)
+        return buf.getvalue()
+
+    @staticmethod
+    def decode(payload: bytes) -> Tuple[List[str], Dict[str, np.ndarray]]:
+        with np.load(io.BytesIO(payload)) as data:
+            keys = json.loads(data["keys"].tobytes().decode())
+            return keys, {name: data[name] for name in data.files if name != "keys"}
+
+    def restore(self, snapshot: Tuple[List[str], Dict[str, np.ndarray]], watermarks: dict) -> None:
+        keys, arrays = snapshot
+        self.slots = {key: i for i, key in enumerate(keys)}
+        self._allocate(max(len(keys), 1024))
+        for name, arr in self._state().items():
+            if name in arrays:
+                arr[: len(keys)] = arrays[name]
+        if "last_seen" not in arrays:  # saved before idle tracking; start every series' idle clock now
+            self.last_seen[: len(keys)] = time.time()
+        self.watermarks = dict(watermarks or {})
+
+
+anomaly_detectors = AnomalyDetectors(max_series=settings.ANOMALY_MAX_SERIES)
@@ -1,8 +1,40 @@
+import json
+import uuid
 from uuid import UUID
-from typing import Optional, List
-from sqlalchemy import select, func, update, delete
-from sqlalchemy.ext.asyncio import AsyncSession
-from app.modules.risk.models import Alert, AlertRule, RiskScore, AlertHistory, AlertSeverity, AlertStatus
+from datetime import date, datetime, timedelta
+from collections import Counter
+from typing import Optional, List, Sequence, Tuple
+from sqlalchemy import select, func, update, insert, delete, literal, case, cast, text, or_, true, tuple_, Float
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from app.database import engine
+from app.shared.cache import invalidate_tags
+from app.shared.pagination import keyset_paginate, cursor_page
+from app.modules.risk.alert_stream import publish_alert_events
+from app.modules.risk.models import (
+    Alert, AlertRule, RiskScore, AlertHistory, AlertSeverity, AlertStatus, AlertCategory, AnomalyDetectorState,
+    AlertTrendCounter,
+)
+from app.modules.treasury.models import CashTransaction, ArInvoice
+from app.modules.fpa.models import VarianceRecord
+from app.modules.monitoring.models import Incident, ServiceRegistry
+from app.modules.accounting.models import JournalEntry, JournalLine, JournalEntryStatus
+from app.modules.command_center.models import KpiDefinition, KpiValue
+
+RISK_SCORING_LOCK_ID = 0x4146_4441_0002  # pg advisory lock key for the risk scoring run
+TREND_BACKFILL_LOCK_ID = 0x4146_4441_0004  # pg advisory lock key for the one-off trend counter backfill
+ANOMALY_INGEST_LOCK_ID = 0x4146_4441_0005  # pg advisory lock key for the anomaly ingest owner
+SCORED_BY = "risk_engine"
+SEVERITY_WEIGHTS = {
+    AlertSeverity.LOW: 0.5, AlertSeverity.MEDIUM: 1.0, AlertSeverity.HIGH: 2.0, AlertSeverity.CRITICAL: 4.0,
+}
+OPEN_ALERT_STATUSES = [AlertStatus.OPEN, AlertStatus.ACKNOWLEDGED, AlertStatus.INVESTIGATING]
+# Alert category -> risk factor it feeds
+ALERT_FACTOR_CATEGORIES = {
+    "alerts_financial": [AlertCategory.FINANCIAL, AlertCategory.FRAUD],
+    "alerts_operational": [AlertCategory.OPERATIONAL, AlertCategory.SECURITY],
+    "alerts_compliance": [AlertCategory.COMPLIANCE],
+}
 
 
 class AlertDAO:
@@ -10,7 +42,8 @@ class AlertDAO:
         self.db = db
 
     async def get_all(self, severity: Optional[str] = None, status: Optional[str] = None,
-                      category: Optional[str] = None, limit: int = 50, offset: int = 0) -> List[Alert]:
+                      category: Optional[str] = None, limit: int = 50, offset: int = 0,
+                      cursor: Optional[str] = None) -> dict:
         q = select(Alert)
         if severity:
             q = q.where(Alert.severity == severity)
@@ -18,8 +51,9 @@ class AlertDAO:
             q = q.where(Alert.status == status)
         if category:
             q = q.where(Alert.category == category)
-        result = await self.db.execute(q.order_by(Alert.created_at.desc()).offset(offset).limit(limit))
-        return list(result.scalars().all())
+        q = keyset_paginate(q, Alert.created_at, Alert.id, cursor, limit)
+        result = await self.db.execute(q if cursor else q.offset(offset))
+        return cursor_page(list(result.scalars().all()), limit, "created_at")
 
     async def get_by_id(self, alert_id: UUID) -> Optional[Alert]:
         result = await self.db.execute(select(Alert).where(Alert.id == alert_id))
@@ -28,8 +62,53 @@ class AlertDAO:
     async def update(self, alert_id: UUID, data: dict) -> Optional[Alert]:
         await self.db.execute(update(Alert).where(Alert.id == alert_id).values(**data))
         await self.db.commit()
+        await invalidate_tags("alerts")
         return await self.get_by_id(alert_id)
 
+    async def transition(self, alert_ids: Sequence[UUID], allowed_from: Sequence[AlertStatus],
+                         values: dict, action: str, performed_by: str, details: Optional[str] = None,
+                         now: Optional[datetime] = None) -> list:
+        """Move every alert in `allowed_from` to new values and log it, as one statement.
+
+        WITH moved AS (UPDATE ... RETURNING), logged AS (INSERT INTO alert_history
+        SELECT ... FROM moved) SELECT * FROM moved: the status guard, the change
+        and its history rows (and trend counters) commit together in a single
+        round trip. Alerts that are missing or in another state are simply not
+        returned.
+        """
+        if not alert_ids:
+            return []
+        now = now or datetime.utcnow()
+        moved = (
+            update(Alert)
+                .where(Alert.id.in_(alert_ids), Alert.status.in_(allowed_from))
+                .values(**values, updated_at=now)
+                .returning(*Alert.__table__.c)
+                .cte("moved")
+        )
+        logged = insert(AlertHistory).from_select(
+            ["id", "alert_id", "action", "performed_by", "details", "created_at"],
+            select(
+                func.gen_random_uuid(),
+                moved.c.id,
+                literal(action, AlertHistory.action.type),
+                literal(performed_by, AlertHistory.performed_by.type),
+                literal(details, AlertHistory.details.type),
+                literal(now, AlertHistory.created_at.type),
+            ).select_from(moved),
+        ).cte("logged")
+        stmt = select(moved).add_cte(logged)
+        counted = AlertTrendDAO.count_moved(moved, action, now)
+        if counted is not None:
+            stmt = stmt.add_cte(counted)
+        result = await self.db.execute(stmt)
+        rows = list(result.all())
+        await self.db.commit()
+        if rows:
+            await invalidate_tags("alerts")
+            await publish_alert_events(action, rows)
+        return rows
+
     async def count_by_severity(self, status: str = "open") -> dict:
         result = await self.db.execute(
             select(Alert.severity, func.count())
@@ -38,6 +117,21 @@ class AlertDAO:
         )
         return {row[0].value: row[1] for row in result.all()}
 
+    async def get_dashboard_stats(self) -> dict:
+        """Open/critical/high alert counts plus the average risk score in one statement."""
+        open_statuses = [AlertStatus.OPEN, AlertStatus.ACKNOWLEDGED, AlertStatus.INVESTIGATING]
+        is_open = Alert.status == AlertStatus.OPEN
+        avg_score = select(func.avg(RiskScore.overall_score)).scalar_subquery()
+        result = await self.db.execute(
+            select(
+                func.count().filter(Alert.status.in_(open_statuses)).label("total_open"),
+                func.count().filter(is_open & (Alert.severity == AlertSeverity.CRITICAL)).label("critical"),
+                func.count().filter(is_open & (Alert.severity == AlertSeverity.HIGH)).label("high"),
+                func.coalesce(avg_score, 0.0).label("avg_score"),
+            ).select_from(Alert)
+        )
+        return dict(result.one()._mapping)
+
     async def count_open(self) -> int:
         result = await self.db.execute(
             select(func.count()).select_from(Alert)
@@ -78,8 +172,215 @@ class AlertRuleDAO:
         await self.db.commit()
         return result.rowcount > 0
 
+    async def get_active_versions(self) -> dict:
+        """(updated_at, last_triggered_at) per active rule; lets the engine skip unchanged rules."""
+        result = await self.db.execute(
+            select(AlertRule.id, AlertRule.updated_at, AlertRule.last_triggered_at)
+                .where(AlertRule.is_active.is_(True))
+        )
+        return {row[0]: (row[1], row[2]) for row in result.all()}
+
+    async def get_definitions(self, rule_ids: list) -> List[dict]:
+        result = await self.db.execute(
+            select(
+                AlertRule.id, AlertRule.name, AlertRule.severity, AlertRule.category,
+                AlertRule.condition_type, AlertRule.condition_config, AlertRule.cooldown_minutes,
+                AlertRule.last_triggered_at, AlertRule.updated_at,
+            ).where(AlertRule.id.in_(rule_ids))
+        )
+        return [dict(row._mapping) for row in result.all()]
+
+    async def record_triggers(self, fired: list, now: datetime) -> List[UUID]:
+        """Claim fired rules and emit their alerts in one transaction.
+
+        The claim is a single conditional UPDATE that re-checks the cooldown in
+        SQL, so two workers evaluating at once cannot both fire the same rule;
+        only claimed rules get an Alert and a "created" history row.
+        updated_at is pinned so a trigger never forces the rule to recompile.
+        """
+        if not fired:
+            return []
+        result = await self.db.execute(
+            update(AlertRule)
+                .where(
+                    AlertRule.id.in_([rule.id for rule, _ in fired]),
+                    or_(
+                        AlertRule.last_triggered_at.is_(None),
+                        AlertRule.last_triggered_at <= now - func.make_interval(0, 0, 0, 0, 0, AlertRule.cooldown_minutes),
+                    ),
+                )
+                .values(last_triggered_at=now, trigger_count=AlertRule.trigger_count + 1, updated_at=AlertRule.updated_at)
+                .returning(AlertRule.id)
+        )
+        claimed = set(result.scalars().all())
+        alerts, history = [], []
+        for rule, match in fired:
+            if rule.id not in claimed:
+                continue
+            rule.last_triggered_at = now
+            alert_id = uuid.uuid4()
+            alerts.append({
+                "id": alert_id,
+                "title": rule.name,
+                "description": match.detail,
+                "severity": rule.severity,
+                "category": rule.category,
+                "source_agent": "rule_engine",
+                "rule_id": rule.id,
+                "affected_entity": match.entity,
+                "metadata_json": {
+                    "condition_type": rule.condition_type,
+                    "matched_events": match.count,
+                    "observed_value": match.value,
+                },
+                "created_at": now,
+                "updated_at": now,
+            })
+            history.append({"id": uuid.uuid4(), "alert_id": alert_id, "action": "created",
+                            "performed_by": "rule_engine", "details": match.detail, "created_at": now})
+        if alerts:
+            await self.db.execute(pg_insert(Alert).values(alerts))
+            await self.db.execute(pg_insert(AlertHistory).values(history))
+            await AlertTrendDAO(self.db).increment(
+                Counter((now, a["severity"], a["category"]) for a in alerts), "created",
+            )
+        await self.db.commit()
+        if alerts:
+            await invalidate_tags("alerts")
+            unset = dict.fromkeys(("acknowledged_by", "acknowledged_at", "resolved_by", "resolved_at", "resolution_notes"))
+            await publish_alert_events("created", ({**a, **unset, "status": AlertStatus.OPEN} for a in alerts))
+        return [a["id"] for a in alerts]
+
+
+class AlertTrendDAO:
+    """Hourly alert counters by severity and category, read back as a zero-filled trend."""
+
+    COUNTERS = ("created", "acknowledged", "resolved")
+    BUCKETS = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    @staticmethod
+    def hour_of(ts: datetime) -> datetime:
+        return ts.replace(minute=0, second=0, microsecond=0)
+
+    @classmethod
+    def _upsert(cls, stmt, counter: str):
+        return stmt.on_conflict_do_update(
+            constraint="uq_alert_trend_counters_bucket",
+            set_={counter: getattr(AlertTrendCounter, counter) + stmt.excluded[counter]},
+        )
+
+    async def increment(self, counts: Counter, counter: str) -> None:
+        """Add {(timestamp, severity, category): n} to `counter`; runs in the caller's transaction."""
+        hourly = Counter()
+        for (ts, severity, category), n in counts.items():
+            hourly[(self.hour_of(ts), severity, category)] += n
+        if not hourly:
+            return
+        rows = [
+            {"id": uuid.uuid4(), "bucket_start": bucket, "severity": severity, "category": category,
+             **{c: (n if c == counter else 0) for c in self.COUNTERS}}
+            for (bucket, severity, category), n in hourly.items()
+        ]
+        await self.db.execute(self._upsert(pg_insert(AlertTrendCounter).values(rows), counter))
+
+    @classmethod
+    def count_moved(cls, moved, action: str, now: datetime):
+        """CTE that counts the rows of an alert-transition CTE into the matching counter, if any."""
+        if action not in cls.COUNTERS:
+            return None
+        stmt = pg_insert(AlertTrendCounter).from_select(
+            ["id", "bucket_start", "severity", "category", *cls.COUNTERS],
+            select(
+                func.gen_random_uuid(),
+                literal(cls.hour_of(now), AlertTrendCounter.bucket_start.type),
+                moved.c.severity,
+                moved.c.category,
+                *(func.count() if c == action else literal(0) for c in cls.COUNTERS),
+            ).select_from(moved).group_by(moved.c.severity, moved.c.category),
+        )
+        return cls._upsert(stmt, action).cte("counted")
+
+    async def get_trend(self, days: int, bucket: str = "day", now: Optional[datetime] = None) -> List[dict]:
+        """The last `days` days as zero-filled `bucket` rows (the current one partial), oldest first."""
+        now = now or datetime.utcnow()
+        width = self.BUCKETS[bucket]
+        last = self.hour_of(now) if bucket == "hour" else now.replace(hour=0, minute=0, second=0, microsecond=0)
+        first = last - (timedelta(days=days) // width - 1) * width
+        period = func.date_trunc(bucket, AlertTrendCounter.bucket_start)
+        by_severity = [
+            func.coalesce(func.sum(AlertTrendCounter.created).filter(AlertTrendCounter.severity == sev), 0)
+                .label(sev.value)
+            for sev in AlertSeverity
+        ]
+        result = await self.db.execute(
+            select(
+                period.label("period"),
+                func.coalesce(func.sum(AlertTrendCounter.created), 0).label("total"),
+                *by_severity,
+                func.coalesce(func.sum(AlertTrendCounter.acknowledged), 0).label("acknowledged"),
+                func.coalesce(func.sum(AlertTrendCounter.resolved), 0).label("resolved"),
+            )
+            .where(AlertTrendCounter.bucket_start >= first, AlertTrendCounter.bucket_start < last + width)
+            .group_by(period)
+        )
+        found = {row.period: dict(row._mapping) for row in result.all()}
+        empty = {"total": 0, **{sev.value: 0 for sev in AlertSeverity}, "acknowledged": 0, "resolved": 0}
+        trend, ts = [], first
+        while ts <= last:
+            trend.append({**found.get(ts, empty), "period": ts.isoformat()})
+            ts += width
+        return trend
+
+    async def rebuild(self) -> int:
+        """Recompute every counter from the alerts table, for data written before the counters existed."""
+        parts = []
+        for counter, col in (
+            ("created", Alert.created_at), ("acknowledged", Alert.acknowledged_at), ("resolved", Alert.resolved_at),
+        ):
+            hour = func.date_trunc("hour", col)
+            parts.append(
+                select(hour.label("bucket_start"), Alert.severity, Alert.category,
+                       *((func.count() if c == counter else literal(0)).label(c) for c in self.COUNTERS))
+                .where(col.is_not(None))
+                .group_by(hour, Alert.severity, Alert.category)
+            )
+        combined = parts[0].union_all(*parts[1:]).subquery("events")
+        source = select(
+            func.gen_random_uuid(), combined.c.bucket_start, combined.c.severity, combined.c.category,
+            *(func.sum(combined.c[c]) for c in self.COUNTERS),
+        ).group_by(combined.c.bucket_start, combined.c.severity, combined.c.category)
+        await self.db.execute(delete(AlertTrendCounter))
+        result = await self.db.execute(
+            insert(AlertTrendCounter).from_select(
+                ["id", "bucket_start", "severity", "category", *self.COUNTERS], source,
+            )
+        )
+        await self.db.commit()
+        await invalidate_tags("alerts")
+        return result.rowcount
+
+    async def backfill(self) -> int:
+        """Rebuild once if the counters are empty but alerts exist (a database that predates them).
+
+        One worker rebuilds under an advisory lock; the others skip it, or find the table filled.
+        """
+        locked = await self.db.scalar(select(func.pg_try_advisory_xact_lock(TREND_BACKFILL_LOCK_ID)))
+        if locked:
+            filled = await self.db.scalar(select(AlertTrendCounter.id).limit(1)) is not None
+            has_source = await self.db.scalar(select(Alert.id).limit(1)) is not None
+            if has_source and not filled:
+                return await self.rebuild()  # commits, releasing the lock
+        await self.db.rollback()
+        return 0
+
 
 class RiskScoreDAO:
+    # Rows per unnest() upsert; bounds the size of each array parameter
+    WRITE_CHUNK_SIZE = 50_000
+
     def __init__(self, db: AsyncSession):
         self.db = db
 
@@ -100,6 +401,179 @@ class RiskScoreDAO:
         result = await self.db.execute(select(func.avg(RiskScore.overall_score)))
         return round(result.scalar() or 0, 2)
 
+    async def get_heatmap(self) -> List[dict]:
+        severity = case(
+            (RiskScore.overall_score >= 80, "critical"),
+            (RiskScore.overall_score >= 60, "high"),
+            (RiskScore.overall_score >= 40, "medium"),
+            else_="low",
+        )
+        result = await self.db.execute(
+            select(
+                RiskScore.entity_name, RiskScore.entity_type.label("category"),
+                RiskScore.overall_score.label("score"), severity.label("severity"),
+            ).order_by(RiskScore.overall_score.desc())
+        )
+        return [dict(row._mapping) for row in result.all()]
+
+    # ── Scoring inputs ──
+    async def upgrade_schema(self) -> None:
+        """Add uq_risk_scores_entity to a risk_scores table created before it; idempotent.
+
+        Duplicate (entity_type, entity_name) rows are collapsed to the most
+        recently scored one first. Waits for the scoring lock, so no scoring
+        run writes in between.
+        """
+        await self.db.execute(select(func.pg_advisory_xact_lock(RISK_SCORING_LOCK_ID)))
+        exists = await self.db.scalar(text("SELECT 1 FROM pg_constraint WHERE conname = 'uq_risk_scores_entity'"))
+        if not exists:
+            await self.db.execute(text(
+                "DELETE FROM risk_scores WHERE id IN ("
+                " SELECT id FROM (SELECT id, row_number() OVER ("
+                "  PARTITION BY entity_type, entity_name ORDER BY scored_at DESC NULLS LAST, id) AS rn"
+                "  FROM risk_scores) ranked"
+                " WHERE rn > 1)"
+            ))
+            await self.db.execute(text(
+                "ALTER TABLE risk_scores ADD CONSTRAINT uq_risk_scores_entity UNIQUE (entity_type, entity_name)"
+            ))
+        await self.db.commit()
+
+    async def try_lock_scoring(self) -> bool:
+        """Transaction-scoped lock so only one worker rescores at a time; released on commit."""
+        result = await self.db.execute(select(func.pg_try_advisory_xact_lock(RISK_SCORING_LOCK_ID)))
+        return bool(result.scalar())
+
+    async def get_snapshots(self) -> List[dict]:
+        result = await self.db.execute(
+            select(
+                RiskScore.entity_type, RiskScore.entity_name, RiskScore.overall_score,
+                RiskScore.factors_json["history"].label("history"),
+            )
+        )
+        return [dict(row._mapping) for row in result.all()]
+
+    async def get_ar_exposure(self, today: date) -> List[dict]:
+        """Per customer: overdue share of the open balance, balance-weighted days past due, write-off share."""
+        open_balance = ArInvoice.amount - func.coalesce(ArInvoice.amount_paid, 0.0)
+        is_open = ArInvoice.status.notin_(["paid", "written_off"])
+        outstanding = func.sum(open_balance).filter(is_open)
+        overdue = func.sum(open_balance).filter(is_open, ArInvoice.due_date < today)
+        days_past_due = func.sum(open_balance * func.greatest(today - ArInvoice.due_date, 0)).filter(is_open)
+        written_off = func.sum(open_balance).filter(ArInvoice.status == "written_off")
+        result = await self.db.execute(
+            select(
+                ArInvoice.customer_name.label("entity_name"),
+                (overdue / func.nullif(outstanding, 0)).label("ar_overdue_ratio"),
+                (days_past_due / func.nullif(outstanding, 0)).label("ar_days_past_due"),
+                (written_off / func.nullif(func.sum(ArInvoice.amount), 0)).label("ar_write_off_ratio"),
+            ).group_by(ArInvoice.customer_name)
+        )
+        return [dict(row._mapping) for row in result.all()]
+
+    async def get_variance_profile(self, periods: int) -> List[dict]:
+        """Per department over the latest `periods` periods: mean |variance %|, overrun ratio, unexplained breaches."""
+        recent = select(VarianceRecord.period).distinct().order_by(VarianceRecord.period.desc()).limit(periods)
+        breach = func.abs(VarianceRecord.variance_pct) > 10
+        result = await self.db.execute(
+            select(
+                VarianceRecord.department.label("entity_name"),
+                func.avg(func.abs(VarianceRecord.variance_pct)).label("variance_abs_pct"),
+                (
+                    func.coalesce(func.sum(VarianceRecord.variance_amount).filter(VarianceRecord.variance_amount > 0), 0.0)
+                    / func.nullif(func.sum(func.abs(VarianceRecord.budgeted)), 0)
+                ).label("variance_overrun"),
+                (
+                    func.count().filter(breach, func.coalesce(VarianceRecord.explanation, "") == "")
+                    / cast(func.nullif(func.count().filter(breach), 0), Float)
+                ).label("variance_unexplained"),
+            )
+            .where(VarianceRecord.period.in_(recent))
+            .group_by(VarianceRecord.department)
+        )
+        return [dict(row._mapping) for row in result.all()]
+
+    async def get_alert_load(self) -> List[dict]:
+        """Severity-weighted open alerts per affected entity, split by the factor each category feeds."""
+        weight = case(*((Alert.severity == sev, w) for sev, w in SEVERITY_WEIGHTS.items()), else_=1.0)
+        result = await self.db.execute(
+            select(
+                Alert.affected_entity.label("entity_name"),
+                *(
+                    func.coalesce(func.sum(weight).filter(Alert.category.in_(categories)), 0.0).label(feature)
+                    for feature, categories in ALERT_FACTOR_CATEGORIES.items()
+                ),
+            )
+            .where(Alert.status.in_(OPEN_ALERT_STATUSES), Alert.affected_entity.is_not(None))
+            .group_by(Alert.affected_entity)
+        )
+        return [dict(row._mapping) for row in result.all()]
+
+    async def get_process_names(self) -> List[str]:
+        result = await self.db.execute(select(ServiceRegistry.service_name))
+        return list(result.scalars().all())
+
+    async def get_incident_load(self, since: datetime, now: datetime) -> List[dict]:
+        """Per service: severity-weighted open incidents, incident count and incident hours since `since`."""
+        weight = case(*((Incident.severity == sev.value, w) for sev, w in SEVERITY_WEIGHTS.items()), else_=1.0)
+        minutes = func.coalesce(
+            Incident.duration_minutes,
+            func.extract("epoch", func.coalesce(Incident.resolved_at, now) - Incident.started_at) / 60,
+        )
+        result = await self.db.execute(
+            select(
+                Incident.service_name.label("entity_name"),
+                func.coalesce(func.sum(weight).filter(Incident.status != "resolved"), 0.0).label("incidents_open"),
+                func.count().label("incidents_recent"),
+                (func.coalesce(func.sum(minutes), 0.0) / 60).label("incident_hours"),
+            )
+            .where(or_(Incident.started_at >= since, Incident.status != "resolved"))
+            .group_by(Incident.service_name)
+        )
+        return [dict(row._mapping) for row in result.all()]
+
+    async def upsert_scores(self, rows: dict, scored_at: datetime) -> int:
+        """Write a scoring run with one INSERT ... SELECT FROM unnest() ... ON CONFLICT per chunk.
+
+        `rows` holds equal-length column lists: entity_type, entity_name, the
+        three factors, overall_score, trend and factors_json (dicts).
+        """
+        n = len(rows["entity_name"])
+        written = 0
+        for i in range(0, n, self.WRITE_CHUNK_SIZE):
+            sl = slice(i, i + self.WRITE_CHUNK_SIZE)
+            res = await self.db.execute(
+                text(
+                    "INSERT INTO risk_scores AS r (id, entity_type, entity_name, overall_score, financial_risk, "
+                    "    operational_risk, compliance_risk, trend, factors_json, scored_by, scored_at) "
+                    "SELECT gen_random_uuid(), v.entity_type, v.entity_name, v.overall_score, v.financial_risk, "
+                    "    v.operational_risk, v.compliance_risk, v.trend, CAST(v.factors_json AS jsonb), "
+                    "    :scored_by, :scored_at "
+                    "FROM unnest(CAST(:entity_types AS varchar[]), CAST(:entity_names AS varchar[]), "
+                    "            CAST(:overall AS double precision[]), CAST(:financial AS double precision[]), "
+                    "            CAST(:operational AS double precision[]), CAST(:compliance AS double precision[]), "
+                    "            CAST(:trends AS varchar[]), CAST(:factors AS text[])) "
+                    "     AS v(entity_type, entity_name, overall_score, financial_risk, operational_risk, "
+                    "          compliance_risk, trend, factors_json) "
+                    "ON CONFLICT (entity_type, entity_name) DO UPDATE SET "
+                    "    overall_score = EXCLUDED.overall_score, financial_risk = EXCLUDED.financial_risk, "
+                    "    operational_risk = EXCLUDED.operational_risk, compliance_risk = EXCLUDED.compliance_risk, "
+                    "    trend = EXCLUDED.trend, factors_json = EXCLUDED.factors_json, "
+                    "    scored_by = EXCLUDED.scored_by, scored_at = EXCLUDED.scored_at"
+                ),
+                {
+                    "entity_types": rows["entity_type"][sl], "entity_names": rows["entity_name"][sl],
+                    "overall": rows["overall_score"][sl], "financial": rows["financial_risk"][sl],
+                    "operational": rows["operational_risk"][sl], "compliance": rows["compliance_risk"][sl],
+                    "trends": rows["trend"][sl], "factors": [json.dumps(f) for f in rows["factors_json"][sl]],
+                    "scored_by": SCORED_BY, "scored_at": scored_at,
+                },
+            )
+            written += res.rowcount
+        await self.db.commit()
+        await invalidate_tags("risk_scores")
+        return written
+
 
 class AlertHistoryDAO:
     def __init__(self, db: AsyncSession):
@@ -112,11 +586,10 @@ class AlertHistoryDAO:
         )
         return list(result.scalars().all())
 
-    async def get_all(self, limit: int = 100, offset: int = 0) -> List[AlertHistory]:
-        result = await self.db.execute(
-            select(AlertHistory).order_by(AlertHistory.created_at.desc()).offset(offset).limit(limit)
-        )
-        return list(result.scalars().all())
+    async def get_all(self, limit: int = 100, offset: int = 0, cursor: Optional[str] = None) -> dict:
+        q = keyset_paginate(select(AlertHistory), AlertHistory.created_at, AlertHistory.id, cursor, limit)
+        result = await self.db.execute(q if cursor else q.offset(offset))
+        return cursor_page(list(result.scalars().all()), limit, "created_at")
 
     async def create(self, data: dict) -> AlertHistory:
         entry = AlertHistory(**data)
@@ -124,3 +597,156 @@ class AlertHistoryDAO:
         await self.db.commit()
         await self.db.refresh(entry)
         return entry
+
+
+class AnomalyStateDAO:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def load(self, name: str) -> Optional[AnomalyDetectorState]:
+        result = await self.db.execute(select(AnomalyDetectorState).where(AnomalyDetectorState.name == name))
+        return result.scalar_one_or_none()
+
+    async def save(self, name: str, payload: bytes, watermarks: dict, series_count: int) -> None:
+        values = {
+            "payload": payload, "watermarks": watermarks,
+            "series_count": series_count, "saved_at": datetime.utcnow(),
+        }
+        stmt = pg_insert(AnomalyDetectorState).values(name=name, **values)
+        await self.db.execute(stmt.on_conflict_do_update(index_elements=["name"], set_=values))
+        await self.db.commit()
+
+
+class AnomalyIngestLease:
+    """Session-level advisory lock on a dedicated connection; its holder is the one ingesting worker.
+
+    An ingest run commits more than once (fired alerts, then the checkpoint), so
+    a transaction-scoped lock would be released halfway through. This one lives
+    as long as the connection: if the holder dies, the next worker to try takes over.
+    """
+
+    def __init__(self):
+        self._conn: Optional[AsyncConnection] = None
+
+    @property
+    def held(self) -> bool:
+        return self._conn is not None
+
+    async def acquire(self) -> bool:
+        """True while this process holds the lease; tries to take it when it doesn't."""
+        if self._conn is not None:
+            try:
+                await self._conn.scalar(select(1))
+                await self._conn.commit()
+                return True
+            except Exception:
+                await self.release()  # the connection, and the lock with it, is gone
+        conn = await engine.connect()
+        try:
+            locked = await conn.scalar(select(func.pg_try_advisory_lock(ANOMALY_INGEST_LOCK_ID)))
+            await conn.commit()
+        except Exception:
+            await conn.close()
+            raise
+        if not locked:
+            await conn.close()
+            return False
+        self._conn = conn
+        return True
+
+    async def release(self) -> None:
+        if self._conn is None:
+            return
+        conn, self._conn = self._conn, None
+        try:
+            await conn.scalar(select(func.pg_advisory_unlock(ANOMALY_INGEST_LOCK_ID)))
+            await conn.commit()
+        except Exception:
+            await conn.invalidate()  # never hand a connection that may still hold the lock back to the pool
+        await conn.close()
+
+
+class AnomalySourceDAO:
+    """Reads cash transactions, posted journal lines and KPI values past per-source keyset watermarks."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    @staticmethod
+    def _after(ts_col, id_col, watermark: Optional[list]):
+        if not watermark:
+            return true()
+        return tuple_(ts_col, id_col) > tuple_(datetime.fromisoformat(watermark[0]), UUID(watermark[1]))
+
+    @staticmethod
+    def _mark(ts: datetime, row_id: UUID) -> list:
+        return [ts.isoformat(), str(row_id)]
+
+    async def fetch_new(self, watermarks: dict, limit: int) -> Tuple[list, dict]:
+        """Up to `limit` rows per source as rule-engine events, plus the advanced watermarks."""
+        events, marks = [], {}
+
+        result = await self.db.execute(
+            select(
+                CashTransaction.id, CashTransaction.created_at, CashTransaction.transaction_date,
+                CashTransaction.account_id, CashTransaction.amount, CashTransaction.direction,
+                CashTransaction.category, CashTransaction.counterparty,
+            )
+            .where(self._after(CashTransaction.created_at, CashTransaction.id, watermarks.get("cash_transactions")))
+            .order_by(CashTransaction.created_at, CashTransaction.id)
+            .limit(limit)
+        )
+        rows = result.all()
+        for r in rows:
+            events.append({
+                "metric": "transaction_amount",
+                "value": r.amount,
+                "entity": str(r.account_id),
+                "timestamp": datetime.combine(r.transaction_date, datetime.min.time()),
+                "attributes": {"direction": r.direction, "category": r.category, "counterparty": r.counterparty},
+            })
+        if rows:
+            marks["cash_transactions"] = self._mark(rows[-1].created_at, rows[-1].id)
+
+        # Page by entry so an entry's lines are never split across runs
+        entries = (
+            select(JournalEntry.id, JournalEntry.posted_at)
+            .where(
+                JournalEntry.status == JournalEntryStatus.POSTED,
+                JournalEntry.posted_at.is_not(None),
+                self._after(JournalEntry.posted_at, JournalEntry.id, watermarks.get("journal_postings")),
+            )
+            .order_by(JournalEntry.posted_at, JournalEntry.id)
+            .limit(limit)
+            .subquery()
+        )
+        result = await self.db.execute(
+            select(entries.c.id, entries.c.posted_at, JournalLine.account_code, JournalLine.debit, JournalLine.credit)
+            .join(JournalLine, JournalLine.entry_id == entries.c.id)
+            .order_by(entries.c.posted_at, entries.c.id)
+        )
+        rows = result.all()
+        for r in rows:
+            events.append({
+                "metric": "journal_posting_amount",
+                "value": (r.debit or 0) - (r.credit or 0),
+                "entity": r.account_code,
+                "timestamp": r.posted_at,
+            })
+        if rows:
+            marks["journal_postings"] = self._mark(rows[-1].posted_at, rows[-1].id)
+
+        result = await self.db.execute(
+            select(KpiValue.id, KpiValue.recorded_at, KpiValue.value, KpiDefinition.name)
+            .join(KpiDefinition, KpiDefinition.id == KpiValue.kpi_id)
+            .where(self._after(KpiValue.recorded_at, KpiValue.id, watermarks.get("kpi_values")))
+            .order_by(KpiValue.recorded_at, KpiValue.id)
+            .limit(limit)
+        )
+        rows = result.all()
+        for r in rows:
+            events.append({"metric": "kpi_value", "value": r.value, "entity": r.name, "timestamp": r.recorded_at})
+        if rows:
+            marks["kpi_values"] = self._mark(rows[-1].recorded_at, rows[-1].id)
+
+        return events, marks
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Literal
 from uuid import UUID
 from pydantic import BaseModel, Field
 
@@ -35,6 +35,21 @@ class AlertResolve(BaseModel):
     resolution_notes: Optional[str] = None
 
 
+class AlertBulkTransition(BaseModel):
+    alert_ids: List[UUID] = Field(..., min_length=1, max_length=5000)
+    action: Literal["acknowledge", "resolve"]
+    performed_by: str
+    resolution_notes: Optional[str] = None
+
+
+class AlertTransitionResult(BaseModel):
+    action: str
+    requested: int
+    transitioned: int
+    alert_ids: List[UUID]
+    skipped_ids: List[UUID]  # missing, or not in a state this action applies to
+
+
 # ── Alert Rule ──
 class AlertRuleCreate(BaseModel):
     name: str = Field(..., max_length=200)
@@ -71,6 +86,31 @@ class AlertRuleOut(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class RuleEvent(BaseModel):
+    metric: str
+    value: Optional[float] = None
+    entity: Optional[str] = None
+    timestamp: Optional[datetime] = None  # drives the day-of-week anomaly baseline; defaults to now
+    attributes: Optional[Dict[str, Any]] = None  # string fields matched by pattern rules
+
+
+class RuleEvaluationRequest(BaseModel):
+    events: List[RuleEvent]
+    learn: bool = False  # fold these events into the anomaly baselines (the ingest job always does)
+
+
+class RuleEvaluationResult(BaseModel):
+    events: int
+    rules_evaluated: int
+    rules_compiled: int
+    invalid_rules: Dict[str, str]
+    rules_fired: int
+    suppressed_by_cooldown: int
+    alert_ids: List[UUID]
+    evaluate_ms: float
+    total_ms: float
+
+
 # ── Risk Dashboard ──
 class RiskScoreOut(BaseModel):
     id: UUID
@@ -94,13 +134,32 @@ class RiskHeatmapItem(BaseModel):
     severity: str  # derived from score
 
 
+class RiskScoringResult(BaseModel):
+    entities: int
+    written: int
+    skipped: bool  # another worker was already scoring
+    score_ms: float
+    total_ms: float
+
+
+class AlertTrend(BaseModel):
+    period: str  # bucket start, ISO 8601
+    total: int  # alerts created
+    critical: int
+    high: int
+    medium: int
+    low: int
+    acknowledged: int = 0
+    resolved: int = 0
+
+
 class RiskDashboardData(BaseModel):
     total_open_alerts: int
     critical_alerts: int
     high_alerts: int
     avg_risk_score: float
     top_risks: List[RiskScoreOut]
-    alert_trend_7d: List[Dict[str, Any]]
+    alert_trend_7d: List[AlertTrend]
 
 
 # ── History ──
@@ -112,12 +171,3 @@ class AlertHistoryOut(BaseModel):
     details: Optional[str]
     created_at: datetime
     model_config = {"from_attributes": True}
-
-
-class AlertTrend(BaseModel):
-    period: str
-    total: int
-    critical: int
-    high: int
-    medium: int
-    low: int
@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import String, Text, Float, Integer, Boolean, DateTime, ForeignKey, Enum as SAEnum
+from sqlalchemy import String, Text, Float, Integer, Boolean, DateTime, ForeignKey, Index, LargeBinary, UniqueConstraint, Enum as SAEnum
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from app.database import Base
@@ -32,6 +32,7 @@ class AlertCategory(str, enum.Enum):
 
 class Alert(Base):
     __tablename__ = "alerts"
+    __table_args__ = (Index("ix_alerts_created_at_id", "created_at", "id"),)
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     title: Mapped[str] = mapped_column(String(300), nullable=False)
@@ -73,22 +74,24 @@ class AlertRule(Base):
 
 class RiskScore(Base):
     __tablename__ = "risk_scores"
+    __table_args__ = (UniqueConstraint("entity_type", "entity_name", name="uq_risk_scores_entity"),)
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    entity_type: Mapped[str] = mapped_column(String(50), nullable=False)  # department, vendor, process, portfolio
+    entity_type: Mapped[str] = mapped_column(String(50), nullable=False)  # department, customer, vendor, process, portfolio
     entity_name: Mapped[str] = mapped_column(String(200), nullable=False)
     overall_score: Mapped[float] = mapped_column(Float, nullable=False)  # 0-100
     financial_risk: Mapped[float] = mapped_column(Float, default=0.0)
     operational_risk: Mapped[float] = mapped_column(Float, default=0.0)
     compliance_risk: Mapped[float] = mapped_column(Float, default=0.0)
     trend: Mapped[str] = mapped_column(String(20), default="stable")  # improving, stable, deteriorating
-    factors_json: Mapped[dict] = mapped_column(JSONB, nullable=True)
+    factors_json: Mapped[dict] = mapped_column(JSONB, nullable=True)  # {"features": {...}, "history": [...], "slope": x}
     scored_by: Mapped[str] = mapped_column(String(50), default="AGT-071")
     scored_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
 
 class AlertHistory(Base):
     __tablename__ = "alert_history"
+    __table_args__ = (Index("ix_alert_history_created_at_id", "created_at", "id"),)
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     alert_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False)
@@ -96,3 +99,34 @@ class AlertHistory(Base):
     performed_by: Mapped[str] = mapped_column(String(200), nullable=True)
     details: Mapped[str] = mapped_column(Text, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class AlertTrendCounter(Base):
+    """Alerts created, acknowledged and resolved per hour, severity and category.
+
+    Maintained in the same transaction as the alert writes, so trend reads sum
+    a handful of rows per bucket instead of scanning alerts.
+    """
+
+    __tablename__ = "alert_trend_counters"
+    __table_args__ = (
+        UniqueConstraint("bucket_start", "severity", "category", name="uq_alert_trend_counters_bucket"),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    bucket_start: Mapped[datetime] = mapped_column(DateTime, nullable=False)  # hour
+    severity: Mapped[AlertSeverity] = mapped_column(SAEnum(AlertSeverity), nullable=False)
+    category: Mapped[AlertCategory] = mapped_column(SAEnum(AlertCategory), nullable=False)
+    created: Mapped[int] = mapped_column(Integer, default=0)
+    acknowledged: Mapped[int] = mapped_column(Integer, default=0)
+    resolved: Mapped[int] = mapped_column(Integer, default=0)
+
+
+class AnomalyDetectorState(Base):
+    __tablename__ = "anomaly_detector_state"
+
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    series_count: Mapped[int] = mapped_column(Integer, default=0)
+    watermarks: Mapped[dict] = mapped_column(JSONB, nullable=True)  # {"<source>": ["<iso ts>", "<id>"]}
+    payload: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)  # compressed npz of the detector arrays
+    saved_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
@@ -1,16 +1,19 @@
 from uuid import UUID
-from typing import Optional
-from fastapi import APIRouter, Depends, Query
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, Header, Query
+from sse_starlette.sse import EventSourceResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
-from app.shared.responses import ApiResponse
+from app.shared.cache import cache_response
+from app.shared.responses import ApiResponse, CursorResponse
+from app.modules.risk.alert_stream import alert_stream_hub
 from app.modules.risk.service import (
     AlertService, AlertRuleService, RiskDashboardService, AlertHistoryService,
 )
 from app.modules.risk.dtos import (
-    AlertOut, AlertAcknowledge, AlertResolve,
-    AlertRuleCreate, AlertRuleUpdate, AlertRuleOut,
-    RiskScoreOut, RiskDashboardData,
+    AlertOut, AlertAcknowledge, AlertResolve, AlertBulkTransition, AlertTransitionResult,
+    AlertRuleCreate, AlertRuleUpdate, AlertRuleOut, RuleEvaluationRequest, RuleEvaluationResult,
+    RiskScoreOut, RiskDashboardData, RiskScoringResult, AlertTrend,
     AlertHistoryOut,
 )
 
@@ -18,18 +21,52 @@ router = APIRouter()
 
 
 # ── Alerts ──
-@router.get("/alerts", response_model=ApiResponse[list[AlertOut]])
+@router.get("/alerts", response_model=CursorResponse[AlertOut])
 async def list_alerts(
     severity: Optional[str] = None,
     status: Optional[str] = None,
     category: Optional[str] = None,
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
     db: AsyncSession = Depends(get_db),
 ):
     svc = AlertService(db)
-    alerts = await svc.list_alerts(severity, status, category, limit, offset)
-    return ApiResponse(data=alerts)
+    page = await svc.list_alerts(severity, status, category, limit, offset, cursor)
+    return CursorResponse(**page)
+
+
+@router.get("/alerts/stream")
+async def stream_alerts(
+    severity: Optional[str] = Query(None, description="Comma-separated severities, e.g. high,critical"),
+    category: Optional[str] = Query(None, description="Comma-separated categories"),
+    last_event_id: Optional[str] = Query(None, description="Replay after this id; browsers send the header on reconnect"),
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID"),
+):
+    """SSE push of created, acknowledged and resolved alerts; replaces polling /alerts."""
+    severities = {s.strip() for s in severity.split(",") if s.strip()} if severity else None
+    categories = {c.strip() for c in category.split(",") if c.strip()} if category else None
+    events = alert_stream_hub.events(severities, categories, last_event_id_header or last_event_id)
+    return EventSourceResponse(events, ping=15)
+
+
+@router.get("/alerts/trend", response_model=ApiResponse[list[AlertTrend]])
+@cache_response(ttl=60, tags=["alerts"])
+async def alert_trend(
+    days: int = Query(7, ge=1, le=90),
+    bucket: Literal["hour", "day"] = "day",
+    db: AsyncSession = Depends(get_db),
+):
+    svc = AlertService(db)
+    trend = await svc.get_trend(days, bucket)
+    return ApiResponse(data=trend)
+
+
+@router.post("/alerts/transitions", response_model=ApiResponse[AlertTransitionResult])
+async def bulk_transition_alerts(data: AlertBulkTransition, db: AsyncSession = Depends(get_db)):
+    svc = AlertService(db)
+    result = await svc.bulk_transition(data)
+    return ApiResponse(data=result, message=f"{result.transitioned} of {result.requested} alerts updated")
 
 
 @router.get("/alerts/{alert_id}", response_model=ApiResponse[AlertOut])
@@ -55,6 +92,7 @@ async def resolve_alert(alert_id: UUID, data: AlertResolve, db: AsyncSession = D
 
 # ── Dashboard ──
 @router.get("/dashboard", response_model=ApiResponse[RiskDashboardData])
+@cache_response(ttl=300, tags=["alerts", "risk_scores"])
 async def risk_dashboard(db: AsyncSession = Depends(get_db)):
     svc = RiskDashboardService(db)
     data = await svc.get_dashboard()
@@ -75,6 +113,14 @@ async def risk_scores(entity_type: Optional[str] = None, db: AsyncSession = Depe
     return ApiResponse(data=scores)
 
 
+@router.post("/dashboard/scores/recompute", response_model=ApiResponse[RiskScoringResult])
+async def recompute_risk_scores(db: AsyncSession = Depends(get_db)):
+    svc = RiskDashboardService(db)
+    result = await svc.rescore()
+    message = "Scoring already in progress" if result.skipped else f"{result.written} entities scored"
+    return ApiResponse(data=result, message=message)
+
+
 # ── Rules ──
 @router.get("/rules", response_model=ApiResponse[list[AlertRuleOut]])
 async def list_rules(is_active: Optional[bool] = None, db: AsyncSession = Depends(get_db)):
@@ -90,6 +136,13 @@ async def create_rule(data: AlertRuleCreate, db: AsyncSession = Depends(get_db))
     return ApiResponse(data=rule, message="Rule created")
 
 
+@router.post("/rules/evaluate", response_model=ApiResponse[RuleEvaluationResult])
+async def evaluate_rules(data: RuleEvaluationRequest, db: AsyncSession = Depends(get_db)):
+    svc = AlertRuleService(db)
+    result = await svc.evaluate(data)
+    return ApiResponse(data=result, message=f"{result.rules_fired} rules fired")
+
+
 @router.put("/rules/{rule_id}", response_model=ApiResponse[AlertRuleOut])
 async def update_rule(rule_id: UUID, data: AlertRuleUpdate, db: AsyncSession = Depends(get_db)):
     svc = AlertRuleService(db)
@@ -105,15 +158,16 @@ async def delete_rule(rule_id: UUID, db: AsyncSession = Depends(get_db)):
 
 
 # ── History ──
-@router.get("/history", response_model=ApiResponse[list[AlertHistoryOut]])
+@router.get("/history", response_model=CursorResponse[AlertHistoryOut])
 async def alert_history(
     limit: int = Query(100, ge=1, le=500),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
     db: AsyncSession = Depends(get_db),
 ):
     svc = AlertHistoryService(db)
-    history = await svc.get_history(limit, offset)
-    return ApiResponse(data=history)
+    page = await svc.get_history(limit, offset, cursor)
+    return CursorResponse(**page)
 
 
 @router.get("/history/{alert_id}", response_model=ApiResponse[list[AlertHistoryOut]])
@@ -0,0 +1,354 @@
+import re
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from uuid import UUID
+import numpy as np
+from app.modules.risk.anomaly import DETECTORS, AnomalyDetectors, anomaly_detectors
+
+OPERATORS = ("<", "<=", ">", ">=", "==", "!=")
+
+
+class Match(NamedTuple):
+    count: int            # events in the batch satisfying the condition
+    value: Any            # most extreme matching value
+    entity: Optional[str]
+    detail: str
+
+
+class RuleConfigError(ValueError):
+    pass
+
+
+# ── Event batch ──
+class MetricColumn:
+    """One metric's values from a batch, sorted once so every threshold is a binary search."""
+
+    __slots__ = ("values", "entities", "seasons", "order", "sorted", "scores")
+
+    def __init__(self, values: List[float], entities: List[Optional[str]], seasons: List[int]):
+        self.values = np.asarray(values, dtype=np.float64)
+        self.entities = entities
+        self.seasons = seasons
+        self.order = np.argsort(self.values, kind="stable")
+        self.sorted = self.values[self.order]
+        self.scores: Dict[str, np.ndarray] = {}  # anomaly detector -> |score| per value
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def count(self, op: str, thresholds: np.ndarray) -> np.ndarray:
+        """Events satisfying `value <op> threshold`, for every threshold at once."""
+        s, n = self.sorted, len(self.sorted)
+        if op == "<":
+            return np.searchsorted(s, thresholds, "left")
+        if op == "<=":
+            return np.searchsorted(s, thresholds, "right")
+        if op == ">":
+            return n - np.searchsorted(s, thresholds, "right")
+        if op == ">=":
+            return n - np.searchsorted(s, thresholds, "left")
+        equal = np.searchsorted(s, thresholds, "right") - np.searchsorted(s, thresholds, "left")
+        return equal if op == "==" else n - equal
+
+    def extreme(self, op: str, threshold: float) -> int:
+        """Index of the matching event furthest past the threshold."""
+        if op in ("<", "<="):
+            return int(self.order[0])
+        if op in (">", ">="):
+            return int(self.order[-1])
+        if op == "==":
+            return int(self.order[np.searchsorted(self.sorted, threshold, "left")])
+        return int(self.order[0] if self.sorted[0] != threshold else self.order[-1])
+
+
+class EventBatch:
+    """Columnar view of a batch of {"metric", "value", "entity", "timestamp", "attributes"} events."""
+
+    def __init__(self, events: Sequence[dict], now: datetime):
+        self.size = len(events)
+        values: Dict[str, List[float]] = defaultdict(list)
+        entities: Dict[str, List[Optional[str]]] = defaultdict(list)
+        seasons: Dict[str, List[int]] = defaultdict(list)
+        self.attributes: Dict[Tuple[Optional[str], str], Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        for e in events:
+            metric = e["metric"]
+            if e.get("value") is not None:
+                values[metric].append(e["value"])
+                entities[metric].append(e.get("entity"))
+                seasons[metric].append((e.get("timestamp") or now).weekday())
+            for key, val in (e.get("attributes") or {}).items():
+                if isinstance(val, str):
+                    self.attributes[(metric, key)][val] += 1
+                    self.attributes[(None, key)][val] += 1
+        self.columns: Dict[str, MetricColumn] = {
+            m: MetricColumn(values[m], entities[m], seasons[m]) for m in values
+        }
+
+    def column(self, metric: str) -> Optional[MetricColumn]:
+        return self.columns.get(metric)
+
+    def attribute_counts(self, field: str, metric: Optional[str] = None) -> Dict[str, int]:
+        """Distinct values of a string attribute with their counts; regexes run once per distinct value."""
+        return self.attributes.get((metric, field), {})
+
+
+# ── Predicate tree ──
+class Condition(ABC):
+    @abstractmethod
+    def evaluate(self, batch: EventBatch) -> Optional[Match]:
+        ...
+
+
+class ThresholdCondition(Condition):
+    def __init__(self, config: dict):
+        self.metric = _require(config, "metric")
+        self.op = config.get("operator", ">")
+        if self.op not in OPERATORS:
+            raise RuleConfigError(f"Unknown operator: {self.op}")
+        self.value = float(_require(config, "value"))
+        self.min_count = int(config.get("min_count", 1))
+
+    def evaluate(self, batch: EventBatch) -> Optional[Match]:
+        col = batch.column(self.metric)
+        if col is None:
+            return None
+        count = int(col.count(self.op, np.array([self.value]))[0])
+        return self.match(col, count)
+
+    def match(self, col: MetricColumn, count: int) -> Optional[Match]:
+        if count < self.min_count:
+            return None
+        i = col.extreme(self.op, self.value)
+        value = float(col.values[i])
+        return Match(count, value, col.entities[i], f"{self.metric} {self.op} {self.value:g} (observed {value:g})")
+
+
+class AnomalyCondition(Condition):
+    """Values whose streaming detector score exceeds `std_devs` for their own series."""
+
+    def __init__(self, config: dict):
+        self.metric = _require(config, "metric")
+        self.detector = config.get("detector", "ewma")
+        if self.detector not in DETECTORS:
+            raise RuleConfigError(f"Unknown detector: {self.detector}")
+        self.std_devs = float(config.get("std_devs", 3))
+        self.min_count = int(config.get("min_count", 1))
+
+    def evaluate(self, batch: EventBatch) -> Optional[Match]:
+        col = batch.column(self.metric)
+        if col is None or self.detector not in col.scores:
+            return None
+        scores = col.scores[self.detector]
+        count = int(np.count_nonzero(scores > self.std_devs))
+        if count < self.min_count:
+            return None
+        i = int(np.argmax(scores))
+        value = float(col.values[i])
+        return Match(
+            count, value, col.entities[i],
+            f"{self.metric} {self.detector} score {scores[i]:.2f} beyond {self.std_devs:g} (observed {value:g})",
+        )
+
+
+class PatternCondition(Condition):
+    def __init__(self, config: dict):
+        self.field = _require(config, "field")
+        self.metric = config.get("metric")
+        try:
+            self.regex = re.compile(_require(config, "pattern"))
+        except re.error as e:
+            raise RuleConfigError(f"Invalid pattern: {e}")
+        self.min_count = int(config.get("min_count", 1))
+
+    def evaluate(self, batch: EventBatch) -> Optional[Match]:
+        hits = {v: n for v, n in batch.attribute_counts(self.field, self.metric).items() if self.regex.search(v)}
+        count = sum(hits.values())
+        if count < self.min_count:
+            return None
+        value = max(hits, key=hits.get)
+        return Match(count, value, None, f"{self.field} matched /{self.regex.pattern}/ {count} times")
+
+
+class CompositeCondition(Condition):
+    def __init__(self, config: dict):
+        self.operator = str(config.get("operator", "and")).lower()
+        if self.operator not in ("and", "or"):
+            raise RuleConfigError(f"Unknown composite operator: {self.operator}")
+        children = _require(config, "conditions")
+        if not isinstance(children, list) or not children:
+            raise RuleConfigError("composite rules need a non-empty 'conditions' list")
+        self.children = [
+            compile_condition(_require(c, "condition_type"), c.get("condition_config", c)) for c in children
+        ]
+
+    def evaluate(self, batch: EventBatch) -> Optional[Match]:
+        matches = []
+        for child in self.children:
+            m = child.evaluate(batch)
+            if m is None and self.operator == "and":
+                return None
+            if m is not None:
+                matches.append(m)
+                if self.operator == "or":
+                    break
+        if not matches:
+            return None
+        first = matches[0]
+        joiner = " AND " if self.operator == "and" else " OR "
+        return Match(max(m.count for m in matches), first.value, first.entity, joiner.join(m.detail for m in matches))
+
+
+CONDITIONS = {
+    "threshold": ThresholdCondition,
+    "anomaly": AnomalyCondition,
+    "pattern": PatternCondition,
+    "composite": CompositeCondition,
+}
+
+
+def _require(config: dict, key: str):
+    if not isinstance(config, dict) or config.get(key) is None:
+        raise RuleConfigError(f"condition_config is missing '{key}'")
+    return config[key]
+
+
+def compile_condition(condition_type: str, config: dict) -> Condition:
+    cls = CONDITIONS.get(condition_type)
+    if cls is None:
+        raise RuleConfigError(f"Unknown condition_type: {condition_type}")
+    return cls(config)
+
+
+# ── Engine ──
+class CompiledRule:
+    __slots__ = ("id", "name", "severity", "category", "condition_type", "config",
+                 "cooldown", "last_triggered_at", "updated_at", "condition")
+
+    def __init__(self, row: dict):
+        self.id: UUID = row["id"]
+        self.name = row["name"]
+        self.severity = row["severity"]
+        self.category = row["category"]
+        self.condition_type = row["condition_type"]
+        self.config = row["condition_config"]
+        self.cooldown = timedelta(minutes=row["cooldown_minutes"] or 0)
+        self.last_triggered_at: Optional[datetime] = row["last_triggered_at"]
+        self.updated_at: datetime = row["updated_at"]
+        self.condition = compile_condition(self.condition_type, self.config)
+
+    def cooling_down(self, now: datetime) -> bool:
+        return self.last_triggered_at is not None and now - self.last_triggered_at < self.cooldown
+
+
+class RuleEngine:
+    """Compiled active alert rules, evaluated together against event batches.
+
+    Rules are compiled into predicate trees once and recompiled only when their
+    updated_at moves. Plain threshold rules, usually the bulk of the rule set,
+    are further grouped by (metric, operator) into threshold arrays, so each
+    group costs one searchsorted over the batch's sorted metric column however
+    many rules it holds. Everything else walks its tree.
+    """
+
+    def __init__(self, detectors: AnomalyDetectors):
+        self.detectors = detectors
+        self.rules: Dict[UUID, CompiledRule] = {}
+        self.invalid: Dict[UUID, Tuple[datetime, str]] = {}  # rule id -> (updated_at, compile error)
+        self._groups: Dict[Tuple[str, str], Tuple[List[CompiledRule], np.ndarray]] = {}
+        self._others: List[CompiledRule] = []
+
+    def stale_ids(self, versions: Dict[UUID, Tuple[datetime, Optional[datetime]]]) -> List[UUID]:
+        """Apply the latest (updated_at, last_triggered_at) of every active rule.
+
+        Drops rules that are no longer active, refreshes cooldown state, and
+        returns the ids whose definition must be (re)loaded and compiled.
+        """
+        for rule_id in set(self.rules) - set(versions):
+            del self.rules[rule_id]
+        for rule_id in set(self.invalid) - set(versions):
+            del self.invalid[rule_id]
+        stale = []
+        for rule_id, (updated_at, last_triggered_at) in versions.items():
+            rule = self.rules.get(rule_id)
+            if rule is None and self.invalid.get(rule_id, (None,))[0] == updated_at:
+                continue
+            if rule is None or rule.updated_at != updated_at:
+                stale.append(rule_id)
+            else:
+                rule.last_triggered_at = last_triggered_at
+        self._index()
+        return stale
+
+    def load(self, rows: Sequence[dict]) -> int:
+        """Compile freshly loaded rule rows; invalid configs are kept aside with their error."""
+        for row in rows:
+            self.invalid.pop(row["id"], None)
+            try:
+                self.rules[row["id"]] = CompiledRule(row)
+            except (RuleConfigError, TypeError, ValueError) as e:
+                self.rules.pop(row["id"], None)
+                self.invalid[row["id"]] = (row["updated_at"], str(e))
+        self._index()
+        return len(rows)
+
+    def _index(self) -> None:
+        groups: Dict[Tuple[str, str], List[CompiledRule]] = defaultdict(list)
+        others = []
+        for rule in self.rules.values():
+            cond = rule.condition
+            if isinstance(cond, ThresholdCondition) and cond.min_count == 1:
+                groups[(cond.metric, cond.op)].append(rule)
+            else:
+                others.append(rule)
+        self._groups = {
+            key: (rules, np.array([r.condition.value for r in rules], dtype=np.float64))
+            for key, rules in groups.items()
+        }
+        self._others = others
+
+    def evaluate(self, events: Sequence[dict], now: datetime, learn: bool = True) -> dict:
+        """Evaluate every rule against one batch; returns fired (rule, match) pairs and timings.
+
+        `learn=False` scores anomalies against the current baselines without updating them.
+        """
+        started = time.perf_counter()
+        batch = EventBatch(events, now)
+        # Every observation feeds the per-series detectors once, whether or not an anomaly rule reads it
+        for metric, col in batch.columns.items():
+            col.scores = self.detectors.observe(
+                [f"{metric}|{entity or ''}" for entity in col.entities], col.values, col.seasons, learn=learn,
+            )
+        fired: List[Tuple[CompiledRule, Match]] = []
+        suppressed = 0
+        for (metric, op), (rules, thresholds) in self._groups.items():
+            col = batch.column(metric)
+            if col is None:
+                continue
+            counts = col.count(op, thresholds)
+            for k in np.flatnonzero(counts):
+                rule = rules[k]
+                if rule.cooling_down(now):
+                    suppressed += 1
+                    continue
+                fired.append((rule, rule.condition.match(col, int(counts[k]))))
+        for rule in self._others:
+            match = rule.condition.evaluate(batch)
+            if match is None:
+                continue
+            if rule.cooling_down(now):
+                suppressed += 1
+                continue
+            fired.append((rule, match))
+        return {
+            "events": batch.size,
+            "rules_evaluated": len(self.rules),
+            "fired": fired,
+            "suppressed_by_cooldown": suppressed,
+            "evaluate_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+
+
+rule_engine = RuleEngine(anomaly_detectors)
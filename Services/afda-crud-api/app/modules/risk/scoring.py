@@ -0,0 +1,186 @@
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+
+FACTORS = ("financial_risk", "operational_risk", "compliance_risk")
+FACTOR_WEIGHTS = np.array([0.45, 0.30, 0.25])  # share of each factor in overall_score
+
+# feature -> (source, saturation scale, weight on the financial / operational / compliance factor).
+# A raw value equal to its scale maps to ~63 on the 0-100 feature score.
+FEATURES = {
+    "ar_overdue_ratio": ("ar", 0.3, (0.35, 0.0, 0.0)),  # overdue share of the open balance
+    "ar_days_past_due": ("ar", 30.0, (0.25, 0.0, 0.0)),  # balance-weighted days past due
+    "ar_write_off_ratio": ("ar", 0.05, (0.2, 0.0, 0.15)),  # written-off share of billings
+    "variance_abs_pct": ("variance", 10.0, (0.2, 0.1, 0.0)),  # mean |variance %|
+    "variance_overrun": ("variance", 0.1, (0.3, 0.0, 0.0)),  # overspend / budget
+    "variance_unexplained": ("variance", 0.3, (0.0, 0.0, 0.4)),  # breaches without an explanation
+    "alerts_financial": ("alerts", 5.0, (0.3, 0.0, 0.0)),  # severity-weighted open alerts
+    "alerts_operational": ("alerts", 5.0, (0.0, 0.3, 0.0)),
+    "alerts_compliance": ("alerts", 5.0, (0.0, 0.0, 0.5)),
+    "incidents_open": ("incidents", 3.0, (0.0, 0.35, 0.0)),  # severity-weighted open incidents
+    "incidents_recent": ("incidents", 5.0, (0.0, 0.25, 0.0)),  # incidents in the lookback window
+    "incident_hours": ("incidents", 24.0, (0.0, 0.25, 0.0)),  # hours of incident time in the window
+}
+FEATURE_NAMES = list(FEATURES)
+FEATURE_INDEX = {name: i for i, name in enumerate(FEATURE_NAMES)}
+SOURCES = sorted({source for source, _, _ in FEATURES.values()})
+FEATURE_SOURCE = np.array([SOURCES.index(FEATURES[f][0]) for f in FEATURE_NAMES])
+SCALES = np.array([FEATURES[f][1] for f in FEATURE_NAMES])
+WEIGHTS = np.array([FEATURES[f][2] for f in FEATURE_NAMES])  # features x factors
+
+HISTORY_LENGTH = 6  # prior overall scores kept per entity for the trend
+TREND_SLOPE = 1.5  # score points per run before a trend counts as a move
+TRENDS = np.array(["improving", "stable", "deteriorating"])
+
+
+class FactorMatrix:
+    """Entities x features matrix assembled from per-source aggregates.
+
+    Entities are (entity_type, entity_name) rows. A feature only counts towards
+    an entity's factors when its source covers that entity, so a department is
+    not diluted by AR features it can never have; a source that covers an
+    entity but has nothing on it (no alerts, no incidents) contributes zeros.
+    """
+
+    def __init__(self):
+        self.index: Dict[Tuple[str, str], int] = {}
+        self.by_name: Dict[str, List[int]] = {}
+        self._values: List[Tuple[int, int, float]] = []
+        self._covered: List[Tuple[int, int]] = []
+        self.history: List[Sequence[float]] = []
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def entity(self, entity_type: str, entity_name: str) -> int:
+        key = (entity_type, entity_name)
+        row = self.index.get(key)
+        if row is None:
+            row = self.index[key] = len(self.index)
+            self.by_name.setdefault(entity_name, []).append(row)
+            self.history.append(())
+        return row
+
+    def add_snapshots(self, rows: Iterable[dict]) -> None:
+        """Entities already scored, with their prior overall scores (oldest first)."""
+        for r in rows:
+            row = self.entity(r["entity_type"], r["entity_name"])
+            self.history[row] = r["history"] or [r["overall_score"]]
+
+    def cover(self, row: int, source: str) -> None:
+        self._covered.append((row, SOURCES.index(source)))
+
+    def set(self, row: int, feature: str, value: Optional[float]) -> None:
+        if value:
+            self._values.append((row, FEATURE_INDEX[feature], float(value)))
+
+    def add_source(self, source: str, entity_type: str, rows: Iterable[dict]) -> None:
+        """Rows keyed by `entity_name` with one column per feature of `source`."""
+        features = [f for f in FEATURE_NAMES if FEATURES[f][0] == source]
+        for r in rows:
+            row = self.entity(entity_type, r["entity_name"])
+            self.cover(row, source)
+            for f in features:
+                self.set(row, f, r.get(f))
+
+    def add_by_name(self, source: str, rows: Iterable[dict]) -> None:
+        """Rows keyed by name only (alerts name an entity, not its type); apply to every match."""
+        features = [f for f in FEATURE_NAMES if FEATURES[f][0] == source]
+        for r in rows:
+            for row in self.by_name.get(r["entity_name"], ()):
+                for f in features:
+                    self.set(row, f, r.get(f))
+
+    def cover_all(self, source: str, entity_type: Optional[str] = None) -> None:
+        for (etype, _), row in self.index.items():
+            if entity_type is None or etype == entity_type:
+                self.cover(row, source)
+
+    @staticmethod
+    def backed(values: np.ndarray, available: np.ndarray) -> np.ndarray:
+        """Rows covered by a source other than alerts, or with any nonzero feature.
+
+        Alerts cover every entity so open alerts always count, but an entity
+        known only from its stored score, with no alerts, has nothing to score.
+        """
+        real_source = FEATURE_SOURCE != SOURCES.index("alerts")
+        return (available & real_source).any(axis=1) | (values != 0).any(axis=1)
+
+    def build(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(values, available, history) arrays; history is right-aligned and NaN-padded."""
+        n, k = len(self.index), len(FEATURE_NAMES)
+        values = np.zeros((n, k))
+        if self._values:
+            r, c, v = (np.array(a) for a in zip(*self._values))
+            np.add.at(values, (r.astype(np.int64), c.astype(np.int64)), v)
+        covered = np.zeros((n, len(SOURCES)), dtype=bool)
+        if self._covered:
+            r, s = (np.array(a, dtype=np.int64) for a in zip(*self._covered))
+            covered[r, s] = True
+        history = np.full((n, HISTORY_LENGTH), np.nan)
+        for row, past in enumerate(self.history):
+            past = [p for p in past if p is not None][-HISTORY_LENGTH:]
+            if past:
+                history[row, HISTORY_LENGTH - len(past):] = past
+        return values, covered[:, FEATURE_SOURCE], history
+
+
+class RiskScorer:
+    """Factor, overall and trend scores for every entity in a few matrix operations.
+
+    Each raw feature is squashed onto 0-100 with 1 - exp(-x / scale); a factor
+    is the weighted mean of the feature scores its sources cover, and
+    overall_score the weighted mean of the factors that have any coverage.
+    Trend is the least-squares slope of the stored history plus this run.
+    """
+
+    def score(self, values: np.ndarray, available: np.ndarray, history: np.ndarray) -> dict:
+        started = time.perf_counter()
+        feature_scores = np.where(available, 1.0 - np.exp(-np.maximum(values, 0.0) / SCALES), 0.0)
+        covered_weight = available.astype(np.float64) @ WEIGHTS
+        has_factor = covered_weight > 0
+        factors = 100.0 * (feature_scores @ WEIGHTS) / np.where(has_factor, covered_weight, 1.0)
+
+        factor_weight = has_factor * FACTOR_WEIGHTS
+        total_weight = factor_weight.sum(axis=1)
+        overall = (factors * factor_weight).sum(axis=1) / np.where(total_weight > 0, total_weight, 1.0)
+
+        series = np.column_stack([history, overall])
+        seen = ~np.isnan(series)
+        t = np.broadcast_to(np.arange(series.shape[1], dtype=np.float64), series.shape)
+        count = seen.sum(axis=1)
+        t_mean = np.where(seen, t, 0).sum(axis=1) / count
+        y_mean = np.where(seen, series, 0).sum(axis=1) / count
+        dt = np.where(seen, t - t_mean[:, None], 0.0)
+        dy = np.where(seen, series - y_mean[:, None], 0.0)
+        t_var = (dt * dt).sum(axis=1)
+        slope = np.where(t_var > 0, (dt * dy).sum(axis=1) / np.where(t_var > 0, t_var, 1.0), 0.0)
+        trend = TRENDS[(slope > TREND_SLOPE).astype(np.int64) - (slope < -TREND_SLOPE) + 1]
+
+        return {
+            "financial_risk": factors[:, 0],
+            "operational_risk": factors[:, 1],
+            "compliance_risk": factors[:, 2],
+            "overall_score": overall,
+            "trend": trend,
+            "slope": slope,
+            "feature_scores": 100.0 * feature_scores,
+            "history": series[:, 1:],
+            "score_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+
+
+def factors_json(result: dict, available: np.ndarray) -> List[dict]:
+    """Per-entity explanation stored with the score: covered feature scores and the rolling history."""
+    features = np.round(result["feature_scores"], 1).tolist()
+    history = np.round(result["history"], 2).tolist()
+    slopes = np.round(result["slope"], 2).tolist()
+    covered = available.tolist()
+    out = []
+    for f_row, c_row, h_row, slope in zip(features, covered, history, slopes):
+        out.append({
+            "features": {name: v for name, v, c in zip(FEATURE_NAMES, f_row, c_row) if c},
+            "history": [h for h in h_row if h == h],  # drop NaN padding
+            "slope": slope,
+        })
+    return out
@@ -1,21 +1,47 @@
+import asyncio
+import logging
+import time
 from uuid import UUID
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.modules.risk.dao import AlertDAO, AlertRuleDAO, RiskScoreDAO, AlertHistoryDAO
+from app.config import get_settings
+from app.database import run_concurrently
+from app.modules.risk.anomaly import anomaly_detectors
+from app.modules.risk.models import AlertStatus
+from app.modules.risk.dao import (
+    AlertDAO, AlertRuleDAO, RiskScoreDAO, AlertHistoryDAO, AlertTrendDAO, AnomalyStateDAO, AnomalySourceDAO,
+    AnomalyIngestLease,
+)
 from app.modules.risk.dtos import (
-    AlertAcknowledge, AlertResolve, AlertRuleCreate, AlertRuleUpdate, RiskDashboardData,
+    AlertAcknowledge, AlertResolve, AlertBulkTransition, AlertTransitionResult, AlertRuleCreate, AlertRuleUpdate, RiskDashboardData,
+    RuleEvaluationRequest, RuleEvaluationResult, RiskScoringResult,
 )
-from app.shared.exceptions import NotFoundException
+from app.modules.risk.rule_engine import RuleConfigError, compile_condition, rule_engine
+from app.modules.risk.scoring import FactorMatrix, RiskScorer, factors_json
+from app.shared.exceptions import NotFoundException, BadRequestException
+
+logger = logging.getLogger("afda")
+settings = get_settings()
+
+DETECTOR_STATE_NAME = "default"
+
+# action -> (states it applies to, resulting status, history action)
+ALERT_TRANSITIONS = {
+    "acknowledge": ((AlertStatus.OPEN,), AlertStatus.ACKNOWLEDGED, "acknowledged"),
+    "resolve": (
+        (AlertStatus.OPEN, AlertStatus.ACKNOWLEDGED, AlertStatus.INVESTIGATING),
+        AlertStatus.RESOLVED, "resolved",
+    ),
+}
 
 
 class AlertService:
     def __init__(self, db: AsyncSession):
         self.dao = AlertDAO(db)
-        self.history_dao = AlertHistoryDAO(db)
 
-    async def list_alerts(self, severity=None, status=None, category=None, limit=50, offset=0):
-        return await self.dao.get_all(severity, status, category, limit, offset)
+    async def list_alerts(self, severity=None, status=None, category=None, limit=50, offset=0, cursor=None):
+        return await self.dao.get_all(severity, status, category, limit, offset, cursor)
 
     async def get_alert(self, alert_id: UUID):
         alert = await self.dao.get_by_id(alert_id)
@@ -24,38 +50,44 @@ class AlertService:
         return alert
 
     async def acknowledge(self, alert_id: UUID, data: AlertAcknowledge):
-        alert = await self.dao.get_by_id(alert_id)
-        if not alert:
-            raise NotFoundException("Alert", alert_id)
-        updated = await self.dao.update(alert_id, {
-            "status": "acknowledged",
-            "acknowledged_by": data.acknowledged_by,
-            "acknowledged_at": datetime.utcnow(),
-        })
-        await self.history_dao.create({
-            "alert_id": alert_id,
-            "action": "acknowledged",
-            "performed_by": data.acknowledged_by,
-        })
-        return updated
+        return await self._transition_one(alert_id, "acknowledge", data.acknowledged_by)
 
     async def resolve(self, alert_id: UUID, data: AlertResolve):
+        return await self._transition_one(alert_id, "resolve", data.resolved_by, data.resolution_notes)
+
+    async def get_trend(self, days: int = 7, bucket: str = "day"):
+        return await AlertTrendDAO(self.dao.db).get_trend(days, bucket)
+
+    async def bulk_transition(self, data: AlertBulkTransition) -> AlertTransitionResult:
+        requested = list(dict.fromkeys(data.alert_ids))
+        rows = await self._transition(requested, data.action, data.performed_by, data.resolution_notes)
+        moved = {row.id for row in rows}
+        return AlertTransitionResult(
+            action=data.action,
+            requested=len(requested),
+            transitioned=len(moved),
+            alert_ids=[i for i in requested if i in moved],
+            skipped_ids=[i for i in requested if i not in moved],
+        )
+
+    async def _transition_one(self, alert_id: UUID, action: str, performed_by: str, notes: Optional[str] = None):
+        rows = await self._transition([alert_id], action, performed_by, notes)
+        if rows:
+            return rows[0]
+        # Only the failure path pays for a lookup, to tell "missing" from "wrong state"
         alert = await self.dao.get_by_id(alert_id)
         if not alert:
             raise NotFoundException("Alert", alert_id)
-        updated = await self.dao.update(alert_id, {
-            "status": "resolved",
-            "resolved_by": data.resolved_by,
-            "resolved_at": datetime.utcnow(),
-            "resolution_notes": data.resolution_notes,
-        })
-        await self.history_dao.create({
-            "alert_id": alert_id,
-            "action": "resolved",
-            "performed_by": data.resolved_by,
-            "details": data.resolution_notes,
-        })
-        return updated
+        raise BadRequestException(f"Cannot {action} an alert that is {alert.status.value}")
+
+    async def _transition(self, alert_ids: list, action: str, performed_by: str, notes: Optional[str] = None):
+        allowed_from, status, past = ALERT_TRANSITIONS[action]
+        now = datetime.utcnow()
+        if action == "acknowledge":
+            values = {"status": status, "acknowledged_by": performed_by, "acknowledged_at": now}
+        else:
+            values = {"status": status, "resolved_by": performed_by, "resolved_at": now, "resolution_notes": notes}
+        return await self.dao.transition(alert_ids, allowed_from, values, past, performed_by, notes, now)
 
 
 class AlertRuleService:
@@ -66,14 +98,52 @@ class AlertRuleService:
         return await self.dao.get_all(is_active)
 
     async def create_rule(self, data: AlertRuleCreate):
+        self._validate(data.condition_type, data.condition_config)
         return await self.dao.create(data.model_dump())
 
     async def update_rule(self, rule_id: UUID, data: AlertRuleUpdate):
         existing = await self.dao.get_by_id(rule_id)
         if not existing:
             raise NotFoundException("Alert Rule", rule_id)
+        if data.condition_config is not None:
+            self._validate(existing.condition_type, data.condition_config)
         return await self.dao.update(rule_id, data.model_dump(exclude_unset=True))
 
+    @staticmethod
+    def _validate(condition_type: str, config: dict) -> None:
+        try:
+            compile_condition(condition_type, config)
+        except (RuleConfigError, TypeError, ValueError) as e:
+            raise BadRequestException(f"Invalid rule condition: {e}")
+
+    async def evaluate(self, data: RuleEvaluationRequest) -> RuleEvaluationResult:
+        return await self.evaluate_events([e.model_dump() for e in data.events], learn=data.learn)
+
+    async def evaluate_events(self, events: list, learn: bool = True) -> RuleEvaluationResult:
+        """Run every active rule over one event batch and emit alerts for those that fire.
+
+        With `learn` off the anomaly detectors only score the batch, leaving the
+        production baselines and the set of tracked series untouched.
+        """
+        started = time.perf_counter()
+        await restore_detectors(self.dao.db)
+        now = datetime.utcnow()
+        stale = rule_engine.stale_ids(await self.dao.get_active_versions())
+        compiled = rule_engine.load(await self.dao.get_definitions(stale)) if stale else 0
+        outcome = rule_engine.evaluate(events, now, learn=learn)
+        alert_ids = await self.dao.record_triggers(outcome["fired"], now)
+        return RuleEvaluationResult(
+            events=outcome["events"],
+            rules_evaluated=outcome["rules_evaluated"],
+            rules_compiled=compiled,
+            invalid_rules={str(k): error for k, (_, error) in rule_engine.invalid.items()},
+            rules_fired=len(alert_ids),
+            suppressed_by_cooldown=outcome["suppressed_by_cooldown"] + len(outcome["fired"]) - len(alert_ids),
+            alert_ids=alert_ids,
+            evaluate_ms=outcome["evaluate_ms"],
+            total_ms=round((time.perf_counter() - started) * 1000, 2),
+        )
+
     async def delete_rule(self, rule_id: UUID):
         success = await self.dao.delete(rule_id)
         if not success:
@@ -81,48 +151,199 @@ class AlertRuleService:
         return True
 
 
+async def upgrade_risk_scores(db: AsyncSession) -> None:
+    """Startup: add the entity unique constraint the scoring upsert needs to an older risk_scores table."""
+    try:
+        await RiskScoreDAO(db).upgrade_schema()
+    except Exception as e:
+        await db.rollback()
+        logger.warning(f"risk_scores upgrade skipped: {e}")
+
+
+async def backfill_alert_trends(db: AsyncSession) -> None:
+    """Startup: fill alert_trend_counters from alerts on a database that predates them."""
+    try:
+        rows = await AlertTrendDAO(db).backfill()
+    except Exception as e:
+        await db.rollback()
+        logger.warning(f"Alert trend backfill skipped: {e}")
+        return
+    if rows:
+        logger.info(f"Backfilled {rows} alert trend counter rows")
+
+
+_detectors_restored = False
+_last_checkpoint = 0.0
+anomaly_ingest_lease = AnomalyIngestLease()
+
+
+async def restore_detectors(db: AsyncSession) -> None:
+    """Load the persisted detector baselines once per process, before the first observation."""
+    global _detectors_restored, _last_checkpoint
+    if _detectors_restored:
+        return
+    state = await AnomalyStateDAO(db).load(DETECTOR_STATE_NAME)
+    snapshot = await asyncio.to_thread(anomaly_detectors.decode, state.payload) if state is not None else None
+    if _detectors_restored:  # another caller got there while this one was loading
+        return
+    if snapshot is not None:
+        anomaly_detectors.restore(snapshot, state.watermarks)
+        logger.info(f"Restored anomaly baselines for {len(anomaly_detectors)} series")
+    _detectors_restored = True
+    _last_checkpoint = time.monotonic()
+
+
+async def checkpoint_detectors(db: AsyncSession) -> None:
+    """Drop idle series, then persist detector state and watermarks.
+
+    Skipped until the saved state has been restored, and in any worker not
+    holding the ingest lease, so only the ingesting worker writes the shared row.
+    """
+    global _last_checkpoint
+    if not _detectors_restored or not anomaly_ingest_lease.held:
+        return
+    pruned = anomaly_detectors.prune(time.time() - settings.ANOMALY_SERIES_IDLE_DAYS * 86400)
+    if pruned:
+        logger.info(f"Dropped {pruned} anomaly series idle for {settings.ANOMALY_SERIES_IDLE_DAYS} days")
+    snapshot = anomaly_detectors.snapshot()
+    watermarks = dict(anomaly_detectors.watermarks)
+    payload = await asyncio.to_thread(anomaly_detectors.encode, snapshot)
+    await AnomalyStateDAO(db).save(DETECTOR_STATE_NAME, payload, watermarks, len(snapshot[0]))
+    _last_checkpoint = time.monotonic()
+
+
+async def ingest_anomaly_sources(db: AsyncSession) -> dict:
+    """Periodic job: stream new cash transactions, journal postings and KPI values through the rules.
+
+    Every observation updates its series' detectors and is evaluated against
+    all active rules. Detector state is checkpointed together with the source
+    watermarks, so after a restart ingestion resumes from the checkpoint.
+
+    Only the worker holding the ingest lease runs; the others skip. A worker
+    taking the lease over reloads the last checkpoint rather than trusting its
+    own copy of the detectors and watermarks.
+    """
+    global _detectors_restored
+    was_held = anomaly_ingest_lease.held
+    if not await anomaly_ingest_lease.acquire():
+        return {"events": 0, "rules_fired": 0, "series": len(anomaly_detectors)}
+    if not was_held:
+        _detectors_restored = False
+    await restore_detectors(db)
+    events, marks = await AnomalySourceDAO(db).fetch_new(
+        anomaly_detectors.watermarks, settings.ANOMALY_INGEST_BATCH_ROWS,
+    )
+    fired = 0
+    if events:
+        result = await AlertRuleService(db).evaluate_events(events)
+        fired = result.rules_fired
+        anomaly_detectors.watermarks.update(marks)
+    if time.monotonic() - _last_checkpoint >= settings.ANOMALY_CHECKPOINT_SECONDS:
+        await checkpoint_detectors(db)
+    return {"events": len(events), "rules_fired": fired, "series": len(anomaly_detectors)}
+
+
 class RiskDashboardService:
     def __init__(self, db: AsyncSession):
         self.alert_dao = AlertDAO(db)
         self.score_dao = RiskScoreDAO(db)
 
     async def get_dashboard(self) -> RiskDashboardData:
-        open_count = await self.alert_dao.count_open()
-        severity_counts = await self.alert_dao.count_by_severity()
-        avg_score = await self.score_dao.avg_score()
-        top_risks = await self.score_dao.get_top(5)
+        stats, top_risks, trend = await run_concurrently(
+            lambda db: AlertDAO(db).get_dashboard_stats(),
+            lambda db: RiskScoreDAO(db).get_top(5),
+            lambda db: AlertTrendDAO(db).get_trend(7, "day"),
+        )
         return RiskDashboardData(
-            total_open_alerts=open_count,
-            critical_alerts=severity_counts.get("critical", 0),
-            high_alerts=severity_counts.get("high", 0),
-            avg_risk_score=avg_score,
+            total_open_alerts=stats["total_open"],
+            critical_alerts=stats["critical"],
+            high_alerts=stats["high"],
+            avg_risk_score=round(stats["avg_score"], 2),
             top_risks=top_risks,
-            alert_trend_7d=[],  # Placeholder — AGT-075 computes trends
+            alert_trend_7d=trend,
         )
 
     async def get_heatmap(self):
-        scores = await self.score_dao.get_all()
-        heatmap = []
-        for s in scores:
-            severity = "critical" if s.overall_score >= 80 else "high" if s.overall_score >= 60 else "medium" if s.overall_score >= 40 else "low"
-            heatmap.append({
-                "entity_name": s.entity_name,
-                "category": s.entity_type,
-                "score": s.overall_score,
-                "severity": severity,
-            })
-        return heatmap
+        return await self.score_dao.get_heatmap()
 
     async def get_scores(self, entity_type=None):
         return await self.score_dao.get_all(entity_type)
 
+    async def rescore(self) -> RiskScoringResult:
+        return await score_risk_entities(self.score_dao.db)
+
+
+def _score_matrix(matrix: FactorMatrix) -> dict:
+    values, available, history = matrix.build()
+    result = RiskScorer().score(values, available, history)
+    # Only rows backed by data are written; a stored score nothing covers any more is left as it is
+    keep = matrix.backed(values, available)
+    keys = [k for k, kept in zip(matrix.index, keep) if kept]
+    return {
+        "entity_type": [k[0] for k in keys],
+        "entity_name": [k[1] for k in keys],
+        "financial_risk": result["financial_risk"][keep].round(2).tolist(),
+        "operational_risk": result["operational_risk"][keep].round(2).tolist(),
+        "compliance_risk": result["compliance_risk"][keep].round(2).tolist(),
+        "overall_score": result["overall_score"][keep].round(2).tolist(),
+        "trend": result["trend"][keep].tolist(),
+        "factors_json": factors_json({k: result[k][keep] for k in ("feature_scores", "history", "slope")},
+                                     available[keep]),
+        "score_ms": result["score_ms"],
+    }
+
+
+async def score_risk_entities(db: AsyncSession) -> RiskScoringResult:
+    """Rescore every department, customer and process from current AR, variance, alert and incident data.
+
+    Other stored entities (vendors, portfolios) are rescored only while open
+    alerts name them; there is no vendor source to score them from otherwise.
+
+    Runs as a periodic job and on demand. Sources are aggregated in SQL, the
+    scores computed as one matrix pass off the event loop, and the results
+    upserted in bulk; a worker that finds another run in progress skips.
+    """
+    started = time.perf_counter()
+    dao = RiskScoreDAO(db)
+    if not await dao.try_lock_scoring():
+        await db.rollback()
+        return RiskScoringResult(entities=0, written=0, skipped=True, score_ms=0.0, total_ms=0.0)
+    now = datetime.utcnow()
+    snapshots = await dao.get_snapshots()
+    ar = await dao.get_ar_exposure(now.date())
+    variance = await dao.get_variance_profile(settings.RISK_VARIANCE_PERIODS)
+    processes = await dao.get_process_names()
+    incidents = await dao.get_incident_load(now - timedelta(days=settings.RISK_SCORING_LOOKBACK_DAYS), now)
+    alerts = await dao.get_alert_load()
+
+    matrix = FactorMatrix()
+    matrix.add_snapshots(snapshots)
+    matrix.add_source("ar", "customer", ar)
+    matrix.add_source("variance", "department", variance)
+    for name in processes:
+        # A registered service with no incidents scores zero, not unknown
+        matrix.cover(matrix.entity("process", name), "incidents")
+    matrix.add_source("incidents", "process", incidents)
+    matrix.cover_all("alerts")
+    matrix.add_by_name("alerts", alerts)
+
+    rows = await asyncio.to_thread(_score_matrix, matrix)
+    written = await dao.upsert_scores(rows, now)
+    return RiskScoringResult(
+        entities=len(matrix),
+        written=written,
+        skipped=False,
+        score_ms=rows["score_ms"],
+        total_ms=round((time.perf_counter() - started) * 1000, 2),
+    )
+
 
 class AlertHistoryService:
     def __init__(self, db: AsyncSession):
         self.dao = AlertHistoryDAO(db)
 
-    async def get_history(self, limit=100, offset=0):
-        return await self.dao.get_all(limit, offset)
+    async def get_history(self, limit=100, offset=0, cursor=None):
+        return await self.dao.get_all(limit, offset, cursor)
 
     async def get_alert_history(self, alert_id: UUID):
         return await self.dao.get_by_alert(alert_id)
@@ -3,6 +3,8 @@ from datetime import date
 from typing import Optional, List
 from sqlalchemy import select, func, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.shared.cache import invalidate_tags
+from app.shared.pagination import keyset_paginate, cursor_page
 from app.modules.treasury.models import (
     BankAccount, CashPosition, CashTransaction, CashForecast, ArInvoice, LiquidityMetric,
 )
@@ -27,12 +29,14 @@ class BankAccountDAO:
         account = BankAccount(**data)
         self.db.add(account)
         await self.db.commit()
+        await invalidate_tags("bank_accounts")
         await self.db.refresh(account)
         return account
 
     async def update(self, account_id: UUID, data: dict) -> Optional[BankAccount]:
         await self.db.execute(update(BankAccount).where(BankAccount.id == account_id).values(**data))
         await self.db.commit()
+        await invalidate_tags("bank_accounts")
         return await self.get_by_id(account_id)
 
 
@@ -78,12 +82,14 @@ class ArInvoiceDAO:
     def __init__(self, db: AsyncSession):
         self.db = db
 
-    async def get_all(self, status: Optional[str] = None, limit: int = 100, offset: int = 0) -> List[ArInvoice]:
+    async def get_all(self, status: Optional[str] = None, limit: int = 100, offset: int = 0,
+                      cursor: Optional[str] = None) -> dict:
         q = select(ArInvoice)
         if status:
             q = q.where(ArInvoice.status == status)
-        result = await self.db.execute(q.order_by(ArInvoice.due_date).offset(offset).limit(limit))
-        return list(result.scalars().all())
+        q = keyset_paginate(q, ArInvoice.due_date, ArInvoice.id, cursor, limit, descending=False)
+        result = await self.db.execute(q if cursor else q.offset(offset))
+        return cursor_page(list(result.scalars().all()), limit, "due_date")
 
     async def get_aging_summary(self) -> list:
         result = await self.db.execute(
@@ -97,6 +103,21 @@ class ArInvoiceDAO:
         )
         return [dict(row._mapping) for row in result.all()]
 
+    async def get_aging_overview(self) -> list:
+        """Per-bucket outstanding and overdue amounts in one pass over open invoices."""
+        outstanding = ArInvoice.amount - ArInvoice.amount_paid
+        result = await self.db.execute(
+            select(
+                ArInvoice.aging_bucket,
+                func.count().label("count"),
+                func.sum(outstanding).label("total_amount"),
+                func.coalesce(func.sum(outstanding).filter(ArInvoice.status == "overdue"), 0.0).label("overdue_amount"),
+            )
+            .where(ArInvoice.status.in_(["open", "partial", "overdue"]))
+            .group_by(ArInvoice.aging_bucket)
+        )
+        return [dict(row._mapping) for row in result.all()]
+
     async def get_total_receivables(self) -> float:
         result = await self.db.execute(
             select(func.sum(ArInvoice.amount - ArInvoice.amount_paid))
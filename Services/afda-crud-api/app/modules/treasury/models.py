@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime, date
-from sqlalchemy import String, Text, Float, Integer, Boolean, DateTime, Date, ForeignKey, Enum as SAEnum
+from sqlalchemy import String, Text, Float, Integer, Boolean, DateTime, Date, ForeignKey, Index, Enum as SAEnum
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.dialects.postgresql import UUID
 from app.database import Base
@@ -85,6 +85,7 @@ class CashForecast(Base):
 
 class ArInvoice(Base):
     __tablename__ = "ar_invoices"
+    __table_args__ = (Index("ix_ar_invoices_due_date_id", "due_date", "id"),)
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     invoice_number: Mapped[str] = mapped_column(String(50), unique=True, nullable=False)
@@ -3,7 +3,8 @@ from typing import Optional
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
-from app.shared.responses import ApiResponse
+from app.shared.cache import cache_response
+from app.shared.responses import ApiResponse, CursorResponse
 from app.modules.treasury.service import (
     BankAccountService, CashPositionService, CashForecastService, ArAgingService, LiquidityService,
 )
@@ -20,6 +21,7 @@ router = APIRouter()
 
 # ── Cash Position ──
 @router.get("/cash-position", response_model=ApiResponse[CashPositionSummary])
+@cache_response(ttl=300, tags=["bank_accounts"])
 async def get_cash_position(db: AsyncSession = Depends(get_db)):
     svc = CashPositionService(db)
     summary = await svc.get_current()
@@ -76,6 +78,7 @@ async def generate_cash_forecast(db: AsyncSession = Depends(get_db)):
 
 # ── AR Aging ──
 @router.get("/ar-aging", response_model=ApiResponse[ArAgingSummary])
+@cache_response(ttl=600, tags=["ar_invoices"])
 async def ar_aging_summary(db: AsyncSession = Depends(get_db)):
     svc = ArAgingService(db)
     summary = await svc.get_summary()
@@ -89,16 +92,17 @@ async def ar_aging_buckets(db: AsyncSession = Depends(get_db)):
     return ApiResponse(data=buckets)
 
 
-@router.get("/ar-aging/invoices", response_model=ApiResponse[list[ArInvoiceOut]])
+@router.get("/ar-aging/invoices", response_model=CursorResponse[ArInvoiceOut])
 async def ar_invoices(
     status: Optional[str] = None,
     limit: int = Query(100, ge=1, le=500),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
     db: AsyncSession = Depends(get_db),
 ):
     svc = ArAgingService(db)
-    invoices = await svc.get_invoices(status, limit, offset)
-    return ApiResponse(data=invoices)
+    page = await svc.get_invoices(status, limit, offset, cursor)
+    return CursorResponse(**page)
 
 
 # ── Liquidity ──
@@ -93,9 +93,9 @@ class ArAgingService:
         self.dao = ArInvoiceDAO(db)
 
     async def get_summary(self) -> ArAgingSummary:
-        total_recv = await self.dao.get_total_receivables()
-        total_overdue = await self.dao.get_total_overdue()
-        raw_buckets = await self.dao.get_aging_summary()
+        raw_buckets = await self.dao.get_aging_overview()
+        total_recv = sum(b["total_amount"] or 0 for b in raw_buckets)
+        total_overdue = sum(b["overdue_amount"] for b in raw_buckets)
         buckets = [
             AgingBucketSummary(
                 bucket=b["aging_bucket"],
@@ -110,8 +110,8 @@ class ArAgingService:
     async def get_buckets(self):
         return await self.dao.get_aging_summary()
 
-    async def get_invoices(self, status=None, limit=100, offset=0):
-        return await self.dao.get_all(status, limit, offset)
+    async def get_invoices(self, status=None, limit=100, offset=0, cursor=None):
+        return await self.dao.get_all(status, limit, offset, cursor)
 
 
 class LiquidityService:
@@ -0,0 +1,51 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import AsyncSessionLocal
+
+logger = logging.getLogger("afda")
+
+
+class PeriodicTask:
+    """Runs `job(session)` every `interval` seconds on a fresh session until stopped.
+
+    The interval is measured start to start; a run that overruns it is followed
+    immediately by the next.
+
+    Failures are logged and retried on the next tick so one bad run never stops
+    the loop.
+    """
+
+    def __init__(self, name: str, interval: float, job: Callable[[AsyncSession], Awaitable]):
+        self.name = name
+        self.interval = interval
+        self.job = job
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name=self.name)
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            try:
+                async with AsyncSessionLocal() as session:
+                    await self.job(session)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Background task {self.name} failed: {e}")
+            await asyncio.sleep(max(0.0, self.interval - (loop.time() - started)))
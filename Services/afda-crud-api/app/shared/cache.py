@@ -0,0 +1,78 @@
+import functools
+import hashlib
+import json
+import logging
+from typing import Sequence
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+from app import database
+from app.config import get_settings
+
+logger = logging.getLogger("afda")
+settings = get_settings()
+
+CACHE_PREFIX = "afda:cache"
+_CACHEABLE = (str, int, float, bool, type(None))
+
+
+def _tag_key(tag: str) -> str:
+    return f"{CACHE_PREFIX}:tag:{tag}"
+
+
+def _args_digest(kwargs: dict) -> str:
+    # Only plain query/path values shape the response; sessions and requests are skipped
+    params = {k: v for k, v in kwargs.items() if isinstance(v, _CACHEABLE)}
+    return hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def cache_response(ttl: int, tags: Sequence[str]):
+    """Cache a route's serialized response in Redis.
+
+    The key embeds the current version of every tag, so bumping a tag with
+    invalidate_tags() orphans all entries built from it without scanning keys;
+    orphans then age out with their TTL. Any Redis failure falls through to the
+    wrapped handler.
+    """
+    def decorator(func):
+        name = f"{func.__module__}.{func.__name__}"
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            redis = database.get_redis()
+            if not settings.CACHE_ENABLED or redis is None:
+                return await func(*args, **kwargs)
+            key = None
+            try:
+                versions = await redis.mget([_tag_key(t) for t in tags]) if tags else []
+                key = f"{CACHE_PREFIX}:{name}:{_args_digest(kwargs)}:" + ".".join(v or "0" for v in versions)
+                body = await redis.get(key)
+                if body is not None:
+                    return Response(content=body, media_type="application/json", headers={"X-Cache": "HIT"})
+            except Exception as e:
+                logger.warning(f"Cache read failed for {name}: {e}")
+
+            result = await func(*args, **kwargs)
+            body = json.dumps(jsonable_encoder(result), separators=(",", ":"))
+            if key is not None:
+                try:
+                    await redis.set(key, body, ex=ttl)
+                except Exception as e:
+                    logger.warning(f"Cache write failed for {name}: {e}")
+            return Response(content=body, media_type="application/json", headers={"X-Cache": "MISS"})
+
+        return wrapper
+
+    return decorator
+
+
+async def invalidate_tags(*tags: str) -> None:
+    redis = database.get_redis()
+    if redis is None or not tags:
+        return
+    try:
+        async with redis.pipeline(transaction=False) as pipe:
+            for tag in tags:
+                pipe.incr(_tag_key(tag))
+            await pipe.execute()
+    except Exception as e:
+        logger.warning(f"Cache invalidation failed for {', '.join(tags)}: {e}")
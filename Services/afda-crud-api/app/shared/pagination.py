@@ -1,5 +1,12 @@
+import base64
+import json
 import math
+import uuid
+from datetime import date, datetime
+from typing import Any, Optional, Tuple
 from fastapi import Query
+from sqlalchemy import Select, and_, or_, tuple_
+from app.shared.exceptions import BadRequestException
 
 
 class PaginationParams:
@@ -22,3 +29,87 @@ def paginate(items: list, total: int, params: PaginationParams) -> dict:
         "page_size": params.page_size,
         "total_pages": math.ceil(total / params.page_size) if params.page_size else 0,
     }
+
+
+# ── Keyset (cursor) pagination ──
+# A cursor is the (sort value, id) of the last row served, base64-encoded JSON.
+# The next page is WHERE (sort, id) < (cursor) ORDER BY sort, id, which an index on
+# (sort, id) answers with a single range scan no matter how deep the page is.
+# NULL sort values rank above every other value, as they do in a Postgres btree
+# index: last in ascending order, first in descending order.
+
+_ENCODERS = {
+    datetime: ("dt", lambda v: v.isoformat()),
+    date: ("d", lambda v: v.isoformat()),
+    uuid.UUID: ("u", str),
+    int: ("i", int),
+    float: ("f", float),
+    str: ("s", str),
+}
+_DECODERS = {
+    "dt": datetime.fromisoformat,
+    "d": date.fromisoformat,
+    "u": uuid.UUID,
+    "i": int,
+    "f": float,
+    "s": str,
+    "n": lambda v: None,
+}
+
+
+def _tag(value: Any) -> list:
+    if value is None:
+        return ["n", None]
+    for kind, (tag, encode) in _ENCODERS.items():
+        if type(value) is kind:
+            return [tag, encode(value)]
+    raise TypeError(f"Unsupported cursor value type: {type(value).__name__}")
+
+
+def encode_cursor(sort_value: Any, row_id: Any) -> str:
+    payload = json.dumps([_tag(sort_value), _tag(row_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, Any]:
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        (sort_tag, sort_value), (id_tag, id_value) = json.loads(payload)
+        return _DECODERS[sort_tag](sort_value), _DECODERS[id_tag](id_value)
+    except Exception:
+        raise BadRequestException("Invalid cursor")
+
+
+def keyset_paginate(q: Select, sort_col, id_col, cursor: Optional[str], limit: int,
+                    descending: bool = True) -> Select:
+    """Order by (sort_col, id_col), seek past the cursor and fetch one extra row."""
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        q = q.where(_seek(sort_col, id_col, sort_value, row_id, descending))
+    if descending:
+        q = q.order_by(sort_col.desc().nulls_first(), id_col.desc())
+    else:
+        q = q.order_by(sort_col.asc().nulls_last(), id_col.asc())
+    return q.limit(limit + 1)
+
+
+def _seek(sort_col, id_col, sort_value: Any, row_id: Any, descending: bool):
+    """Rows after the cursor; a row tuple comparison alone would drop every NULL sort value."""
+    if sort_value is None:
+        null_tail = and_(sort_col.is_(None), id_col < row_id if descending else id_col > row_id)
+        return or_(null_tail, sort_col.is_not(None)) if descending else null_tail
+    key = tuple_(sort_col, id_col)
+    if descending:
+        return key < tuple_(sort_value, row_id)  # NULL rows came first and have been served
+    return or_(key > tuple_(sort_value, row_id), sort_col.is_(None))
+
+
+def cursor_page(rows: list, limit: int, sort_attr: str, id_attr: str = "id") -> dict:
+    """Trim the look-ahead row and build the next cursor from the last row served."""
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = None
+    if has_more and rows:
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, sort_attr), getattr(last, id_attr))
+    return {"data": rows, "next_cursor": next_cursor, "has_more": has_more}
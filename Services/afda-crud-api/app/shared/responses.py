@@ -1,4 +1,5 @@
-from typing import Any, Generic, List, Optional, TypeVar
+import json
+from typing import Any, AsyncIterable, AsyncIterator, Generic, List, Optional, TypeVar
 from pydantic import BaseModel
 
 T = TypeVar("T")
@@ -17,3 +18,22 @@ class PaginatedResponse(BaseModel, Generic[T]):
     page: int = 1
     page_size: int = 20
     total_pages: int = 0
+
+
+class CursorResponse(BaseModel, Generic[T]):
+    success: bool = True
+    data: List[T] = []
+    message: str = "OK"
+    next_cursor: Optional[str] = None
+    has_more: bool = False
+
+
+async def stream_api_response(rows: AsyncIterable[Any], message: str = "OK") -> AsyncIterator[bytes]:
+    """Serialize rows one at a time into the ApiResponse envelope."""
+    yield b'{"success":true,"data":['
+    first = True
+    async for row in rows:
+        chunk = json.dumps(row, default=str)
+        yield (chunk if first else "," + chunk).encode()
+        first = False
+    yield ('],"message":' + json.dumps(message) + "}").encode()
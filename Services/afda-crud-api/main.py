@@ -4,8 +4,11 @@ from fastapi.middleware.cors import CORSMiddleware
 from prometheus_fastapi_instrumentator import Instrumentator
 
 from app.config import get_settings
-from app.database import connect_all, disconnect_all
+from app.database import AsyncSessionLocal, connect_all, disconnect_all
 from app.middleware.error_handler import ErrorHandlerMiddleware
+from app.middleware.query_counter import QueryCountMiddleware
+from app.middleware.metrics_recorder import ApiMetricsMiddleware, metrics_recorder
+from app.shared.background import PeriodicTask
 
 # ── Module Routers ──
 from app.modules.command_center.router import router as cc_router
@@ -17,13 +20,50 @@ from app.modules.monitoring.router import router as monitoring_router
 from app.modules.admin.router import router as admin_router
 from app.modules.auth.router import router as auth_router
 
+# ── Background Jobs ──
+from app.modules.monitoring.service import maintain_api_metrics
+from app.modules.accounting.service import upgrade_recon_items, backfill_account_balances
+from app.modules.monitoring.prober import health_prober
+from app.modules.risk.service import (
+    ingest_anomaly_sources, checkpoint_detectors, score_risk_entities, backfill_alert_trends, upgrade_risk_scores,
+    anomaly_ingest_lease,
+)
+from app.modules.risk.alert_stream import alert_stream_hub
+
 settings = get_settings()
 
+background_tasks = [
+    PeriodicTask("api-metrics-rollups", settings.METRICS_ROLLUP_INTERVAL_SECONDS, maintain_api_metrics),
+    PeriodicTask("anomaly-ingest", settings.ANOMALY_INGEST_INTERVAL_SECONDS, ingest_anomaly_sources),
+    PeriodicTask("risk-scoring", settings.RISK_SCORING_INTERVAL_SECONDS, score_risk_entities),
+]
+if settings.HEALTH_PROBE_ENABLED:
+    background_tasks.append(
+        PeriodicTask("health-prober", settings.HEALTH_PROBE_INTERVAL_SECONDS, health_prober.sweep)
+    )
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await connect_all()
+    async with AsyncSessionLocal() as session:
+        await upgrade_recon_items(session)
+        await backfill_account_balances(session)
+        await upgrade_risk_scores(session)
+        await backfill_alert_trends(session)
+    for task in background_tasks:
+        task.start()
+    if settings.METRICS_RECORDER_ENABLED:
+        metrics_recorder.start()
     yield
+    await metrics_recorder.stop()
+    for task in background_tasks:
+        await task.stop()
+    await health_prober.close()
+    await alert_stream_hub.stop()
+    async with AsyncSessionLocal() as session:
+        await checkpoint_detectors(session)
+    await anomaly_ingest_lease.release()
     await disconnect_all()
 
 
@@ -42,8 +82,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-DB-Query-Count", "X-Cache"],
 )
 app.add_middleware(ErrorHandlerMiddleware)
+app.add_middleware(QueryCountMiddleware)
+if settings.METRICS_RECORDER_ENABLED:
+    app.add_middleware(ApiMetricsMiddleware)
 
 # ── Prometheus ──
 Instrumentator().instrument(app).expose(app)
@@ -0,0 +1,22 @@
+"""
+Rebuild alert_trend_counters from the alerts table in a single set-based pass.
+Run: cd Services/afda-crud-api && python -m scripts.rebuild_alert_trends
+"""
+import asyncio
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine, AsyncSessionLocal, Base
+from app.modules.risk.models import *
+from app.modules.risk.dao import AlertTrendDAO
+
+
+async def rebuild():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=[AlertTrendCounter.__table__])
+    async with AsyncSessionLocal() as db:
+        rows = await AlertTrendDAO(db).rebuild()
+    print(f"✅ Rebuilt {rows} alert trend counter rows")
+    await engine.dispose()
+
+asyncio.run(rebuild())
@@ -0,0 +1,22 @@
+"""
+Rebuild account_balances from journal lines in a single set-based pass.
+Run: cd Services/afda-crud-api && python -m scripts.rebuild_balances
+"""
+import asyncio
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine, AsyncSessionLocal, Base
+from app.modules.accounting.models import *
+from app.modules.accounting.dao import AccountBalanceDAO
+
+
+async def rebuild():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=[AccountBalance.__table__])
+    async with AsyncSessionLocal() as db:
+        rows = await AccountBalanceDAO(db).rebuild()
+    print(f"✅ Rebuilt {rows} account balance rows")
+    await engine.dispose()
+
+asyncio.run(rebuild())
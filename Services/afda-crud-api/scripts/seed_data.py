@@ -210,20 +210,35 @@ async def seed_postgres():
             db.add(PlatformSetting(key=key, value=val, category=cat, description=desc))
 
         await db.commit()
+
+        # Derived tables the dashboards read instead of scanning their sources
+        from app.modules.accounting.dao import AccountBalanceDAO
+        from app.modules.risk.dao import AlertTrendDAO
+        await AccountBalanceDAO(db).rebuild()
+        await AlertTrendDAO(db).rebuild()
         print("  ✅ PostgreSQL seeded — all 7 modules")
 
 
 async def seed_mongodb():
     mongo = get_mongo()
 
-    # ── Sample conversation ──
+    # ── Sample conversation (session header + one message bucket) ──
+    messages = [
+        {"role": "user", "content": "What's our current cash position?", "timestamp": datetime.utcnow().isoformat(), "agent_id": None, "seq": 0},
+        {"role": "assistant", "content": "Your total cash across all accounts is $4.09M. Operating account holds $3.2M, payroll account $890K. Investment account at $5.4M. Credit line of $2M fully available. Net liquid position: $9.49M.", "timestamp": datetime.utcnow().isoformat(), "agent_id": "AGT-004", "seq": 1},
+    ]
     await mongo.agent_conversations.insert_one({
         "session_id": "demo-session-001",
         "engine": "n8n",
-        "messages": [
-            {"role": "user", "content": "What's our current cash position?", "timestamp": datetime.utcnow().isoformat(), "agent_id": None},
-            {"role": "assistant", "content": "Your total cash across all accounts is $4.09M. Operating account holds $3.2M, payroll account $890K. Investment account at $5.4M. Credit line of $2M fully available. Net liquid position: $9.49M.", "timestamp": datetime.utcnow().isoformat(), "agent_id": "AGT-004"},
-        ],
+        "message_count": len(messages),
+        "created_at": datetime.utcnow(),
+        "updated_at": datetime.utcnow(),
+    })
+    await mongo.agent_conversation_buckets.insert_one({
+        "session_id": "demo-session-001",
+        "bucket": 0,
+        "count": len(messages),
+        "messages": messages,
         "created_at": datetime.utcnow(),
         "updated_at": datetime.utcnow(),
     })
@@ -0,0 +1,74 @@
+import asyncio
+from app.modules.accounting.bulk_import import JournalImportParser
+
+HEADER = "entry_number,entry_date,entry_description,source,account_code,account_name,debit,credit,description\n"
+
+
+def parse(text: str, chunk: int = 7):
+    data = text.encode()
+
+    async def chunks():
+        for i in range(0, len(data), chunk):
+            yield data[i:i + chunk]
+
+    async def run():
+        parser = JournalImportParser("csv")
+        entries = [e async for e in parser.entries(chunks())]
+        return parser, entries
+
+    return asyncio.run(run())
+
+
+def test_balanced_entry_with_quoted_newline():
+    parser, entries = parse(
+        HEADER
+        + 'JE-1,2025-01-31,"Accrual\nfor Q4",manual,1000,Cash,100,0,\n'
+        + 'JE-1,2025-01-31,"Accrual\nfor Q4",manual,2000,AP,0,100,\n'
+    )
+    assert [e["entry_number"] for e in entries] == ["JE-1"]
+    assert entries[0]["description"] == "Accrual\nfor Q4"
+    assert parser.errors == []
+
+
+def test_rejects_non_finite_amounts():
+    parser, entries = parse(
+        HEADER
+        + "JE-1,2025-01-31,,manual,1000,Cash,inf,0,\n"
+        + "JE-1,2025-01-31,,manual,2000,AP,0,Infinity,\n"
+        + "JE-2,2025-01-31,,manual,1000,Cash,1e309,0,\n"
+        + "JE-2,2025-01-31,,manual,2000,AP,0,1e309,\n"
+        + "JE-3,2025-01-31,,manual,1000,Cash,nan,0,\n"
+        + "JE-3,2025-01-31,,manual,2000,AP,0,NaN,\n"
+    )
+    assert entries == []
+    assert [e["entry_number"] for e in parser.errors] == ["JE-1", "JE-2", "JE-3"]
+    assert all("finite" in e["error"] for e in parser.errors)
+
+
+def test_rejects_unbalanced_entry():
+    parser, entries = parse(
+        HEADER
+        + "JE-1,2025-01-31,,manual,1000,Cash,100,0,\n"
+        + "JE-1,2025-01-31,,manual,2000,AP,0,90,\n"
+        + "JE-2,2025-01-31,,manual,1000,Cash,5,0,\n"
+        + "JE-2,2025-01-31,,manual,2000,AP,0,5,\n"
+    )
+    assert [e["entry_number"] for e in entries] == ["JE-2"]
+    assert parser.errors[0]["entry_number"] == "JE-1"
+    assert "unbalanced" in parser.errors[0]["error"]
+
+
+def test_rejects_non_contiguous_entry():
+    parser, entries = parse(
+        HEADER
+        + "JE-1,2025-01-31,,manual,1000,Cash,5,0,\n"
+        + "JE-1,2025-01-31,,manual,2000,AP,0,5,\n"
+        + "JE-2,2025-01-31,,manual,1000,Cash,5,0,\n"
+        + "JE-2,2025-01-31,,manual,2000,AP,0,5,\n"
+        + "JE-1,2025-01-31,,manual,1000,Cash,5,0,\n"
+        + "JE-1,2025-01-31,,manual,2000,AP,0,5,\n"
+    )
+    assert [e["entry_number"] for e in entries] == ["JE-1", "JE-2"]
+    assert parser.errors == [
+        {"entry_number": "JE-1", "row": 5, "error": "duplicate or non-contiguous entry_number"},
+    ]